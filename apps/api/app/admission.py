@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import time
+from typing import Any
+
+from fastapi import HTTPException
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+
+class AdmissionRejected(Exception):
+    """No execution slot within the deadline (or the wait queue is full)."""
+
+    def __init__(self, reason: str, retry_after_s: int) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+
+class AdmissionController:
+    """
+    Bounded concurrency for inline (sync-mode) executions, awaited on the event loop.
+
+    At most `max_concurrent` callers run at once; up to `max_queue` more wait (FIFO), each for
+    at most `wait_timeout_s`. Anything beyond that is rejected immediately, so a burst costs a
+    429 instead of piling up executor threads and memory. Waiting holds no thread.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, wait_timeout_s: float) -> None:
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.wait_timeout_s = max(0.0, wait_timeout_s)
+        self._slots = asyncio.Semaphore(self.max_concurrent)
+        self._active = 0
+        self._waiting = 0
+        self._avg_service_s = 1.0
+        self.admitted = 0
+        self.rejected_full = 0
+        self.rejected_timeout = 0
+
+    def _retry_after(self) -> int:
+        # time for the current backlog to drain through the available slots
+        backlog = self._active + self._waiting + 1
+        return max(1, math.ceil(self._avg_service_s * backlog / self.max_concurrent))
+
+    async def acquire(self) -> float:
+        """Take a slot (waiting if needed) and return its start time; raises AdmissionRejected."""
+        if self._slots.locked() or self._waiting:
+            if self._waiting >= self.max_queue:
+                self.rejected_full += 1
+                raise AdmissionRejected("queue full", self._retry_after())
+        if not self._slots.locked():
+            # a free slot: take it without wait_for, which times out at once when the deadline is 0
+            await self._slots.acquire()
+        elif self.wait_timeout_s <= 0:
+            self.rejected_timeout += 1
+            raise AdmissionRejected("wait deadline exceeded", self._retry_after())
+        else:
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.wait_timeout_s)
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                raise AdmissionRejected("wait deadline exceeded", self._retry_after())
+            finally:
+                self._waiting -= 1
+        self._active += 1
+        self.admitted += 1
+        return time.monotonic()
+
+    def release(self, started: float) -> None:
+        self._active -= 1
+        # EWMA of time-in-slot feeds Retry-After
+        self._avg_service_s = 0.8 * self._avg_service_s + 0.2 * (time.monotonic() - started)
+        self._slots.release()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "maxConcurrent": self.max_concurrent,
+            "maxQueue": self.max_queue,
+            "waitTimeoutSec": self.wait_timeout_s,
+            "active": self._active,
+            "waiting": self._waiting,
+            "admitted": self.admitted,
+            "rejectedQueueFull": self.rejected_full,
+            "rejectedTimeout": self.rejected_timeout,
+            "avgServiceSec": round(self._avg_service_s, 4),
+        }
+
+
+def _controller(name: str, prefix: str, max_concurrent: int, max_queue: int, wait_timeout_s: float) -> AdmissionController:
+    return AdmissionController(
+        name,
+        int(os.getenv(f"{prefix}_MAX_CONCURRENT", str(max_concurrent))),
+        int(os.getenv(f"{prefix}_MAX_QUEUE", str(max_queue))),
+        float(os.getenv(f"{prefix}_WAIT_TIMEOUT_SEC", str(wait_timeout_s))),
+    )
+
+
+run_admission = _controller("runs", "ADMISSION_RUNS", 4, 16, 10.0)
+explain_admission = _controller("explain", "ADMISSION_EXPLAIN", 2, 8, 10.0)
+# hand sync runs that cannot get a slot to the async queues instead of rejecting them
+ADMISSION_DEMOTE_TO_ASYNC = _env_bool("ADMISSION_DEMOTE_TO_ASYNC", False)
+
+
+def overloaded(e: AdmissionRejected, what: str) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail={"message": f"Too many concurrent {what} requests", "error": e.reason, "retryAfterSec": e.retry_after_s},
+        headers={"Retry-After": str(e.retry_after_s)},
+    )
+
+
+def admission_stats() -> dict[str, Any]:
+    return {
+        "runs": run_admission.stats(),
+        "explain": explain_admission.stats(),
+        "demoteToAsync": ADMISSION_DEMOTE_TO_ASYNC,
+    }
@@ -1,5 +1,5 @@
-from app.dataloading.registry import load_splits
-from app.dataloading.types import DataSplits, MultiModalBatchV1
+from app.dataloading.registry import load_folds, load_splits
+from app.dataloading.types import DataFolds, DataSplits, MultiModalBatchV1
 
-__all__ = ["load_splits", "DataSplits", "MultiModalBatchV1"]
+__all__ = ["load_folds", "load_splits", "DataFolds", "DataSplits", "MultiModalBatchV1"]
 
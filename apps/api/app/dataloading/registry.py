@@ -2,8 +2,8 @@ from __future__ import annotations
 
 from typing import Any
 
-from app.dataloading.toy_av import load_toy_av_splits
-from app.dataloading.types import DataSplits
+from app.dataloading.toy_av import load_toy_av_folds, load_toy_av_splits
+from app.dataloading.types import DataFolds, DataSplits
 
 
 def load_splits(*, dataset_block_id: str, seed: int, config: dict[str, Any]) -> DataSplits:
@@ -16,3 +16,9 @@ def load_splits(*, dataset_block_id: str, seed: int, config: dict[str, Any]) ->
         return load_toy_av_splits(seed=seed, config=config)
     raise ValueError(f"Unsupported dataset block: {dataset_block_id}")
 
+
+def load_folds(*, dataset_block_id: str, seed: int, config: dict[str, Any], k: int) -> DataFolds:
+    """k-fold counterpart of `load_splits`: one dataset, k index views."""
+    if dataset_block_id == "datasets.toy_av":
+        return load_toy_av_folds(seed=seed, config=config, k=k)
+    raise ValueError(f"Unsupported dataset block: {dataset_block_id}")
@@ -5,7 +5,7 @@ from typing import Any
 
 import numpy as np
 
-from app.dataloading.types import DataSplits, MultiModalBatchV1
+from app.dataloading.types import DataFolds, DataSplits, MultiModalBatchV1
 
 
 @dataclass(frozen=True)
@@ -60,3 +60,28 @@ def load_toy_av_splits(*, seed: int, config: dict[str, Any]) -> DataSplits:
     )
     return DataSplits(train=train, test=test)
 
+
+def load_toy_av_folds(*, seed: int, config: dict[str, Any], k: int) -> DataFolds:
+    cfg = _parse_config(config)
+    if not 2 <= k <= cfg.n:
+        raise ValueError(f"cvFolds must be between 2 and n={cfg.n}")
+    audio, vision, y = _make(seed, cfg)
+
+    # shuffle rows once so every fold's test rows are one contiguous slice
+    idx = np.arange(cfg.n)
+    rng = np.random.default_rng(seed)
+    rng.shuffle(idx)
+    audio, vision, y = audio[idx], vision[idx], y[idx]
+    for a in (audio, vision, y):
+        # shared across fold workers; any accidental write should fail loudly
+        a.setflags(write=False)
+
+    bounds = np.cumsum([0] + [len(c) for c in np.array_split(idx, k)])
+    folds = [(int(bounds[i]), int(bounds[i + 1])) for i in range(k)]
+
+    data = MultiModalBatchV1(
+        modalities={"audio": audio, "vision": vision},
+        labels=y,
+        meta={"batchVersion": "v1", "dataset": "datasets.toy_av"},
+    )
+    return DataFolds(data=data, folds=folds)
@@ -33,3 +33,25 @@ class DataSplits:
     train: MultiModalBatchV1
     test: MultiModalBatchV1
 
+
+@dataclass(frozen=True)
+class DataFolds:
+    """
+    k-fold view over one dataset buffer.
+
+    - data: the full (read-only) batch, generated once with its rows already shuffled
+    - folds: per fold the `(start, stop)` range of its test rows; all other rows are its train set
+
+    Test rows are a contiguous slice (a view). The train rows are the two slices around it; a
+    trainer that needs one matrix joins them, once per fold (scikit-learn's SGD copies its
+    input to float64 C-order anyway).
+    """
+
+    data: MultiModalBatchV1
+    folds: list[tuple[int, int]]
+
+
+def fold_split(x: np.ndarray, fold: tuple[int, int]) -> tuple[np.ndarray, np.ndarray]:
+    """`(train, test)` rows of `x` for one fold; `test` is a view, `train` a single concatenation."""
+    start, stop = fold
+    return np.concatenate((x[:start], x[stop:])), x[start:stop]
@@ -1,13 +1,25 @@
 from __future__ import annotations
 
 import hashlib
+import json
+import logging
 import os
+import threading
+import time
 from datetime import datetime
-from typing import Generator
+from typing import Any, AsyncGenerator, Generator, Optional
 
+from sqlalchemy import event, inspect, text
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.leaderboard import backfill_metric_columns
 from app.models import (
+    AppMetadata,
     Block,
     BlockCategory,
     BlockVersion,
@@ -17,16 +29,268 @@ from app.models import (
     PaperCandidateStatus,
     PaperSource,
 )
+from app.search import ensure_search_index, index_papers
 
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./multibench_mvp.db")
 
-connect_args = {"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-engine = create_engine(DATABASE_URL, pool_pre_ping=True, connect_args=connect_args)
+# QueuePool sizing (Postgres and file-backed SQLite); applies to each engine separately
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE_SEC = int(os.getenv("DB_POOL_RECYCLE_SEC", "1800"))
+DB_POOL_TIMEOUT_SEC = float(os.getenv("DB_POOL_TIMEOUT_SEC", "30"))
+# SQLite: how long a writer waits for the lock before "database is locked", and read-side caches
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+# checkouts slower than this count as having waited for a free connection
+_WAITED_S = 0.001
+
+
+class PoolStats:
+    """Checkout latency of one engine's pool; lives on the pool class, so it survives `dispose()`."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waited = 0
+        self.timeouts = 0
+        self._wait_total_s = 0.0
+        self._wait_max_s = 0.0
+
+    def record(self, wait_s: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            if wait_s >= _WAITED_S:
+                self.waited += 1
+            self._wait_total_s += wait_s
+            self._wait_max_s = max(self._wait_max_s, wait_s)
+
+    def snapshot(self, pool: Pool) -> dict[str, Any]:
+        with self._lock:
+            out: dict[str, Any] = {
+                "pool": type(pool).__name__,
+                "checkouts": self.checkouts,
+                "waited": self.waited,
+                "timeouts": self.timeouts,
+                "avgWaitMs": round(1000 * self._wait_total_s / max(1, self.checkouts + self.timeouts), 3),
+                "maxWaitMs": round(1000 * self._wait_max_s, 3),
+            }
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + DB_MAX_OVERFLOW
+            out.update(
+                size=pool.size(),
+                maxOverflow=DB_MAX_OVERFLOW,
+                checkedOut=pool.checkedout(),
+                saturation=round(pool.checkedout() / capacity, 3) if capacity else None,
+            )
+        return out
+
+
+def _timed_pool(base: type[QueuePool], stats: PoolStats) -> type[QueuePool]:
+    class TimedPool(base):  # type: ignore[valid-type, misc]
+        def _do_get(self) -> Any:
+            start = time.perf_counter()
+            try:
+                conn = super()._do_get()
+            except sa_exc.TimeoutError:
+                stats.record(time.perf_counter() - start, timed_out=True)
+                raise
+            stats.record(time.perf_counter() - start)
+            return conn
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+def _is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _is_memory_sqlite(url: str) -> bool:
+    u = make_url(url)
+    return _is_sqlite(url) and (u.database in (None, "", ":memory:") or "mode=memory" in str(u))
+
+
+def _sqlite_pragmas(dbapi_conn: Any, _record: Any) -> None:
+    # WAL lets readers proceed while a run result is being written; NORMAL is durable in WAL
+    # mode except for the last commits on power loss
+    cur = dbapi_conn.cursor()
+    try:
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS:d}")
+        cur.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE:d}")
+        cur.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB:d}")
+    finally:
+        cur.close()
+
+
+def _pool_kwargs(url: str, base: type[QueuePool], stats: PoolStats) -> dict[str, Any]:
+    if _is_memory_sqlite(url):
+        return {}  # one shared connection per thread; nothing to size
+    return {
+        "poolclass": _timed_pool(base, stats),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_recycle": DB_POOL_RECYCLE_SEC,
+        "pool_timeout": DB_POOL_TIMEOUT_SEC,
+    }
+
+
+def _prepare(sync_engine: Engine, url: str) -> None:
+    if _is_sqlite(url) and not _is_memory_sqlite(url):
+        event.listen(sync_engine, "connect", _sqlite_pragmas)
+
+
+connect_args = {"check_same_thread": False} if _is_sqlite(DATABASE_URL) else {}
+_pool_stats = PoolStats()
+engine = create_engine(
+    DATABASE_URL,
+    pool_pre_ping=True,
+    connect_args=connect_args,
+    **_pool_kwargs(DATABASE_URL, QueuePool, _pool_stats),
+)
+_prepare(engine, DATABASE_URL)
+
+
+def _async_url(url: str) -> str:
+    """Same database through an asyncio driver: aiosqlite for SQLite, psycopg (v3) for Postgres."""
+    u = make_url(url)
+    if u.get_backend_name() == "sqlite":
+        return str(u.set(drivername="sqlite+aiosqlite"))
+    if u.get_backend_name() == "postgresql":
+        return u.set(drivername="postgresql+psycopg").render_as_string(hide_password=False)
+    return url
+
+
+# I/O-bound routers use this engine so slow queries never occupy the threadpool that sync
+# handlers and CPU work share; workers and CPU-side helpers keep using `engine`.
+_async_pool_stats = PoolStats()
+async_engine = create_async_engine(
+    _async_url(DATABASE_URL),
+    pool_pre_ping=True,
+    **_pool_kwargs(DATABASE_URL, AsyncAdaptedQueuePool, _async_pool_stats),
+)
+_prepare(async_engine.sync_engine, DATABASE_URL)
+
+
+def pool_stats() -> dict[str, Any]:
+    return {
+        "dialect": engine.dialect.name,
+        "sync": _pool_stats.snapshot(engine.pool),
+        "async": _async_pool_stats.snapshot(async_engine.sync_engine.pool),
+    }
+
+
+logger = logging.getLogger(__name__)
+
+
+def _missing_columns(bind: Any) -> dict[str, list[Any]]:
+    insp = inspect(bind)
+    out: dict[str, list[Any]] = {}
+    for table in SQLModel.metadata.sorted_tables:
+        if not insp.has_table(table.name):
+            continue
+        existing = {c["name"] for c in insp.get_columns(table.name)}
+        missing = [c for c in table.columns if c.name not in existing]
+        if missing:
+            out[table.name] = missing
+    return out
+
+
+def _add_missing_columns() -> None:
+    """
+    Add columns (and their indexes) that models gained after the table was created.
+
+    API and worker processes boot together, so the ALTERs run under the startup lock and the
+    missing set is re-read once it is held; whoever comes second finds nothing left to add.
+    """
+    if not _missing_columns(engine):
+        return
+    with Session(engine) as session:
+        _lock_for_seeding(session)
+        conn = session.connection()
+        for name, missing in _missing_columns(conn).items():
+            for col in missing:
+                # added as NULLable: old rows have no value and the ORM always writes one
+                conn.execute(text(f"ALTER TABLE {name} ADD COLUMN {col.name} {col.type.compile(dialect=engine.dialect)}"))
+            table = SQLModel.metadata.tables[name]
+            index_names = {ix["name"] for ix in inspect(conn).get_indexes(name)}
+            for ix in table.indexes:
+                if ix.name not in index_names:
+                    ix.create(conn)
+        session.commit()
+
+
+def _upgrade_schema() -> None:
+    """
+    Best-effort in-place upgrades for databases created by older builds.
+
+    MVP has no migration tool; `create_all` only creates missing tables, so model changes to
+    existing tables are applied here and must stay idempotent.
+    """
+    _add_missing_columns()
+    with Session(engine) as session:
+        backfill_metric_columns(session)
+    insp = inspect(engine)
+
+    # papers.dedup_hash became unique so concurrent watchers cannot double-insert.
+    dedup_idx = next((ix for ix in insp.get_indexes("papers") if ix["column_names"] == ["dedup_hash"]), None)
+    if dedup_idx and not dedup_idx.get("unique"):
+        try:
+            with engine.begin() as conn:
+                conn.execute(text(f"DROP INDEX {dedup_idx['name']}"))
+                conn.execute(text(f"CREATE UNIQUE INDEX {dedup_idx['name']} ON papers (dedup_hash)"))
+        except Exception as e:
+            logger.warning("Could not make papers.dedup_hash unique (duplicates present?): %s", e)
+
+
+_SCHEMA_KEY = "schema"
+# bump when _upgrade_schema gains a step that existing databases need without any model change
+SCHEMA_UPGRADES = 1
+
+
+def schema_fingerprint() -> str:
+    """Hash of the tables, columns and indexes the models declare, plus SCHEMA_UPGRADES."""
+    payload: list[Any] = [SCHEMA_UPGRADES]
+    for table in SQLModel.metadata.sorted_tables:
+        columns = sorted((c.name, str(c.type.compile(dialect=engine.dialect))) for c in table.columns)
+        payload.append([table.name, columns, sorted(str(ix.name) for ix in table.indexes)])
+    return hashlib.sha256(json.dumps(payload, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def _recorded_schema() -> Optional[str]:
+    if not inspect(engine).has_table(AppMetadata.__tablename__):
+        return None
+    with Session(engine) as session:
+        row = session.get(AppMetadata, _SCHEMA_KEY)
+        return row.value if row else None
 
 
 def create_db_and_tables() -> None:
+    """
+    Create and upgrade the schema and search index, unless the database already matches the models.
+
+    A matching fingerprint in `app_metadata` skips `create_all`, the upgrade backfills and the
+    full-text backfill, so a warm start costs a table check and one primary-key read. Any model
+    change (or a SCHEMA_UPGRADES bump) runs all of them once more.
+    """
+    fingerprint = schema_fingerprint()
+    if _recorded_schema() == fingerprint:
+        return
     SQLModel.metadata.create_all(engine)
+    _upgrade_schema()
+    ensure_search_index(engine)
+    with Session(engine) as session:
+        session.merge(AppMetadata(key=_SCHEMA_KEY, value=fingerprint, updated_at=datetime.utcnow()))
+        try:
+            session.commit()
+        except sa_exc.IntegrityError:
+            session.rollback()  # another process booting alongside recorded it first
 
 
 def get_session() -> Generator[Session, None, None]:
@@ -34,6 +298,12 @@ def get_session() -> Generator[Session, None, None]:
         yield session
 
 
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    # no lazy loads in async code: keep attributes usable after commit
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+
 def _digest_for(block_slug: str, version: str, input_schema: dict, output_schema: dict) -> str:
     h = hashlib.sha256()
     payload = {
@@ -46,233 +316,296 @@ def _digest_for(block_slug: str, version: str, input_schema: dict, output_schema
     return h.hexdigest()[:16]
 
 
-def seed_registry(session: Session) -> None:
-    now = datetime.utcnow()
-
-    def ensure_block(slug: str, category: BlockCategory, display_name: str, description: str) -> Block:
-        b = session.exec(select(Block).where(Block.slug == slug)).first()
-        if b:
-            # keep display fields reasonably fresh for MVP
-            b.category = category
-            b.display_name = display_name
-            b.description = description
-            session.add(b)
-            session.commit()
-            session.refresh(b)
-            return b
-        b = Block(slug=slug, category=category, display_name=display_name, description=description, created_at=now)
-        session.add(b)
-        session.commit()
-        session.refresh(b)
-        return b
-
-    def ensure_version(block: Block, version: str, input_schema: dict, output_schema: dict, changelog: str) -> BlockVersion:
-        existing = session.exec(select(BlockVersion).where(BlockVersion.block_id == block.id, BlockVersion.version == version)).first()
-        if existing:
-            return existing
-        digest = _digest_for(block.slug, version, input_schema, output_schema)
-        bv = BlockVersion(
-            block_id=block.id,
-            version=version,
-            status=BlockVersionStatus.published,
-            digest=digest,
-            input_schema=input_schema,
-            output_schema=output_schema,
-            changelog=changelog,
-            permissions={"network": False, "filesystem": False, "gpu": False},
-            tests={"smoke": True},
-            created_at=now,
-            published_at=now,
-        )
-        session.add(bv)
-        session.commit()
-        session.refresh(bv)
-        return bv
-
-    # Dataset
-    ds = ensure_block(
+# (slug, category, display name, description, [(version, input schema, output schema, changelog)])
+REGISTRY_SEED: list[tuple[str, BlockCategory, str, str, list[tuple[str, dict, dict, str]]]] = [
+    (
         "datasets.toy_av",
         BlockCategory.datasets,
         "Toy AV Dataset",
         "Deterministic synthetic audio+vision toy dataset for MVP.",
-    )
-    ensure_version(
-        ds,
-        "1.0.0",
-        {"type": "object", "properties": {"n": {"type": "integer", "minimum": 100}}, "additionalProperties": True},
-        {
-            "type": "object",
-            "properties": {
-                "audio": {"type": "array"},
-                "vision": {"type": "array"},
-                "labels": {"type": "array"},
-            },
-            "required": ["audio", "vision", "labels"],
-        },
-        "Initial published toy dataset block.",
-    )
-    # Unified batch contract (v1)
-    ensure_version(
-        ds,
-        "1.1.0",
-        {
-            "type": "object",
-            "properties": {
-                "n": {"type": "integer", "minimum": 100},
-                "audioDim": {"type": "integer", "minimum": 2, "default": 20},
-                "visionDim": {"type": "integer", "minimum": 2, "default": 30},
-                "trainRatio": {"type": "number", "minimum": 0.5, "maximum": 0.95, "default": 0.8},
-            },
-            "additionalProperties": True,
-        },
-        {
-            "type": "object",
-            "properties": {
-                "batch": {
+        [
+            (
+                "1.0.0",
+                {"type": "object", "properties": {"n": {"type": "integer", "minimum": 100}}, "additionalProperties": True},
+                {
                     "type": "object",
-                    "description": "Standardized batch.multimodal.v1 contract.",
                     "properties": {
-                        "modalities": {"type": "object"},
+                        "audio": {"type": "array"},
+                        "vision": {"type": "array"},
                         "labels": {"type": "array"},
-                        "meta": {"type": "object"},
                     },
-                    "required": ["modalities"],
+                    "required": ["audio", "vision", "labels"],
                 },
-                "labels": {"type": "array"},
-            },
-            "required": ["batch", "labels"],
-        },
-        "Add standardized batch.multimodal.v1 output contract for unified data loading.",
-    )
-
+                "Initial published toy dataset block.",
+            ),
+            # Unified batch contract (v1)
+            (
+                "1.1.0",
+                {
+                    "type": "object",
+                    "properties": {
+                        "n": {"type": "integer", "minimum": 100},
+                        "audioDim": {"type": "integer", "minimum": 2, "default": 20},
+                        "visionDim": {"type": "integer", "minimum": 2, "default": 30},
+                        "trainRatio": {"type": "number", "minimum": 0.5, "maximum": 0.95, "default": 0.8},
+                    },
+                    "additionalProperties": True,
+                },
+                {
+                    "type": "object",
+                    "properties": {
+                        "batch": {
+                            "type": "object",
+                            "description": "Standardized batch.multimodal.v1 contract.",
+                            "properties": {
+                                "modalities": {"type": "object"},
+                                "labels": {"type": "array"},
+                                "meta": {"type": "object"},
+                            },
+                            "required": ["modalities"],
+                        },
+                        "labels": {"type": "array"},
+                    },
+                    "required": ["batch", "labels"],
+                },
+                "Add standardized batch.multimodal.v1 output contract for unified data loading.",
+            ),
+        ],
+    ),
     # Encoders
-    enc_id = ensure_block("unimodals.identity", BlockCategory.unimodals, "Identity Encoder", "Pass-through encoder.")
-    ensure_version(
-        enc_id,
-        "1.0.0",
-        {"type": "object", "properties": {"scale": {"type": "number"}}, "additionalProperties": False},
-        {"type": "object", "properties": {"embed": {"type": "array"}}, "required": ["embed"]},
-        "Initial published identity encoder.",
-    )
-    ensure_version(
-        enc_id,
-        "1.1.0",
-        {
-            "type": "object",
-            "properties": {
-                "scale": {"type": "number", "default": 1.0},
-                "modalityKey": {"type": "string", "minLength": 1, "description": "Which modality to read from batch.modalities"},
-            },
-            "required": ["modalityKey"],
-            "additionalProperties": False,
-        },
-        {"type": "object", "properties": {"embed": {"type": "array"}}, "required": ["embed"]},
-        "Add modalityKey to support unified batch input.",
-    )
-
-    enc_lin = ensure_block(
+    (
+        "unimodals.identity",
+        BlockCategory.unimodals,
+        "Identity Encoder",
+        "Pass-through encoder.",
+        [
+            (
+                "1.0.0",
+                {"type": "object", "properties": {"scale": {"type": "number"}}, "additionalProperties": False},
+                {"type": "object", "properties": {"embed": {"type": "array"}}, "required": ["embed"]},
+                "Initial published identity encoder.",
+            ),
+            (
+                "1.1.0",
+                {
+                    "type": "object",
+                    "properties": {
+                        "scale": {"type": "number", "default": 1.0},
+                        "modalityKey": {"type": "string", "minLength": 1, "description": "Which modality to read from batch.modalities"},
+                    },
+                    "required": ["modalityKey"],
+                    "additionalProperties": False,
+                },
+                {"type": "object", "properties": {"embed": {"type": "array"}}, "required": ["embed"]},
+                "Add modalityKey to support unified batch input.",
+            ),
+        ],
+    ),
+    (
         "unimodals.linear",
         BlockCategory.unimodals,
         "Linear Encoder",
         "Simple deterministic linear projection encoder (seeded).",
-    )
-    ensure_version(
-        enc_lin,
-        "1.0.0",
-        {
-            "type": "object",
-            "properties": {"outDim": {"type": "integer", "minimum": 2}},
-            "required": ["outDim"],
-            "additionalProperties": False,
-        },
-        {"type": "object", "properties": {"embed": {"type": "array"}}, "required": ["embed"]},
-        "Initial published linear encoder.",
-    )
-    ensure_version(
-        enc_lin,
-        "1.1.0",
-        {
-            "type": "object",
-            "properties": {
-                "outDim": {"type": "integer", "minimum": 2},
-                "modalityKey": {"type": "string", "minLength": 1, "description": "Which modality to read from batch.modalities"},
-            },
-            "required": ["outDim", "modalityKey"],
-            "additionalProperties": False,
-        },
-        {"type": "object", "properties": {"embed": {"type": "array"}}, "required": ["embed"]},
-        "Add modalityKey to support unified batch input.",
-    )
-
+        [
+            (
+                "1.0.0",
+                {
+                    "type": "object",
+                    "properties": {"outDim": {"type": "integer", "minimum": 2}},
+                    "required": ["outDim"],
+                    "additionalProperties": False,
+                },
+                {"type": "object", "properties": {"embed": {"type": "array"}}, "required": ["embed"]},
+                "Initial published linear encoder.",
+            ),
+            (
+                "1.1.0",
+                {
+                    "type": "object",
+                    "properties": {
+                        "outDim": {"type": "integer", "minimum": 2},
+                        "modalityKey": {"type": "string", "minLength": 1, "description": "Which modality to read from batch.modalities"},
+                    },
+                    "required": ["outDim", "modalityKey"],
+                    "additionalProperties": False,
+                },
+                {"type": "object", "properties": {"embed": {"type": "array"}}, "required": ["embed"]},
+                "Add modalityKey to support unified batch input.",
+            ),
+        ],
+    ),
     # Fusion
-    fus_cat = ensure_block("fusions.concat", BlockCategory.fusions, "Concat Fusion", "Concatenate embeddings.")
-    ensure_version(
-        fus_cat,
-        "1.0.0",
-        {"type": "object", "properties": {}, "additionalProperties": False},
-        {"type": "object", "properties": {"fused": {"type": "array"}}, "required": ["fused"]},
-        "Initial published concat fusion.",
-    )
-    fus_sum = ensure_block("fusions.sum", BlockCategory.fusions, "Sum Fusion", "Element-wise sum embeddings (same dim).")
-    ensure_version(
-        fus_sum,
-        "1.0.0",
-        {"type": "object", "properties": {}, "additionalProperties": False},
-        {"type": "object", "properties": {"fused": {"type": "array"}}, "required": ["fused"]},
-        "Initial published sum fusion.",
-    )
-
+    (
+        "fusions.concat",
+        BlockCategory.fusions,
+        "Concat Fusion",
+        "Concatenate embeddings.",
+        [
+            (
+                "1.0.0",
+                {"type": "object", "properties": {}, "additionalProperties": False},
+                {"type": "object", "properties": {"fused": {"type": "array"}}, "required": ["fused"]},
+                "Initial published concat fusion.",
+            ),
+        ],
+    ),
+    (
+        "fusions.sum",
+        BlockCategory.fusions,
+        "Sum Fusion",
+        "Element-wise sum embeddings (same dim).",
+        [
+            (
+                "1.0.0",
+                {"type": "object", "properties": {}, "additionalProperties": False},
+                {"type": "object", "properties": {"fused": {"type": "array"}}, "required": ["fused"]},
+                "Initial published sum fusion.",
+            ),
+        ],
+    ),
     # Objective (placeholder for now; runner uses log-loss internally)
-    obj = ensure_block(
+    (
         "objective_functions.cross_entropy",
         BlockCategory.objective_functions,
         "Cross Entropy",
         "Classification cross entropy objective (placeholder in MVP).",
-    )
-    ensure_version(
-        obj,
-        "1.0.0",
-        {"type": "object", "properties": {}, "additionalProperties": False},
-        {"type": "object", "properties": {}, "additionalProperties": False},
-        "Initial published objective placeholder.",
-    )
-
+        [
+            (
+                "1.0.0",
+                {"type": "object", "properties": {}, "additionalProperties": False},
+                {"type": "object", "properties": {}, "additionalProperties": False},
+                "Initial published objective placeholder.",
+            ),
+        ],
+    ),
     # Trainer
-    tr = ensure_block(
+    (
         "training_structures.sgd_classifier",
         BlockCategory.training_structures,
         "SGD Trainer",
         "Train a linear classifier with SGD (scikit-learn).",
-    )
-    ensure_version(
-        tr,
-        "1.0.0",
-        {
-            "type": "object",
-            "properties": {
-                "maxIter": {"type": "integer", "minimum": 10},
-                "alpha": {"type": "number", "minimum": 0},
-            },
-            "additionalProperties": False,
-        },
-        {"type": "object", "properties": {"model": {"type": "string"}}, "required": ["model"]},
-        "Initial published trainer block.",
-    )
-
+        [
+            (
+                "1.0.0",
+                {
+                    "type": "object",
+                    "properties": {
+                        "maxIter": {"type": "integer", "minimum": 10},
+                        "alpha": {"type": "number", "minimum": 0},
+                    },
+                    "additionalProperties": False,
+                },
+                {"type": "object", "properties": {"model": {"type": "string"}}, "required": ["model"]},
+                "Initial published trainer block.",
+            ),
+        ],
+    ),
     # Evaluator
-    ev = ensure_block(
+    (
         "eval_scripts.basic",
         BlockCategory.eval_scripts,
         "Basic Evaluator",
         "Compute performance/complexity/robustness (MVP simplified).",
+        [
+            (
+                "1.0.0",
+                {"type": "object", "properties": {"noiseStd": {"type": "number", "minimum": 0}}, "additionalProperties": False},
+                {"type": "object", "properties": {"metrics": {"type": "object"}}, "required": ["metrics"]},
+                "Initial published evaluator block.",
+            ),
+        ],
+    ),
+]
+
+_SEED_KEY = "registry_seed"
+# arbitrary constant shared by every process seeding or upgrading the same Postgres database
+_SEED_LOCK_ID = 0x6D62_5345_4544
+
+
+def registry_fingerprint() -> str:
+    """Hash of REGISTRY_SEED; a database holding it needs no seeding."""
+    payload = [[slug, category.value, name, desc, versions] for slug, category, name, desc, versions in REGISTRY_SEED]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def _seeded_fingerprint(session: Session) -> Optional[str]:
+    row = session.get(AppMetadata, _SEED_KEY)
+    return row.value if row else None
+
+
+def _lock_for_seeding(session: Session) -> None:
+    """Serialize startup writers (API and worker processes boot together) until this transaction ends."""
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        session.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": _SEED_LOCK_ID})
+    elif dialect == "sqlite":
+        # take the write lock up front so the fingerprint re-check below cannot go stale
+        session.execute(text("BEGIN IMMEDIATE"))
+
+
+def seed_registry(session: Session) -> None:
+    """
+    Make the built-in blocks/versions match REGISTRY_SEED.
+
+    A matching fingerprint in `app_metadata` costs one primary-key read; otherwise the whole
+    seed is applied under a lock in one transaction with a handful of statements.
+    """
+    fingerprint = registry_fingerprint()
+    if _seeded_fingerprint(session) == fingerprint:
+        return
+    session.rollback()  # end the read transaction so the lock is taken first thing
+
+    _lock_for_seeding(session)
+    meta = session.get(AppMetadata, _SEED_KEY)
+    if meta is not None and meta.value == fingerprint:  # another worker seeded while we waited
+        session.rollback()
+        return
+
+    now = datetime.utcnow()
+    slugs = [slug for slug, *_ in REGISTRY_SEED]
+    blocks: dict[str, Block] = {}
+    for b in session.exec(select(Block).where(Block.slug.in_(slugs)).order_by(Block.created_at)):
+        blocks.setdefault(b.slug, b)
+    for slug, category, display_name, description, _ in REGISTRY_SEED:
+        b = blocks.get(slug)
+        if b is None:
+            blocks[slug] = b = Block(slug=slug, category=category, display_name=display_name, description=description, created_at=now)
+            session.add(b)
+        elif (b.category, b.display_name, b.description) != (category, display_name, description):
+            # keep display fields reasonably fresh for MVP
+            b.category, b.display_name, b.description = category, display_name, description
+            session.add(b)
+    session.flush()
+
+    block_ids = [b.id for b in blocks.values()]
+    existing = {
+        (r[0], r[1]) for r in session.exec(select(BlockVersion.block_id, BlockVersion.version).where(BlockVersion.block_id.in_(block_ids)))
+    }
+    session.add_all(
+        BlockVersion(
+            block_id=blocks[slug].id,
+            version=version,
+            status=BlockVersionStatus.published,
+            digest=_digest_for(slug, version, input_schema, output_schema),
+            input_schema=input_schema,
+            output_schema=output_schema,
+            changelog=changelog,
+            permissions={"network": False, "filesystem": False, "gpu": False},
+            tests={"smoke": True},
+            created_at=now,
+            published_at=now,
+        )
+        for slug, _, _, _, versions in REGISTRY_SEED
+        for version, input_schema, output_schema, changelog in versions
+        if (blocks[slug].id, version) not in existing
     )
-    ensure_version(
-        ev,
-        "1.0.0",
-        {"type": "object", "properties": {"noiseStd": {"type": "number", "minimum": 0}}, "additionalProperties": False},
-        {"type": "object", "properties": {"metrics": {"type": "object"}}, "required": ["metrics"]},
-        "Initial published evaluator block.",
-    )
+
+    if meta is None:
+        meta = AppMetadata(key=_SEED_KEY)
+    meta.value = fingerprint
+    meta.updated_at = now
+    session.add(meta)
+    session.commit()
 
 
 def seed_demo_paper_candidate(session: Session) -> None:
@@ -300,6 +633,7 @@ def seed_demo_paper_candidate(session: Session) -> None:
         created_at=now,
     )
     session.add(paper)
+    index_papers(session, [paper])
     session.commit()
     session.refresh(paper)
 
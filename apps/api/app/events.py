@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, AsyncIterator, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# "redis" reaches the API from Celery workers; "memory" only sees runs executed in this process.
+EVENTS_BACKEND = os.getenv("EVENTS_BACKEND", "redis" if os.getenv("REDIS_URL") else "memory")
+EVENTS_HISTORY = int(os.getenv("EVENTS_HISTORY", "100"))
+EVENTS_TTL_SEC = int(os.getenv("EVENTS_TTL_SEC", "3600"))
+_MEMORY_MAX_RUNS = 1000
+
+# last event of every run; subscribers stop after it
+FINISHED = "finished"
+
+
+def _channel(run_id: str) -> str:
+    return f"run-events:{run_id}"
+
+
+class _MemoryBus:
+    """In-process pub/sub; publishers may be worker threads, subscribers are asyncio tasks."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._history: OrderedDict[str, deque[dict[str, Any]]] = OrderedDict()
+        self._seq: dict[str, int] = {}
+        self._subscribers: dict[str, set[tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+
+    def publish(self, run_id: str, event: dict[str, Any]) -> None:
+        with self._lock:
+            seq = self._seq.get(run_id, 0) + 1
+            self._seq[run_id] = seq
+            event = {**event, "seq": seq}
+            self._history.setdefault(run_id, deque(maxlen=EVENTS_HISTORY)).append(event)
+            self._history.move_to_end(run_id)
+            while len(self._history) > _MEMORY_MAX_RUNS:
+                old, _ = self._history.popitem(last=False)
+                self._seq.pop(old, None)
+            subscribers = list(self._subscribers.get(run_id, ()))
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+            except RuntimeError:
+                pass  # subscriber's loop already closed
+
+    async def subscribe(self, run_id: str, heartbeat_s: float) -> AsyncIterator[Optional[dict[str, Any]]]:
+        queue: asyncio.Queue = asyncio.Queue()
+        sub = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(run_id, set()).add(sub)
+            backlog = list(self._history.get(run_id, ()))
+        try:
+            last = 0
+            for event in backlog:
+                last = event["seq"]
+                yield event
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), heartbeat_s)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event["seq"] > last:
+                    last = event["seq"]
+                    yield event
+        finally:
+            self._unregister([run_id], sub)
+
+    async def wait_any(self, run_ids: list[str], timeout_s: float) -> bool:
+        queue: asyncio.Queue = asyncio.Queue()
+        sub = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            for run_id in run_ids:
+                self._subscribers.setdefault(run_id, set()).add(sub)
+        try:
+            await asyncio.wait_for(queue.get(), timeout_s)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._unregister(run_ids, sub)
+
+    def _unregister(self, run_ids: list[str], sub: tuple[asyncio.AbstractEventLoop, asyncio.Queue]) -> None:
+        with self._lock:
+            for run_id in run_ids:
+                subs = self._subscribers.get(run_id)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        self._subscribers.pop(run_id, None)
+
+
+class _RedisBus:
+    """
+    Redis pub/sub plus a short per-run log, so a subscriber that connects late (or reconnects)
+    still receives the events it missed.
+    """
+
+    def __init__(self, url: str) -> None:
+        self.url = url
+        self._client: Any = None
+
+    def _sync(self) -> Any:
+        if self._client is None:
+            import redis
+
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def publish(self, run_id: str, event: dict[str, Any]) -> None:
+        r = self._sync()
+        channel = _channel(run_id)
+        seq = int(r.incr(f"{channel}:seq"))
+        payload = json.dumps({**event, "seq": seq}, separators=(",", ":"), default=str)
+        pipe = r.pipeline()
+        pipe.rpush(f"{channel}:log", payload)
+        pipe.ltrim(f"{channel}:log", -EVENTS_HISTORY, -1)
+        pipe.expire(f"{channel}:log", EVENTS_TTL_SEC)
+        pipe.expire(f"{channel}:seq", EVENTS_TTL_SEC)
+        pipe.publish(channel, payload)
+        pipe.execute()
+
+    async def subscribe(self, run_id: str, heartbeat_s: float) -> AsyncIterator[Optional[dict[str, Any]]]:
+        import redis.asyncio as aioredis
+
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        channel = _channel(run_id)
+        try:
+            # subscribe before reading the log: an event published in between shows up twice
+            # and is dropped by `seq`, instead of being lost
+            await pubsub.subscribe(channel)
+            last = 0
+            for raw in await client.lrange(f"{channel}:log", 0, -1):
+                event = json.loads(raw)
+                last = event["seq"]
+                yield event
+            while True:
+                msg = await pubsub.get_message(ignore_subscribe_messages=True, timeout=heartbeat_s)
+                if msg is None:
+                    yield None
+                    continue
+                event = json.loads(msg["data"])
+                if event["seq"] > last:
+                    last = event["seq"]
+                    yield event
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+    async def wait_any(self, run_ids: list[str], timeout_s: float) -> bool:
+        import redis.asyncio as aioredis
+
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(*[_channel(r) for r in run_ids])
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout_s
+            while (remaining := deadline - loop.time()) > 0:
+                if await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining) is not None:
+                    return True
+            return False
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_bus: Any = _RedisBus(os.getenv("REDIS_URL", "redis://localhost:6379/0")) if EVENTS_BACKEND == "redis" else _MemoryBus()
+
+
+def publish(run_id: str, stage: str, **data: Any) -> None:
+    """Emit one progress event for a run. Never raises: progress is best-effort, the run is not."""
+    try:
+        _bus.publish(run_id, {"runId": run_id, "stage": stage, "ts": time.time(), **data})
+    except Exception as e:
+        logger.warning("Could not publish %s event for run %s: %s", stage, run_id, e)
+
+
+def subscribe(run_id: str, heartbeat_s: float = 15.0) -> AsyncIterator[Optional[dict[str, Any]]]:
+    """
+    Events for `run_id` (backlog first, then live). Yields None every `heartbeat_s` without
+    traffic so callers can send keep-alives and re-check the run.
+    """
+    return _bus.subscribe(run_id, heartbeat_s)
+
+
+async def wait_any(run_ids: list[str], timeout_s: float) -> bool:
+    """Block until any of `run_ids` publishes an event (True) or `timeout_s` passes (False)."""
+    if not run_ids:
+        await asyncio.sleep(timeout_s)
+        return False
+    return await _bus.wait_any(run_ids, timeout_s)
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+
+T = TypeVar("T")
+
+# CPU-heavy request work (inline runs, explain, predict scoring) gets its own pool, so it can
+# never starve the threadpool that sync I/O handlers run in, and vice versa.
+API_CPU_WORKERS = int(os.getenv("API_CPU_WORKERS", "0")) or (os.cpu_count() or 1)
+
+cpu_executor = ThreadPoolExecutor(max_workers=API_CPU_WORKERS, thread_name_prefix="api-cpu")
+
+
+async def run_cpu(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    return await asyncio.get_running_loop().run_in_executor(cpu_executor, partial(fn, *args, **kwargs))
+
+
+async def run_cpu_releasing(release: Callable[[], None], fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    `run_cpu`, calling `release()` on the loop once `fn` has really finished.
+
+    Cancelling the await (a client disconnect) does not stop a thread that already started,
+    so whatever `release` gives back (an admission slot) stays taken until the thread is done.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        future = cpu_executor.submit(partial(fn, *args, **kwargs))
+    except BaseException:
+        release()
+        raise
+    future.add_done_callback(lambda _: loop.call_soon_threadsafe(release))
+    return await asyncio.wrap_future(future)
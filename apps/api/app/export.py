@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+from typing import Any, Iterator, Optional
+
+from sqlmodel import Session, select
+
+from app.db import engine
+from app.metrics import flatten_metrics
+from app.models import PipelineRun, RunStatus
+
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "1000"))
+
+# flattened metric path -> arrow type name; a fixed schema lets the writer start before any row is read
+EXPORT_METRICS: dict[str, str] = {
+    "performance.accuracy": "float64",
+    "complexity.paramCount": "int64",
+    "complexity.trainTimeMs": "float64",
+    "robustness.noiseStd": "float64",
+    "robustness.noisyAccuracy": "float64",
+    "robustness.accuracyDrop": "float64",
+}
+
+MEDIA_TYPES = {
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    def __init__(self) -> None:
+        self._parts: list[bytes] = []
+        self._pos = 0
+        self.closed = False
+
+    def write(self, data: Any) -> int:
+        b = bytes(data)
+        self._parts.append(b)
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self) -> int:
+        return self._pos
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return False
+
+    def drain(self) -> bytes:
+        out = b"".join(self._parts)
+        self._parts = []
+        return out
+
+
+def _schema(include_spec: bool) -> Any:
+    import pyarrow as pa
+
+    fields = [
+        pa.field("run_id", pa.string(), nullable=False),
+        pa.field("kind", pa.string()),
+        pa.field("parent_run_id", pa.string()),
+        pa.field("pipeline_id", pa.string()),
+        pa.field("status", pa.string()),
+        pa.field("created_at", pa.timestamp("us")),
+        pa.field("started_at", pa.timestamp("us")),
+        pa.field("finished_at", pa.timestamp("us")),
+        pa.field("error", pa.string()),
+    ]
+    fields += [pa.field(name, getattr(pa, t)()) for name, t in EXPORT_METRICS.items()]
+    if include_spec:
+        fields += [pa.field("spec", pa.string()), pa.field("locked_blocks", pa.string())]
+    return pa.schema(fields)
+
+
+def _batch(schema: Any, rows: list[Any], include_spec: bool) -> Any:
+    import pyarrow as pa
+
+    cols: dict[str, list[Any]] = {f.name: [] for f in schema}
+    for r in rows:
+        cols["run_id"].append(r.id)
+        cols["kind"].append(r.kind.value)
+        cols["parent_run_id"].append(r.parent_run_id)
+        cols["pipeline_id"].append(r.pipeline_id)
+        cols["status"].append(r.status.value)
+        cols["created_at"].append(r.created_at)
+        cols["started_at"].append(r.started_at)
+        cols["finished_at"].append(r.finished_at)
+        cols["error"].append(r.error or None)
+        flat = flatten_metrics(r.metrics or {})
+        for name, t in EXPORT_METRICS.items():
+            v = flat.get(name)
+            cols[name].append(int(v) if v is not None and t == "int64" else v)
+        if include_spec:
+            cols["spec"].append(json.dumps(r.spec, separators=(",", ":")))
+            cols["locked_blocks"].append(json.dumps(r.locked_blocks, separators=(",", ":")))
+    return pa.RecordBatch.from_pydict(cols, schema=schema)
+
+
+def export_runs(
+    fmt: str,
+    statuses: Optional[list[RunStatus]] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    include_spec: bool = False,
+) -> Iterator[bytes]:
+    """
+    Stream runs as Arrow IPC (`arrow`) or Parquet (`parquet`) bytes.
+
+    Rows are fetched through a server-side cursor `EXPORT_CHUNK_ROWS` at a time and each chunk
+    becomes one record batch / row group, so memory use does not grow with the row count.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _schema(include_spec)
+    cols = [
+        PipelineRun.id,
+        PipelineRun.kind,
+        PipelineRun.parent_run_id,
+        PipelineRun.pipeline_id,
+        PipelineRun.status,
+        PipelineRun.created_at,
+        PipelineRun.started_at,
+        PipelineRun.finished_at,
+        PipelineRun.error,
+        PipelineRun.metrics,
+    ]
+    if include_spec:
+        cols += [PipelineRun.spec, PipelineRun.locked_blocks]
+    stmt = select(*cols).order_by(PipelineRun.created_at, PipelineRun.id)
+    if statuses:
+        stmt = stmt.where(PipelineRun.status.in_(statuses))
+    if created_after is not None:
+        stmt = stmt.where(PipelineRun.created_at >= created_after)
+    if created_before is not None:
+        stmt = stmt.where(PipelineRun.created_at < created_before)
+
+    sink = _ChunkSink()
+    writer = pa.ipc.new_stream(sink, schema) if fmt == "arrow" else pq.ParquetWriter(sink, schema)
+    with Session(engine) as session:
+        result = session.execute(stmt.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        for rows in result.partitions():
+            batch = _batch(schema, rows, include_spec)
+            if fmt == "arrow":
+                writer.write_batch(batch)
+            else:
+                writer.write_table(pa.Table.from_batches([batch]))
+            yield sink.drain()
+    writer.close()
+    yield sink.drain()
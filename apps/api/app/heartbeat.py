@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Iterable
+
+from sqlalchemy import and_, or_, update
+from sqlmodel import Session
+
+from app.db import engine
+from app.models import PipelineRun, RunStatus
+
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SEC = float(os.getenv("RUN_HEARTBEAT_SEC", "15"))
+# a running run whose owner has not beaten for this long is considered orphaned
+RUN_STALE_SEC = float(os.getenv("RUN_STALE_SEC", "120"))
+RUN_MAX_ATTEMPTS = int(os.getenv("RUN_MAX_ATTEMPTS", "3"))
+
+
+def owner_id(role: str = "worker") -> str:
+    """Identity written to `claimed_by`: one per process."""
+    return f"{role}:{socket.gethostname()}:{os.getpid()}"
+
+
+def stale_filter(now: datetime) -> Any:
+    """Running rows whose heartbeat (or start, if they never beat) is older than RUN_STALE_SEC."""
+    cutoff = now - timedelta(seconds=RUN_STALE_SEC)
+    return and_(
+        PipelineRun.status == RunStatus.running,
+        or_(
+            PipelineRun.heartbeat_at < cutoff,
+            and_(PipelineRun.heartbeat_at.is_(None), PipelineRun.started_at < cutoff),
+        ),
+    )
+
+
+def owned_by(run_id: str, owner: str) -> Any:
+    """`run_id` is still running under `owner`, i.e. the reaper has not taken it away."""
+    return and_(PipelineRun.id == run_id, PipelineRun.status == RunStatus.running, PipelineRun.claimed_by == owner)
+
+
+# what an owner writes back when it finishes a run
+RESULT_FIELDS = (
+    "status",
+    "error",
+    "metrics",
+    "artifacts",
+    "started_at",
+    "finished_at",
+    "metric_accuracy",
+    "metric_param_count",
+    "metric_train_time_ms",
+    "metric_accuracy_drop",
+)
+
+
+def store_result(session: Session, run: PipelineRun, *guard: Any) -> bool:
+    """
+    Write the outcome held on `run` in memory with one `UPDATE ... WHERE id AND <guard>`.
+
+    Returns False (and writes nothing) when the guard no longer matches, e.g. the reaper
+    requeued the run while it executed. `run` is detached from `session` first so the ORM
+    never flushes the same fields without the guard; the caller commits.
+    """
+    # no autoflush anywhere in here: other dirty runs in the session must not be written unguarded
+    with session.no_autoflush:
+        values = {name: getattr(run, name) for name in RESULT_FIELDS}
+        run_id = run.id
+        if run in session:
+            session.expunge(run)
+        written = session.execute(update(PipelineRun).where(PipelineRun.id == run_id, *guard).values(**values)).rowcount
+    return bool(written)
+
+
+class Heartbeat:
+    """
+    Background thread that refreshes `heartbeat_at` for runs this process owns.
+
+    Only rows still `running` and `claimed_by == owner` are touched, so once the reaper has
+    taken a run away the old owner stops renewing it.
+    """
+
+    def __init__(self, run_ids: Iterable[str], owner: str, interval_s: float = HEARTBEAT_SEC) -> None:
+        self.run_ids = list(run_ids)
+        self.owner = owner
+        self.interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="run-heartbeat", daemon=True)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            try:
+                with Session(engine) as session:
+                    session.execute(
+                        update(PipelineRun)
+                        .where(
+                            PipelineRun.id.in_(self.run_ids),
+                            PipelineRun.status == RunStatus.running,
+                            PipelineRun.claimed_by == self.owner,
+                        )
+                        .values(heartbeat_at=datetime.utcnow())
+                    )
+                    session.commit()
+            except Exception as e:
+                logger.warning("Heartbeat for %d run(s) failed: %s", len(self.run_ids), e)
+
+    def __enter__(self) -> "Heartbeat":
+        if self.run_ids:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Any, Optional
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.models import PipelineRun, RunKind, RunStatus
+
+
+def set_run_metrics(run: PipelineRun, metrics: dict[str, Any]) -> None:
+    """Store `metrics` on the run and mirror the ranked values into their indexed columns."""
+    run.metrics = metrics
+
+    def num(section: str, key: str) -> Optional[float]:
+        v = (metrics.get(section) or {}).get(key)
+        return float(v) if isinstance(v, (int, float)) and not isinstance(v, bool) else None
+
+    param_count = num("complexity", "paramCount")
+    run.metric_accuracy = num("performance", "accuracy")
+    run.metric_param_count = int(param_count) if param_count is not None else None
+    run.metric_train_time_ms = num("complexity", "trainTimeMs")
+    run.metric_accuracy_drop = num("robustness", "accuracyDrop")
+
+
+def backfill_metric_columns(session: Session) -> int:
+    """Fill the metric columns of runs finished before they existed."""
+    rows = session.exec(
+        select(PipelineRun).where(
+            PipelineRun.status == RunStatus.succeeded,
+            PipelineRun.kind == RunKind.run,
+            PipelineRun.metric_accuracy.is_(None),
+        )
+    ).all()
+    for run in rows:
+        set_run_metrics(run, run.metrics or {})
+        session.add(run)
+    session.commit()
+    return len(rows)
+
+
+def pareto_front(points: list[tuple[str, float, int, float]]) -> list[str]:
+    """
+    Ids of the non-dominated `(id, accuracy, paramCount, accuracyDrop)` points.
+
+    Higher accuracy, fewer params and a smaller accuracy drop are better. Points are swept in
+    order of decreasing accuracy while a staircase of the (paramCount, accuracyDrop) minima seen
+    so far answers "is anything at least as accurate also no bigger and no less robust?" with one
+    bisect, so the whole pass is O(n log n) comparisons. Exact duplicates are kept together.
+    """
+    groups: dict[tuple[float, int, float], list[str]] = {}
+    for pid, acc, params, drop in points:
+        groups.setdefault((acc, params, drop), []).append(pid)
+
+    xs: list[int] = []  # staircase: paramCount ascending ...
+    ys: list[float] = []  # ... accuracyDrop strictly descending
+    front: list[str] = []
+    for acc, params, drop in sorted(groups, key=lambda p: (-p[0], p[1], p[2])):
+        i = bisect_right(xs, params) - 1
+        if i >= 0 and ys[i] <= drop:
+            continue
+        front.extend(groups[(acc, params, drop)])
+        lo = bisect_left(xs, params)
+        hi = lo
+        while hi < len(xs) and ys[hi] >= drop:
+            hi += 1
+        xs[lo:hi] = [params]
+        ys[lo:hi] = [drop]
+    return front
+
+
+class LeaderboardCache:
+    """Last computed frontier, reused until the set of finished runs changes."""
+
+    def __init__(self) -> None:
+        self._key: Optional[tuple[int, Optional[datetime]]] = None
+        self._value: Optional[dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def get(self, session: Session) -> dict[str, Any]:
+        ranked = (
+            PipelineRun.status == RunStatus.succeeded,
+            PipelineRun.metric_accuracy.is_not(None),
+            PipelineRun.metric_param_count.is_not(None),
+            PipelineRun.metric_accuracy_drop.is_not(None),
+        )
+        count, newest = session.exec(select(func.count(), func.max(PipelineRun.finished_at)).where(*ranked)).one()
+        key = (int(count), newest)
+        with self._lock:
+            if self._key == key and self._value is not None:
+                return {**self._value, "cached": True}
+
+        rows = session.exec(
+            select(
+                PipelineRun.id,
+                PipelineRun.metric_accuracy,
+                PipelineRun.metric_param_count,
+                PipelineRun.metric_accuracy_drop,
+                PipelineRun.metric_train_time_ms,
+                PipelineRun.finished_at,
+            ).where(*ranked)
+        ).all()
+        by_id = {r[0]: r for r in rows}
+        front = pareto_front([(r[0], r[1], r[2], r[3]) for r in rows])
+        value = {
+            "runsConsidered": len(rows),
+            "frontier": [
+                {
+                    "runId": pid,
+                    "accuracy": by_id[pid][1],
+                    "paramCount": by_id[pid][2],
+                    "accuracyDrop": by_id[pid][3],
+                    "trainTimeMs": by_id[pid][4],
+                    "finishedAt": by_id[pid][5],
+                }
+                for pid in front
+            ],
+        }
+        with self._lock:
+            self._key, self._value = key, value
+        return {**value, "cached": False}
+
+
+leaderboard_cache = LeaderboardCache()
@@ -6,7 +6,8 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from sqlmodel import Session
 
-from app.db import create_db_and_tables, engine, seed_demo_paper_candidate, seed_registry
+from app.admission import admission_stats
+from app.db import create_db_and_tables, engine, pool_stats, seed_demo_paper_candidate, seed_registry
 from app.routers.blocks import router as blocks_router
 from app.routers.explain import router as explain_router
 from app.routers.papers import router as papers_router
@@ -60,6 +61,18 @@ def health() -> dict:
     return {"ok": True}
 
 
+@app.get("/admission")
+def admission() -> dict:
+    """In-flight / waiting / rejected counts of the sync run and explain admission controllers."""
+    return admission_stats()
+
+
+@app.get("/db")
+def db_pools() -> dict:
+    """Checkout latency, timeouts and saturation of the sync and async connection pools."""
+    return pool_stats()
+
+
 app.include_router(blocks_router)
 app.include_router(runs_router)
 app.include_router(explain_router)
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from typing import Any
+
+
+def flatten_metrics(d: dict[str, Any], prefix: str = "") -> dict[str, float]:
+    """Nested metrics dict -> `{"a.b.c": value}` for every numeric leaf (bools excluded)."""
+    out: dict[str, float] = {}
+    for k, v in d.items():
+        key = f"{prefix}.{k}" if prefix else k
+        if isinstance(v, dict):
+            out.update(flatten_metrics(v, key))
+        elif isinstance(v, (int, float)) and not isinstance(v, bool):
+            out[key] = float(v)
+    return out
+
+
+def map_metric_leaves(d: dict[str, Any], values: dict[str, float], prefix: str = "") -> dict[str, Any]:
+    """Copy of `d` with each leaf replaced by `values[dotted key]` where present."""
+    out: dict[str, Any] = {}
+    for k, v in d.items():
+        key = f"{prefix}.{k}" if prefix else k
+        out[k] = map_metric_leaves(v, values, key) if isinstance(v, dict) else values.get(key, v)
+    return out
@@ -5,7 +5,7 @@ from enum import Enum
 from typing import Any, Optional
 from uuid import uuid4
 
-from sqlalchemy import Column
+from sqlalchemy import Column, Index
 from sqlalchemy.types import JSON
 from sqlmodel import Field, SQLModel
 
@@ -35,6 +35,11 @@ class RunStatus(str, Enum):
     failed = "failed"
 
 
+class RunKind(str, Enum):
+    run = "run"
+    sweep = "sweep"
+
+
 class ReviewState(str, Enum):
     pending = "pending"
     approved = "approved"
@@ -101,10 +106,24 @@ class Pipeline(SQLModel, table=True):
 
 class PipelineRun(SQLModel, table=True):
     __tablename__ = "pipeline_runs"
+    # the reaper's "running and heartbeat older than X" scan
+    __table_args__ = (Index("ix_pipeline_runs_status_heartbeat_at", "status", "heartbeat_at"),)
 
     id: str = Field(default_factory=lambda: str(uuid4()), primary_key=True)
     pipeline_id: Optional[str] = Field(default=None, foreign_key="pipelines.id", index=True)
     status: RunStatus = Field(default=RunStatus.queued, index=True)
+    # sweeps are a parent row (kind=sweep) whose children are ordinary runs
+    kind: RunKind = Field(default=RunKind.run, index=True)
+    parent_run_id: Optional[str] = Field(default=None, foreign_key="pipeline_runs.id", index=True)
+    # async scheduling: who submitted the run, which Celery queue it was routed to, and why
+    client_id: str = Field(default="", index=True)
+    queue_name: str = Field(default="", index=True)
+    cost_estimate: Optional[float] = None
+    # liveness: the owning process renews heartbeat_at while running; the reaper requeues or
+    # fails runs whose heartbeat went stale, up to a max number of attempts
+    claimed_by: str = ""
+    heartbeat_at: Optional[datetime] = None
+    attempts: int = 0
 
     spec: dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
     locked_blocks: dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
@@ -112,6 +131,12 @@ class PipelineRun(SQLModel, table=True):
     metrics: dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
     artifacts: dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
 
+    # headline metrics copied out of `metrics` at write time so ranking queries stay in SQL
+    metric_accuracy: Optional[float] = Field(default=None, index=True)
+    metric_param_count: Optional[int] = Field(default=None, index=True)
+    metric_train_time_ms: Optional[float] = Field(default=None)
+    metric_accuracy_drop: Optional[float] = Field(default=None, index=True)
+
     created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
     started_at: Optional[datetime] = Field(default=None, index=True)
     finished_at: Optional[datetime] = Field(default=None, index=True)
@@ -130,10 +155,31 @@ class Paper(SQLModel, table=True):
     categories: list[str] = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
     summary: str = ""
     published_at: Optional[datetime] = Field(default=None, index=True)
-    dedup_hash: str = Field(index=True)
+    dedup_hash: str = Field(index=True, unique=True)
+    # MinHash over title+abstract shingles (app.near_dup); near-duplicates point at the paper they repeat
+    minhash: list[int] = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
+    canonical_paper_id: Optional[str] = Field(default=None, foreign_key="papers.id", index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
 
 
+class WatcherState(SQLModel, table=True):
+    """Per-query cursor of the paper watcher: the newest entry already ingested."""
+
+    __tablename__ = "watcher_states"
+
+    query_key: str = Field(primary_key=True)
+    query: str = ""
+    last_published_at: Optional[datetime] = Field(default=None)
+    last_arxiv_id: str = ""
+    # a poll that hit the page cap before the cursor leaves a gap: entries published after
+    # the cursor and up to backfill_before are still unseen. The cursor moves to the pending
+    # newest entry once later polls have filled that gap.
+    backfill_before: Optional[datetime] = Field(default=None)
+    pending_published_at: Optional[datetime] = Field(default=None)
+    pending_arxiv_id: str = ""
+    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
 class PaperCandidate(SQLModel, table=True):
     __tablename__ = "paper_candidates"
 
@@ -144,9 +190,34 @@ class PaperCandidate(SQLModel, table=True):
     proposed_blocks: dict[str, Any] = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
     llm_prompt: str = ""
     llm_output: str = ""
+    # propose_pending leases a candidate until llm_retry_at while its request is in flight, and
+    # moves it there again (with backoff) after a failure; it gives up after LLM_MAX_ATTEMPTS
+    llm_attempts: int = 0
+    llm_retry_at: Optional[datetime] = Field(default=None, index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
 
 
+class LLMResponseCache(SQLModel, table=True):
+    """Completed LLM responses keyed by sha256(model + prompt), so re-drains never pay twice."""
+
+    __tablename__ = "llm_response_cache"
+
+    prompt_hash: str = Field(primary_key=True)
+    model: str = Field(index=True)
+    output: str = ""
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class AppMetadata(SQLModel, table=True):
+    """Key/value facts about the database itself, e.g. which registry seed it already holds."""
+
+    __tablename__ = "app_metadata"
+
+    key: str = Field(primary_key=True)
+    value: str = ""
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class Review(SQLModel, table=True):
     __tablename__ = "reviews"
 
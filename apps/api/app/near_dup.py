@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlmodel import Session, select
+
+from app.models import Paper
+
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS  # 16 bands x 8 rows -> LSH threshold ~ (1/16)^(1/8) ~= 0.71
+SHINGLE_SIZE = 3
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+# created_at is stamped before the insert commits, so another watcher's paper can become visible
+# after newer ones; each refresh re-reads this far behind its cursor to pick such rows up
+NEAR_DUP_REFRESH_WINDOW_SEC = float(os.getenv("NEAR_DUP_REFRESH_WINDOW_SEC", "600"))
+
+# universal hashing h(x) = (a*x + b) mod p over 32-bit shingle hashes; a*x stays below 2**64
+_PRIME = np.uint64((1 << 32) - 5)
+_rng = np.random.default_rng(0x5EED)
+_A = _rng.integers(1, int(_PRIME), size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, int(_PRIME), size=NUM_PERM, dtype=np.uint64)
+
+_ARXIV_VERSION = re.compile(r"v\d+$")
+_WORD = re.compile(r"\w+", flags=re.UNICODE)
+
+
+def arxiv_base_id(arxiv_id: str) -> str:
+    """`2502.12345v3` -> `2502.12345`, so new versions of one paper share a key."""
+    return _ARXIV_VERSION.sub("", arxiv_id or "")
+
+
+def shingles(title: str, summary: str, k: int = SHINGLE_SIZE) -> set[str]:
+    words = _WORD.findall(f"{title} {summary}".lower())
+    if len(words) < k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i : i + k]) for i in range(len(words) - k + 1)}
+
+
+def minhash_signature(title: str, summary: str) -> list[int]:
+    sh = shingles(title, summary)
+    if not sh:
+        return []
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in sh),
+        dtype=np.uint64,
+        count=len(sh),
+    )
+    sig = ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+    return [int(v) for v in sig]
+
+
+def _bands(sig: np.ndarray) -> Iterable[tuple[int, bytes]]:
+    for b in range(BANDS):
+        yield b, sig[b * ROWS : (b + 1) * ROWS].tobytes()
+
+
+class LSHIndex:
+    """
+    Banded MinHash LSH over canonical (non-duplicate) papers.
+
+    Lookups touch one bucket per band instead of every stored signature; candidates are then
+    confirmed with the estimated Jaccard similarity.
+    """
+
+    def __init__(self) -> None:
+        self._buckets: list[dict[bytes, set[str]]] = [defaultdict(set) for _ in range(BANDS)]
+        self._sigs: dict[str, np.ndarray] = {}
+        self._by_base: dict[str, str] = {}
+        self._ids: set[str] = set()
+        self._loaded_until: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def add(self, paper_id: str, arxiv_id: str, signature: list[int]) -> None:
+        with self._lock:
+            self._ids.add(paper_id)
+            base = arxiv_base_id(arxiv_id)
+            if base:
+                self._by_base.setdefault(base, paper_id)
+            if len(signature) != NUM_PERM:
+                return
+            sig = np.asarray(signature, dtype=np.uint64)
+            self._sigs[paper_id] = sig
+            for b, key in _bands(sig):
+                self._buckets[b][key].add(paper_id)
+
+    def match(self, arxiv_id: str, signature: list[int], threshold: float = NEAR_DUP_THRESHOLD) -> Optional[tuple[str, float]]:
+        """Return `(paper_id, similarity)` of the paper this one duplicates, if any."""
+        with self._lock:
+            same = self._by_base.get(arxiv_base_id(arxiv_id))
+            if same:
+                return same, 1.0
+            if len(signature) != NUM_PERM:
+                return None
+            sig = np.asarray(signature, dtype=np.uint64)
+            candidates: set[str] = set()
+            for b, key in _bands(sig):
+                candidates |= self._buckets[b].get(key, set())
+            best: Optional[tuple[str, float]] = None
+            for pid in candidates:
+                sim = float(np.mean(self._sigs[pid] == sig))
+                if sim >= threshold and (best is None or sim > best[1]):
+                    best = (pid, sim)
+            return best
+
+    def refresh(self, session: Session) -> None:
+        """
+        Load canonical papers created since the last refresh (all of them on first call).
+
+        The scan starts NEAR_DUP_REFRESH_WINDOW_SEC before the newest `created_at` seen so far,
+        so papers committed late are not missed; ones already indexed are skipped.
+        """
+        stmt = select(Paper.id, Paper.arxiv_id, Paper.title, Paper.summary, Paper.minhash, Paper.created_at).where(
+            Paper.canonical_paper_id.is_(None)
+        )
+        if self._loaded_until is not None:
+            stmt = stmt.where(Paper.created_at >= self._loaded_until - timedelta(seconds=NEAR_DUP_REFRESH_WINDOW_SEC))
+        newest = self._loaded_until
+        for pid, arxiv_id, title, summary, sig, created_at in session.exec(stmt):
+            if newest is None or created_at > newest:
+                newest = created_at
+            if pid in self._ids:
+                continue
+            # rows from before signatures existed are hashed in memory
+            self.add(pid, arxiv_id, sig or minhash_signature(title, summary or ""))
+        self._loaded_until = newest
+
+
+lsh_index = LSHIndex()
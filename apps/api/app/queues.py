@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import os
+from typing import Any, Optional
+
+from sqlalchemy import func, text
+from sqlmodel import Session, select
+
+from app.models import PipelineRun, RunStatus
+
+
+QUEUE_INTERACTIVE = "runs.interactive"
+QUEUE_BATCH = "runs.batch"
+RUN_QUEUES = (QUEUE_INTERACTIVE, QUEUE_BATCH)
+
+# runs estimated above this many work units (see `estimate_cost`) go to the batch queue;
+# the default pipeline (n=800, 50 features, 300 epochs) is ~1.2e7
+INTERACTIVE_MAX_COST = float(os.getenv("INTERACTIVE_MAX_COST", "5e7"))
+# queued + running async runs one client may have at a time
+CLIENT_MAX_ACTIVE_RUNS = int(os.getenv("CLIENT_MAX_ACTIVE_RUNS", "20"))
+# callers whose X-Client-Id is believed (e.g. an authenticating gateway); everyone else is
+# identified by address, so a fresh header per request cannot dodge the limit
+TRUSTED_CLIENT_ID_HOSTS = frozenset(h.strip() for h in os.getenv("TRUSTED_CLIENT_ID_HOSTS", "").split(",") if h.strip())
+
+
+def queue_for_cost(cost: float) -> str:
+    return QUEUE_INTERACTIVE if cost <= INTERACTIVE_MAX_COST else QUEUE_BATCH
+
+
+def client_key(header_value: Optional[str], remote_host: Optional[str]) -> str:
+    """Fair-share identity: the caller's address, or `X-Client-Id` when a trusted host sends it."""
+    host = remote_host or "unknown"
+    client = (header_value or "").strip()[:128]
+    if client and host in TRUSTED_CLIENT_ID_HOSTS:
+        return client
+    return f"ip:{host}"
+
+
+def lock_client(session: Session, client_id: str) -> None:
+    """
+    Serialize run submissions of one client until the current transaction ends.
+
+    Must be the first statement of the transaction, so the active-run count read after it and
+    the insert that follows cannot interleave with a concurrent submit.
+    """
+    dialect = session.get_bind().dialect.name
+    if dialect == "postgresql":
+        session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:k))"), {"k": f"fair-share:{client_id}"})
+    elif dialect == "sqlite":
+        session.execute(text("BEGIN IMMEDIATE"))
+
+
+def active_runs(session: Session, client_id: str) -> int:
+    return int(
+        session.exec(
+            select(func.count())
+            .select_from(PipelineRun)
+            .where(PipelineRun.client_id == client_id, PipelineRun.status.in_([RunStatus.queued, RunStatus.running]))
+        ).one()
+    )
+
+
+def queue_depths(session: Session) -> dict[str, Any]:
+    rows = session.exec(
+        select(PipelineRun.queue_name, PipelineRun.status, func.count(), func.min(PipelineRun.created_at))
+        .where(PipelineRun.status.in_([RunStatus.queued, RunStatus.running]), PipelineRun.queue_name != "")
+        .group_by(PipelineRun.queue_name, PipelineRun.status)
+    ).all()
+    out: dict[str, Any] = {q: {"queued": 0, "running": 0, "oldestQueuedAt": None} for q in RUN_QUEUES}
+    for queue, status, count, oldest in rows:
+        entry = out.setdefault(queue, {"queued": 0, "running": 0, "oldestQueuedAt": None})
+        entry[status.value] = int(count)
+        if status == RunStatus.queued:
+            entry["oldestQueuedAt"] = oldest
+    return out
@@ -5,9 +5,10 @@ import os
 from datetime import datetime
 
 from fastapi import APIRouter, Depends, Header, HTTPException
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.db import get_session
+from app.db import get_async_session
 from app.models import Block, BlockVersion, BlockVersionStatus
 
 
@@ -20,9 +21,9 @@ def _require_admin(x_admin_key: str | None, admin_key: str) -> None:
 
 
 @router.get("")
-def list_blocks(session: Session = Depends(get_session)) -> list[dict]:
-    blocks = session.exec(select(Block).order_by(Block.category, Block.slug)).all()
-    versions = session.exec(select(BlockVersion).where(BlockVersion.status == BlockVersionStatus.published)).all()
+async def list_blocks(session: AsyncSession = Depends(get_async_session)) -> list[dict]:
+    blocks = (await session.exec(select(Block).order_by(Block.category, Block.slug))).all()
+    versions = (await session.exec(select(BlockVersion).where(BlockVersion.status == BlockVersionStatus.published))).all()
     latest_by_block: dict[str, BlockVersion] = {}
     for v in versions:
         prev = latest_by_block.get(v.block_id)
@@ -56,11 +57,11 @@ def list_blocks(session: Session = Depends(get_session)) -> list[dict]:
 
 
 @router.get("/{block_id}/versions")
-def list_block_versions(block_id: str, session: Session = Depends(get_session)) -> list[dict]:
-    block = session.exec(select(Block).where(Block.slug == block_id)).first()
+async def list_block_versions(block_id: str, session: AsyncSession = Depends(get_async_session)) -> list[dict]:
+    block = (await session.exec(select(Block).where(Block.slug == block_id))).first()
     if not block:
         raise HTTPException(status_code=404, detail="Block not found")
-    versions = session.exec(select(BlockVersion).where(BlockVersion.block_id == block.id).order_by(BlockVersion.created_at)).all()
+    versions = (await session.exec(select(BlockVersion).where(BlockVersion.block_id == block.id).order_by(BlockVersion.created_at))).all()
     return [
         {
             "id": v.id,
@@ -77,14 +78,14 @@ def list_block_versions(block_id: str, session: Session = Depends(get_session))
 
 
 @router.post("/{block_id}/versions")
-def create_draft_version(
+async def create_draft_version(
     block_id: str,
     payload: dict,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     x_admin_key: str | None = Header(default=None),
 ) -> dict:
     _require_admin(x_admin_key, os.getenv("ADMIN_KEY", ""))
-    block = session.exec(select(Block).where(Block.slug == block_id)).first()
+    block = (await session.exec(select(Block).where(Block.slug == block_id))).first()
     if not block:
         raise HTTPException(status_code=404, detail="Block not found")
 
@@ -112,7 +113,7 @@ def create_draft_version(
         created_at=datetime.utcnow(),
     )
     session.add(bv)
-    session.commit()
-    session.refresh(bv)
+    await session.commit()
+    await session.refresh(bv)
     return {"id": bv.id, "blockId": block.slug, "version": bv.version, "status": bv.status.value, "digest": bv.digest}
 
@@ -1,19 +1,38 @@
 from __future__ import annotations
 
+from functools import partial
+
 from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 
-from app.runner.explain_runner import explain_toy_pipeline
+from app.admission import AdmissionRejected, explain_admission, overloaded
+from app.executors import run_cpu_releasing
 from app.schemas.explain import ExplainRequest, ExplainResponse
+from app.schemas.pipeline import PipelineSpec
+from app.validation import lock_and_validate
 
 
 router = APIRouter(prefix="/explain", tags=["explain"])
 
 
+def _explain(spec: PipelineSpec) -> dict:
+    # imported here (on the CPU executor) so numpy/scikit-learn load on first use, off the event loop
+    from app.runner.explain_runner import explain_toy_pipeline
+
+    return explain_toy_pipeline(spec)
+
+
 @router.post("", response_model=ExplainResponse)
-def explain(req: ExplainRequest) -> ExplainResponse:
+async def explain(req: ExplainRequest) -> ExplainResponse:
+    await run_in_threadpool(lock_and_validate, req.spec)
+
+    try:
+        slot = await explain_admission.acquire()
+    except AdmissionRejected as e:
+        raise overloaded(e, "explain")
     try:
-        out = explain_toy_pipeline(req.spec)
+        # the slot is held until the thread finishes, even if the client disconnects first
+        out = await run_cpu_releasing(partial(explain_admission.release, slot), _explain, req.spec)
         return ExplainResponse(**out)
     except Exception as e:
         raise HTTPException(status_code=400, detail={"message": "Explain failed", "error": str(e)})
-
@@ -6,10 +6,12 @@ import os
 from datetime import datetime
 from typing import Any
 
-from fastapi import APIRouter, Depends, Header, HTTPException
-from sqlmodel import Session, desc, select
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy import tuple_
+from sqlmodel import desc, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.db import get_session
+from app.db import get_async_session
 from app.models import (
     Block,
     BlockCategory,
@@ -19,6 +21,7 @@ from app.models import (
     PaperCandidate,
     PaperCandidateStatus,
 )
+from app.search import search_papers
 
 
 router = APIRouter(tags=["papers"])
@@ -62,8 +65,8 @@ def _parse_proposed_blocks(candidate: PaperCandidate) -> dict[str, Any]:
 
 
 @router.get("/papers")
-def list_papers(session: Session = Depends(get_session), limit: int = 50) -> list[dict]:
-    rows = session.exec(select(Paper).order_by(desc(Paper.created_at)).limit(limit)).all()
+async def list_papers(session: AsyncSession = Depends(get_async_session), limit: int = 50) -> list[dict]:
+    rows = (await session.exec(select(Paper).order_by(desc(Paper.created_at)).limit(limit))).all()
     return [
         {
             "id": p.id,
@@ -74,22 +77,70 @@ def list_papers(session: Session = Depends(get_session), limit: int = 50) -> lis
             "authors": p.authors,
             "categories": p.categories,
             "publishedAt": p.published_at,
+            "canonicalPaperId": p.canonical_paper_id,
             "createdAt": p.created_at,
         }
         for p in rows
     ]
 
 
+@router.get("/papers/search")
+async def search_papers_endpoint(
+    q: str = Query(min_length=1),
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: str | None = None,
+    session: AsyncSession = Depends(get_async_session),
+) -> dict:
+    """
+    Relevance-ranked full-text search over title / summary / authors / categories.
+
+    Pass `nextCursor` back as `cursor` to fetch the following page (keyset pagination).
+    """
+    try:
+        hits, next_cursor = await session.run_sync(search_papers, q, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    ids = [pid for pid, _ in hits]
+    papers = (await session.exec(select(Paper).where(Paper.id.in_(ids)))).all() if ids else []
+    paper_by_id = {p.id: p for p in papers}
+    cands = (await session.exec(select(PaperCandidate).where(PaperCandidate.paper_id.in_(ids)))).all() if ids else []
+    cands_by_paper: dict[str, list[dict]] = {}
+    for c in cands:
+        cands_by_paper.setdefault(c.paper_id, []).append({"id": c.id, "status": c.status.value, "createdAt": c.created_at})
+
+    items = []
+    for pid, rank in hits:
+        p = paper_by_id.get(pid)
+        if not p:
+            continue
+        items.append(
+            {
+                "id": p.id,
+                "arxivId": p.arxiv_id,
+                "url": p.url,
+                "title": p.title,
+                "authors": p.authors,
+                "categories": p.categories,
+                "summary": p.summary,
+                "publishedAt": p.published_at,
+                "rank": rank,
+                "candidates": cands_by_paper.get(pid, []),
+            }
+        )
+    return {"items": items, "nextCursor": next_cursor}
+
+
 @router.get("/paper_candidates")
-def list_candidates(session: Session = Depends(get_session), status: str = "pending_review", limit: int = 50) -> list[dict]:
+async def list_candidates(session: AsyncSession = Depends(get_async_session), status: str = "pending_review", limit: int = 50) -> list[dict]:
     try:
         st = PaperCandidateStatus(status)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid status")
-    rows = session.exec(select(PaperCandidate).where(PaperCandidate.status == st).order_by(desc(PaperCandidate.created_at)).limit(limit)).all()
+    rows = (await session.exec(select(PaperCandidate).where(PaperCandidate.status == st).order_by(desc(PaperCandidate.created_at)).limit(limit))).all()
 
     paper_ids = list({c.paper_id for c in rows})
-    papers = session.exec(select(Paper).where(Paper.id.in_(paper_ids))).all() if paper_ids else []
+    papers = (await session.exec(select(Paper).where(Paper.id.in_(paper_ids)))).all() if paper_ids else []
     paper_by_id = {p.id: p for p in papers}
     return [
         {
@@ -111,11 +162,11 @@ def list_candidates(session: Session = Depends(get_session), status: str = "pend
 
 
 @router.get("/paper_candidates/{candidate_id}")
-def get_candidate(candidate_id: str, session: Session = Depends(get_session)) -> dict:
-    c = session.get(PaperCandidate, candidate_id)
+async def get_candidate(candidate_id: str, session: AsyncSession = Depends(get_async_session)) -> dict:
+    c = await session.get(PaperCandidate, candidate_id)
     if not c:
         raise HTTPException(status_code=404, detail="Candidate not found")
-    paper = session.get(Paper, c.paper_id)
+    paper = await session.get(Paper, c.paper_id)
     return {
         "id": c.id,
         "paperId": c.paper_id,
@@ -129,14 +180,14 @@ def get_candidate(candidate_id: str, session: Session = Depends(get_session)) ->
 
 
 @router.patch("/paper_candidates/{candidate_id}")
-def update_candidate(
+async def update_candidate(
     candidate_id: str,
     payload: dict,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     x_admin_key: str | None = Header(default=None),
 ) -> dict:
     _require_admin(x_admin_key)
-    c = session.get(PaperCandidate, candidate_id)
+    c = await session.get(PaperCandidate, candidate_id)
     if not c:
         raise HTTPException(status_code=404, detail="Candidate not found")
 
@@ -149,14 +200,14 @@ def update_candidate(
         c.proposed_blocks = pb
 
     session.add(c)
-    session.commit()
+    await session.commit()
     return {"id": c.id, "status": c.status.value}
 
 
 @router.post("/paper_candidates/{candidate_id}/propose_stub")
-def propose_stub(
+async def propose_stub(
     candidate_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     x_admin_key: str | None = Header(default=None),
 ) -> dict:
     """
@@ -164,10 +215,10 @@ def propose_stub(
     This exists to demonstrate the human-in-the-loop flow end-to-end.
     """
     _require_admin(x_admin_key)
-    c = session.get(PaperCandidate, candidate_id)
+    c = await session.get(PaperCandidate, candidate_id)
     if not c:
         raise HTTPException(status_code=404, detail="Candidate not found")
-    paper = session.get(Paper, c.paper_id)
+    paper = await session.get(Paper, c.paper_id)
     if not paper:
         raise HTTPException(status_code=404, detail="Paper not found")
 
@@ -192,32 +243,31 @@ def propose_stub(
     c.proposed_blocks = proposed
     c.llm_output = json.dumps(proposed, ensure_ascii=False, indent=2)
     session.add(c)
-    session.commit()
+    await session.commit()
     return {"id": c.id, "status": c.status.value, "proposedBlocks": proposed}
 
 
 @router.post("/paper_candidates/{candidate_id}/materialize_blocks")
-def materialize_blocks(
+async def materialize_blocks(
     candidate_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     x_admin_key: str | None = Header(default=None),
 ) -> dict:
     _require_admin(x_admin_key)
-    c = session.get(PaperCandidate, candidate_id)
+    c = await session.get(PaperCandidate, candidate_id)
     if not c:
         raise HTTPException(status_code=404, detail="Candidate not found")
     if c.status != PaperCandidateStatus.approved:
         raise HTTPException(status_code=400, detail=f"Candidate must be approved to materialize (current={c.status.value})")
 
-    paper = session.get(Paper, c.paper_id)
+    paper = await session.get(Paper, c.paper_id)
     proposed = _parse_proposed_blocks(c)
     items = proposed.get("candidates") or []
     if not isinstance(items, list) or len(items) == 0:
         raise HTTPException(status_code=400, detail="No candidates found in proposedBlocks/llmOutput")
 
-    created: list[dict[str, Any]] = []
-    skipped: list[dict[str, Any]] = []
-
+    # Validate the whole proposal before touching the DB so a bad item can't leave partial blocks behind.
+    parsed: list[dict[str, Any]] = []
     for it in items:
         if not isinstance(it, dict):
             continue
@@ -232,85 +282,120 @@ def materialize_blocks(
         except Exception:
             raise HTTPException(status_code=400, detail=f"Invalid category for {block_id}: {raw_cat}")
 
-        display_name = str(it.get("displayName") or block_id)
-        description = str(it.get("description") or "")
-        version = str(it.get("version") or "0.1.0")
         changelog = str(it.get("changelog") or "")
         if paper and not changelog:
             changelog = f"Generated from paper {paper.arxiv_id}."
 
-        inputs = it.get("inputs") or []
-        outputs = it.get("outputs") or []
-        config_schema = it.get("configSchema") or {"type": "object", "properties": {}, "additionalProperties": True}
+        parsed.append(
+            {
+                "slug": block_id,
+                "category": cat,
+                "displayName": str(it.get("displayName") or block_id),
+                "description": str(it.get("description") or ""),
+                "version": str(it.get("version") or "0.1.0"),
+                "changelog": changelog,
+                "inputs": it.get("inputs") or [],
+                "outputs": it.get("outputs") or [],
+                "configSchema": it.get("configSchema") or {"type": "object", "properties": {}, "additionalProperties": True},
+                "permissions": it.get("permissions") or {"network": False, "filesystem": False, "gpu": False},
+                "tests": it.get("tests") or {"smoke": True},
+            }
+        )
 
-        permissions = it.get("permissions") or {"network": False, "filesystem": False, "gpu": False}
-        tests = it.get("tests") or {"smoke": True}
+    # Two set-based lookups instead of per-item queries.
+    slugs = {p["slug"] for p in parsed}
+    blocks_by_slug: dict[str, Block] = {}
+    for b in (await session.exec(select(Block).where(Block.slug.in_(slugs)).order_by(Block.created_at))).all():
+        blocks_by_slug.setdefault(b.slug, b)
+    pairs = [(blocks_by_slug[p["slug"]].id, p["version"]) for p in parsed if p["slug"] in blocks_by_slug]
+    existing_versions: dict[tuple[str, str], BlockVersion] = {}
+    if pairs:
+        for bv in (await session.exec(select(BlockVersion).where(tuple_(BlockVersion.block_id, BlockVersion.version).in_(pairs)))).all():
+            existing_versions.setdefault((bv.block_id, bv.version), bv)
+
+    now = datetime.utcnow()
+    new_blocks: list[Block] = []
+    new_versions: list[BlockVersion] = []
+    created: list[dict[str, Any]] = []
+    skipped: list[dict[str, Any]] = []
+    seen: set[tuple[str, str]] = set()
 
+    for p in parsed:
         # Ensure block exists; if collision, reuse existing block.
-        block = session.exec(select(Block).where(Block.slug == block_id)).first()
+        block = blocks_by_slug.get(p["slug"])
         if not block:
             block = Block(
-                slug=block_id,
-                category=cat,
-                display_name=display_name,
-                description=description,
-                created_at=datetime.utcnow(),
+                slug=p["slug"],
+                category=p["category"],
+                display_name=p["displayName"],
+                description=p["description"],
+                created_at=now,
             )
-            session.add(block)
-            session.commit()
-            session.refresh(block)
+            blocks_by_slug[block.slug] = block
+            new_blocks.append(block)
 
-        # Avoid creating duplicate versions
-        exists = session.exec(select(BlockVersion).where(BlockVersion.block_id == block.id, BlockVersion.version == version)).first()
+        # Avoid creating duplicate versions (already stored, or repeated within this proposal)
+        version = p["version"]
+        exists = existing_versions.get((block.id, version))
         if exists:
             skipped.append({"blockId": block.slug, "version": version, "reason": "version exists", "blockVersionId": exists.id})
             continue
+        if (block.id, version) in seen:
+            skipped.append({"blockId": block.slug, "version": version, "reason": "duplicate in proposal"})
+            continue
+        seen.add((block.id, version))
 
-        input_schema = config_schema
-        output_schema = {"ports": {"inputs": inputs, "outputs": outputs}}
-        digest = _digest_for(block.slug, version, input_schema, output_schema)
-
+        input_schema = p["configSchema"]
+        output_schema = {"ports": {"inputs": p["inputs"], "outputs": p["outputs"]}}
         bv = BlockVersion(
             block_id=block.id,
             version=version,
             status=BlockVersionStatus.draft,
-            digest=digest,
+            digest=_digest_for(block.slug, version, input_schema, output_schema),
             input_schema=input_schema,
             output_schema=output_schema,
-            changelog=changelog,
-            permissions=permissions,
-            tests=tests,
-            created_at=datetime.utcnow(),
+            changelog=p["changelog"],
+            permissions=p["permissions"],
+            tests=p["tests"],
+            created_at=now,
             published_at=None,
         )
-        session.add(bv)
-        session.commit()
-        session.refresh(bv)
+        new_versions.append(bv)
         created.append({"blockId": block.slug, "version": bv.version, "status": bv.status.value, "digest": bv.digest, "blockVersionId": bv.id})
 
-    return {"candidateId": c.id, "created": created, "skipped": skipped}
+    session.add_all(new_blocks)
+    session.add_all(new_versions)
+    await session.commit()
+
+    return {
+        "candidateId": c.id,
+        "created": created,
+        "skipped": skipped,
+        "createdCount": len(created),
+        "skippedCount": len(skipped),
+    }
 
 
 @router.post("/paper_candidates/{candidate_id}/approve")
-def approve_candidate(candidate_id: str, session: Session = Depends(get_session), x_admin_key: str | None = Header(default=None)) -> dict:
+async def approve_candidate(candidate_id: str, session: AsyncSession = Depends(get_async_session), x_admin_key: str | None = Header(default=None)) -> dict:
     _require_admin(x_admin_key)
-    c = session.get(PaperCandidate, candidate_id)
+    c = await session.get(PaperCandidate, candidate_id)
     if not c:
         raise HTTPException(status_code=404, detail="Candidate not found")
     c.status = PaperCandidateStatus.approved
     session.add(c)
-    session.commit()
+    await session.commit()
     return {"id": c.id, "status": c.status.value, "decidedAt": datetime.utcnow()}
 
 
 @router.post("/paper_candidates/{candidate_id}/reject")
-def reject_candidate(candidate_id: str, session: Session = Depends(get_session), x_admin_key: str | None = Header(default=None)) -> dict:
+async def reject_candidate(candidate_id: str, session: AsyncSession = Depends(get_async_session), x_admin_key: str | None = Header(default=None)) -> dict:
     _require_admin(x_admin_key)
-    c = session.get(PaperCandidate, candidate_id)
+    c = await session.get(PaperCandidate, candidate_id)
     if not c:
         raise HTTPException(status_code=404, detail="Candidate not found")
     c.status = PaperCandidateStatus.rejected
     session.add(c)
-    session.commit()
+    await session.commit()
     return {"id": c.id, "status": c.status.value, "decidedAt": datetime.utcnow()}
 
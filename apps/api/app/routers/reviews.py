@@ -5,9 +5,10 @@ from datetime import datetime
 from typing import Any
 
 from fastapi import APIRouter, Depends, Header, HTTPException
-from sqlmodel import Session, select
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.db import get_session
+from app.db import get_async_session
 from app.models import (
     Block,
     BlockVersion,
@@ -28,13 +29,13 @@ def _require_admin(x_admin_key: str | None) -> None:
 
 
 @router.post("/block_versions/{block_version_id}/submit")
-def submit_block_version_for_review(
+async def submit_block_version_for_review(
     block_version_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     x_admin_key: str | None = Header(default=None),
 ) -> dict[str, Any]:
     _require_admin(x_admin_key)
-    bv = session.get(BlockVersion, block_version_id)
+    bv = await session.get(BlockVersion, block_version_id)
     if not bv:
         raise HTTPException(status_code=404, detail="Block version not found")
     if bv.status not in (BlockVersionStatus.draft,):
@@ -42,7 +43,7 @@ def submit_block_version_for_review(
 
     bv.status = BlockVersionStatus.pending_review
     session.add(bv)
-    session.commit()
+    await session.commit()
 
     review = Review(
         target_type=ReviewTargetType.block_version,
@@ -51,21 +52,21 @@ def submit_block_version_for_review(
         created_at=datetime.utcnow(),
     )
     session.add(review)
-    session.commit()
-    session.refresh(review)
+    await session.commit()
+    await session.refresh(review)
 
     return {"reviewId": review.id, "blockVersionId": bv.id, "status": bv.status.value}
 
 
 @router.post("/{review_id}/approve")
-def approve_review(
+async def approve_review(
     review_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     x_admin_key: str | None = Header(default=None),
     notes: str = "",
 ) -> dict[str, Any]:
     _require_admin(x_admin_key)
-    review = session.get(Review, review_id)
+    review = await session.get(Review, review_id)
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
     if review.state != ReviewState.pending:
@@ -77,25 +78,25 @@ def approve_review(
     session.add(review)
 
     if review.target_type == ReviewTargetType.block_version:
-        bv = session.get(BlockVersion, review.target_id)
+        bv = await session.get(BlockVersion, review.target_id)
         if not bv:
             raise HTTPException(status_code=404, detail="Target block version not found")
         bv.status = BlockVersionStatus.approved
         session.add(bv)
 
-    session.commit()
+    await session.commit()
     return {"reviewId": review.id, "state": review.state.value}
 
 
 @router.post("/{review_id}/reject")
-def reject_review(
+async def reject_review(
     review_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     x_admin_key: str | None = Header(default=None),
     notes: str = "",
 ) -> dict[str, Any]:
     _require_admin(x_admin_key)
-    review = session.get(Review, review_id)
+    review = await session.get(Review, review_id)
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
     if review.state != ReviewState.pending:
@@ -107,23 +108,23 @@ def reject_review(
     session.add(review)
 
     if review.target_type == ReviewTargetType.block_version:
-        bv = session.get(BlockVersion, review.target_id)
+        bv = await session.get(BlockVersion, review.target_id)
         if bv:
             bv.status = BlockVersionStatus.draft
             session.add(bv)
 
-    session.commit()
+    await session.commit()
     return {"reviewId": review.id, "state": review.state.value}
 
 
 @router.post("/block_versions/{block_version_id}/publish")
-def publish_block_version(
+async def publish_block_version(
     block_version_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     x_admin_key: str | None = Header(default=None),
 ) -> dict[str, Any]:
     _require_admin(x_admin_key)
-    bv = session.get(BlockVersion, block_version_id)
+    bv = await session.get(BlockVersion, block_version_id)
     if not bv:
         raise HTTPException(status_code=404, detail="Block version not found")
     if bv.status != BlockVersionStatus.approved:
@@ -131,22 +132,22 @@ def publish_block_version(
     bv.status = BlockVersionStatus.published
     bv.published_at = datetime.utcnow()
     session.add(bv)
-    session.commit()
+    await session.commit()
     return {"blockVersionId": bv.id, "status": bv.status.value, "publishedAt": bv.published_at}
 
 
 @router.post("/block_versions/{block_version_id}/deprecate")
-def deprecate_block_version(
+async def deprecate_block_version(
     block_version_id: str,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_async_session),
     x_admin_key: str | None = Header(default=None),
 ) -> dict[str, Any]:
     _require_admin(x_admin_key)
-    bv = session.get(BlockVersion, block_version_id)
+    bv = await session.get(BlockVersion, block_version_id)
     if not bv:
         raise HTTPException(status_code=404, detail="Block version not found")
     bv.status = BlockVersionStatus.deprecated
     session.add(bv)
-    session.commit()
+    await session.commit()
     return {"blockVersionId": bv.id, "status": bv.status.value}
 
@@ -1,101 +1,293 @@
 from __future__ import annotations
 
+import asyncio
+import json
+from contextlib import aclosing
 from datetime import datetime
+from functools import partial
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlmodel import Session, desc, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.db import get_session
-from app.models import Block, BlockVersion, BlockVersionStatus, PipelineRun, RunStatus
-from app.runner.toy_runner import collect_runtime_env, run_toy_pipeline
-from app.schemas.pipeline import RunCreateRequest, RunCreateResponse, RunListItem
-from app.tasks.celery_app import celery_app
+from app.admission import ADMISSION_DEMOTE_TO_ASYNC, AdmissionRejected, overloaded, run_admission
+from app.db import async_engine, engine, get_async_session, get_session
+from app.events import FINISHED, publish, subscribe, wait_any
+from app.executors import run_cpu_releasing
+from app.heartbeat import Heartbeat, owned_by, owner_id, store_result
+from app.export import MEDIA_TYPES, export_runs
+from app.leaderboard import leaderboard_cache, set_run_metrics
+from app.models import PipelineRun, RunKind, RunStatus
+from app.queues import (
+    CLIENT_MAX_ACTIVE_RUNS,
+    INTERACTIVE_MAX_COST,
+    QUEUE_BATCH,
+    active_runs,
+    client_key,
+    lock_client,
+    queue_depths,
+    queue_for_cost,
+)
+from app.runner.cost import estimate_cost
+from app.schemas.pipeline import (
+    PipelineSpec,
+    PredictRequest,
+    PredictResponse,
+    RunCreateRequest,
+    RunCreateResponse,
+    RunListItem,
+    RunStatusItem,
+    RunStatusResponse,
+    SweepCreateRequest,
+    SweepCreateResponse,
+)
+from app.storage import artifact_store
+from app.tasks import send_task
+from app.validation import canonicalize_locked_blocks, lock_and_validate, validate_node_configs
+
+
+if TYPE_CHECKING:
+    from app.runner.inference import WarmModel
+
+# numpy / scikit-learn (app.runner.*) and Celery are imported inside the handlers that need
+# them, so processes serving only reads do not load them
 
 
 router = APIRouter(prefix="/runs", tags=["runs"])
 
-def _canonicalize_locked_blocks(session: Session, locked_blocks: list) -> dict:
-    """
-    Validate that lockedBlocks exist and digest matches a published version.
-    Return a canonical payload suitable for persistence.
-    """
-    out = []
-    for lb in locked_blocks:
-        block = session.exec(select(Block).where(Block.slug == lb.blockId)).first()
-        if not block:
-            raise ValueError(f"Unknown blockId in lockedBlocks: {lb.blockId}")
-        bv = session.exec(
-            select(BlockVersion).where(
-                BlockVersion.block_id == block.id,
-                BlockVersion.version == lb.version,
-            )
-        ).first()
-        if not bv:
-            raise ValueError(f"Unknown block version: {lb.blockId}@{lb.version}")
-        if bv.digest != lb.digest:
-            raise ValueError(f"Digest mismatch for {lb.blockId}@{lb.version}: expected {bv.digest}, got {lb.digest}")
-        if bv.status not in (BlockVersionStatus.published, BlockVersionStatus.deprecated):
-            raise ValueError(f"Locked block version not published: {lb.blockId}@{lb.version} ({bv.status.value})")
-
-        out.append(
-            {
-                "blockId": block.slug,
-                "version": bv.version,
-                "digest": bv.digest,
-                "inputSchema": bv.input_schema,
-                "outputSchema": bv.output_schema,
-                "changelog": bv.changelog,
-                "deprecated": bv.status == BlockVersionStatus.deprecated,
-                "permissions": bv.permissions,
-                "tests": bv.tests,
-            }
+STATUS_MAX_IDS = 200
+STATUS_MAX_WAIT_SEC = 60.0
+# re-read statuses at least this often while waiting, in case an event never arrives
+STATUS_RECHECK_SEC = 5.0
+
+
+def _check_fair_share(session: Session, client_id: str) -> None:
+    """Lock the client, then count; the caller inserts its run(s) in the same transaction."""
+    lock_client(session, client_id)
+    active = active_runs(session, client_id)
+    if active >= CLIENT_MAX_ACTIVE_RUNS:
+        raise HTTPException(
+            status_code=429,
+            detail={"message": "Too many active runs for this client", "active": active, "limit": CLIENT_MAX_ACTIVE_RUNS},
+            headers={"Retry-After": "10"},
         )
-    return {"lockedBlocks": out}
 
 
 @router.post("", response_model=RunCreateResponse)
-def create_run(req: RunCreateRequest, session: Session = Depends(get_session)) -> RunCreateResponse:
-    try:
-        locked_blocks = _canonicalize_locked_blocks(session, req.spec.lockedBlocks)
-    except Exception as e:
-        raise HTTPException(status_code=400, detail={"message": "Invalid lockedBlocks", "error": str(e)})
+async def create_run(
+    req: RunCreateRequest,
+    request: Request,
+    x_client_id: str | None = Header(default=None),
+) -> RunCreateResponse:
+    locked_blocks = await run_in_threadpool(lock_and_validate, req.spec)
+
+    is_async = req.spec.runConfig.mode == "async"
+    client_id = client_key(x_client_id, request.client.host if request.client else None)
+    cost = estimate_cost(req.spec)
+    if not is_async:
+        try:
+            slot = await run_admission.acquire()
+        except AdmissionRejected as e:
+            if not ADMISSION_DEMOTE_TO_ASYNC:
+                raise overloaded(e, "sync run")
+            # demoted: fall through to the async path; the client polls like any async run
+        else:
+            # released when the thread finishes, not when a client disconnect cancels this await
+            release = partial(run_admission.release, slot)
+            return await run_cpu_releasing(release, _run_inline, req, client_id, cost, locked_blocks)
+
+    return await run_in_threadpool(_enqueue_run, req, client_id, cost, locked_blocks)
 
+
+def _enqueue_run(req: RunCreateRequest, client_id: str, cost: float, locked_blocks: dict) -> RunCreateResponse:
+    from app.runner.toy_runner import collect_runtime_env
+
+    with Session(engine) as session:
+        _check_fair_share(session, client_id)
+        queue_name = queue_for_cost(cost)
+        run = PipelineRun(
+            status=RunStatus.queued,
+            client_id=client_id,
+            queue_name=queue_name,
+            cost_estimate=cost,
+            # Ensure JSON-serializable (e.g. datetime -> ISO string) for DB JSON columns.
+            spec=req.spec.model_dump(by_alias=True, mode="json"),
+            locked_blocks=locked_blocks,
+            runtime_env=collect_runtime_env(),
+        )
+        session.add(run)
+        session.commit()
+        session.refresh(run)
+
+    # one drain per queued run: whichever worker gets it claims a batch of its queue's runs,
+    # so bursts of similar runs share dataset/encoder work; messages that find nothing exit
+    send_task("app.tasks.run_pipeline.run_toy_batch", kwargs={"queue_name": queue_name}, queue=queue_name)
+    return RunCreateResponse(runId=run.id, status=run.status.value, metrics=None)
+
+
+def _run_inline(req: RunCreateRequest, client_id: str, cost: float, locked_blocks: dict) -> RunCreateResponse:
+    with Session(engine) as session:
+        return _execute_inline(req, session, client_id, cost, locked_blocks)
+
+
+def _execute_inline(req: RunCreateRequest, session: Session, client_id: str, cost: float, locked_blocks: dict) -> RunCreateResponse:
+    from app.runner.execute import execute_spec
+    from app.runner.toy_runner import collect_runtime_env
+
+    now = datetime.utcnow()
+    owner = owner_id("api")
     run = PipelineRun(
-        status=RunStatus.queued if req.spec.runConfig.mode == "async" else RunStatus.running,
-        # Ensure JSON-serializable (e.g. datetime -> ISO string) for DB JSON columns.
+        status=RunStatus.running,
+        client_id=client_id,
+        cost_estimate=cost,
         spec=req.spec.model_dump(by_alias=True, mode="json"),
         locked_blocks=locked_blocks,
         runtime_env=collect_runtime_env(),
-        started_at=datetime.utcnow() if req.spec.runConfig.mode != "async" else None,
+        started_at=now,
+        # if this process dies mid-run, the reaper hands the run to the async queues
+        claimed_by=owner,
+        heartbeat_at=now,
+        attempts=1,
     )
     session.add(run)
     session.commit()
     session.refresh(run)
 
-    if req.spec.runConfig.mode == "async":
-        celery_app.send_task("app.tasks.run_pipeline.run_toy", args=[run.id])
-        return RunCreateResponse(runId=run.id, status=run.status.value, metrics=None)
-
+    publish(run.id, "started")
+    metrics: dict[str, Any] = {}
     try:
-        metrics = run_toy_pipeline(req.spec)
-        run.metrics = metrics
+        artifacts: dict = {}
+        with Heartbeat([run.id], owner):
+            metrics = execute_spec(req.spec, artifacts=artifacts, progress=partial(publish, run.id))
+        set_run_metrics(run, metrics)
+        run.artifacts = artifact_store.put_many(artifacts)
         run.status = RunStatus.succeeded
-        run.finished_at = datetime.utcnow()
-        session.add(run)
-        session.commit()
-        return RunCreateResponse(runId=run.id, status=run.status.value, metrics=metrics)
     except Exception as e:
         run.status = RunStatus.failed
         run.error = str(e)
-        run.finished_at = datetime.utcnow()
-        session.add(run)
+    run.finished_at = datetime.utcnow()
+    run_id = run.id
+    if not store_result(session, run, owned_by(run_id, owner)):
+        # the reaper handed the run to the async queues meanwhile; its result is theirs to write
+        session.rollback()
+        current = session.get(PipelineRun, run_id)
+        status = current.status.value if current else RunStatus.queued.value
+        return RunCreateResponse(runId=run_id, status=status, metrics=None)
+    session.commit()
+    publish(run.id, FINISHED, status=run.status.value, error=run.error or None)
+    if run.status == RunStatus.failed:
+        raise HTTPException(status_code=400, detail={"message": "Run failed", "error": run.error, "runId": run.id})
+    return RunCreateResponse(runId=run.id, status=run.status.value, metrics=metrics)
+
+
+def _prepare_sweep(req: SweepCreateRequest) -> tuple[list[tuple[dict[str, Any], PipelineSpec]], dict]:
+    from app.runner.sweep import expand_grid
+
+    with Session(engine) as session:
+        try:
+            locked_blocks = canonicalize_locked_blocks(session, req.spec.lockedBlocks)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail={"message": "Invalid lockedBlocks", "error": str(e)})
+    try:
+        points = expand_grid(req.spec, req.grid)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail={"message": "Invalid sweep grid", "error": str(e)})
+
+    for params, child in points:
+        config_errors = validate_node_configs(child, locked_blocks)
+        if config_errors:
+            raise HTTPException(status_code=400, detail={"message": "Invalid sweep point", "params": params, "errors": config_errors})
+    return points, locked_blocks
+
+
+@router.post("/sweep", response_model=SweepCreateResponse)
+async def create_sweep(
+    req: SweepCreateRequest,
+    request: Request,
+    x_client_id: str | None = Header(default=None),
+) -> SweepCreateResponse:
+    """
+    Expand `grid` over the base spec into child runs under one sweep run.
+
+    Children that share an upstream (dataset/encoders/fusion/seed) reuse its computed stages.
+    """
+    points, locked_blocks = await run_in_threadpool(_prepare_sweep, req)
+
+    is_async = req.spec.runConfig.mode == "async"
+    client_id = client_key(x_client_id, request.client.host if request.client else None)
+    if is_async:
+        return await run_in_threadpool(_start_sweep, req, points, locked_blocks, client_id, True)
+    try:
+        slot = await run_admission.acquire()
+    except AdmissionRejected as e:
+        if not ADMISSION_DEMOTE_TO_ASYNC:
+            raise overloaded(e, "sync run")
+        return await run_in_threadpool(_start_sweep, req, points, locked_blocks, client_id, True)
+    release = partial(run_admission.release, slot)
+    return await run_cpu_releasing(release, _start_sweep, req, points, locked_blocks, client_id, False)
+
+
+def _start_sweep(
+    req: SweepCreateRequest,
+    points: list[tuple[dict[str, Any], PipelineSpec]],
+    locked_blocks: dict,
+    client_id: str,
+    is_async: bool,
+) -> SweepCreateResponse:
+    from app.runner.toy_runner import collect_runtime_env
+
+    with Session(engine) as session:
+        if is_async:
+            _check_fair_share(session, client_id)
+        runtime_env = collect_runtime_env()
+        parent = PipelineRun(
+            kind=RunKind.sweep,
+            status=RunStatus.queued,
+            client_id=client_id,
+            queue_name=QUEUE_BATCH if is_async else "",
+            cost_estimate=sum(estimate_cost(child) for _, child in points),
+            spec=req.spec.model_dump(by_alias=True, mode="json"),
+            locked_blocks=locked_blocks,
+            runtime_env=runtime_env,
+        )
+        session.add(parent)
+        session.flush()
+        children = [
+            PipelineRun(
+                status=RunStatus.queued,
+                parent_run_id=parent.id,
+                spec=child.model_dump(by_alias=True, mode="json"),
+                locked_blocks=locked_blocks,
+                runtime_env=runtime_env,
+            )
+            for _, child in points
+        ]
+        session.add_all(children)
+        session.flush()
+        parent.metrics = {
+            "sweep": {"grid": req.grid, "points": [{"runId": c.id, "params": p} for c, (p, _) in zip(children, points)]}
+        }
+        session.add(parent)
         session.commit()
-        raise HTTPException(status_code=400, detail={"message": "Run failed", "error": str(e), "runId": run.id})
+        child_ids = [c.id for c in children]
+
+        if is_async:
+            send_task("app.tasks.run_pipeline.run_sweep", args=[parent.id])
+            return SweepCreateResponse(sweepId=parent.id, status=parent.status.value, childRunIds=child_ids)
+
+        from app.tasks.run_pipeline import execute_sweep
+
+        table = execute_sweep(session, parent, owner_id("api"))
+        return SweepCreateResponse(sweepId=parent.id, status=parent.status.value, childRunIds=child_ids, table=table)
 
 
 @router.get("", response_model=list[RunListItem])
-def list_runs(session: Session = Depends(get_session), limit: int = 50) -> list[RunListItem]:
-    rows = session.exec(select(PipelineRun).order_by(desc(PipelineRun.created_at)).limit(limit)).all()
+async def list_runs(session: AsyncSession = Depends(get_async_session), limit: int = 50) -> list[RunListItem]:
+    rows = (await session.exec(select(PipelineRun).order_by(desc(PipelineRun.created_at)).limit(limit))).all()
     return [
         RunListItem(
             runId=r.id,
@@ -108,13 +300,100 @@ def list_runs(session: Session = Depends(get_session), limit: int = 50) -> list[
     ]
 
 
+@router.get("/leaderboard")
+def leaderboard(session: Session = Depends(get_session)) -> dict:
+    """
+    Pareto frontier of succeeded runs: max accuracy, min paramCount, min accuracyDrop.
+
+    Recomputed only when a run finishes (or the set of ranked runs otherwise changes).
+    """
+    return leaderboard_cache.get(session)
+
+
+async def _run_statuses(run_ids: list[str]) -> list[RunStatusItem]:
+    async with AsyncSession(async_engine) as session:
+        rows = (
+            await session.exec(
+                select(
+                    PipelineRun.id,
+                    PipelineRun.status,
+                    PipelineRun.created_at,
+                    PipelineRun.started_at,
+                    PipelineRun.finished_at,
+                    PipelineRun.metrics,
+                ).where(PipelineRun.id.in_(run_ids))
+            )
+        ).all()
+    return [
+        RunStatusItem(runId=r[0], status=r[1].value, createdAt=r[2], startedAt=r[3], finishedAt=r[4], metrics=r[5] or {})
+        for r in rows
+    ]
+
+
+@router.get("/status", response_model=RunStatusResponse)
+async def run_statuses(ids: str = Query(min_length=1), wait: float = Query(default=0, ge=0)) -> RunStatusResponse:
+    """
+    Status, timestamps and metrics for several runs in one query (`ids` is comma-separated).
+
+    With `wait`, the request is held until any listed run changes status or `wait` seconds
+    pass; wake-ups come from run events, with a periodic re-read as a fallback.
+    """
+    run_ids = list(dict.fromkeys(i.strip() for i in ids.split(",") if i.strip()))
+    if len(run_ids) > STATUS_MAX_IDS:
+        raise HTTPException(status_code=400, detail={"message": f"At most {STATUS_MAX_IDS} ids per request"})
+
+    runs = await _run_statuses(run_ids)
+    missing = sorted(set(run_ids) - {r.runId for r in runs})
+    if wait <= 0:
+        return RunStatusResponse(runs=runs, missing=missing)
+
+    baseline = {r.runId: r.status for r in runs}
+    watched = [r.runId for r in runs if r.status not in (RunStatus.succeeded.value, RunStatus.failed.value)]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + min(wait, STATUS_MAX_WAIT_SEC)
+    while watched and (remaining := deadline - loop.time()) > 0:
+        await wait_any(watched, min(remaining, STATUS_RECHECK_SEC))
+        runs = await _run_statuses(run_ids)
+        if any(baseline.get(r.runId) != r.status for r in runs):
+            return RunStatusResponse(runs=runs, changed=True, missing=missing)
+    return RunStatusResponse(runs=runs, changed=False, missing=missing)
+
+
+@router.get("/queues")
+def run_queues(session: Session = Depends(get_session)) -> dict:
+    """Queued / running async runs per queue, plus the routing and fair-share limits."""
+    return {
+        "queues": queue_depths(session),
+        "interactiveMaxCost": INTERACTIVE_MAX_COST,
+        "clientMaxActiveRuns": CLIENT_MAX_ACTIVE_RUNS,
+    }
+
+
+@router.get("/export")
+def export(
+    format: Literal["arrow", "parquet"] = "arrow",
+    status: Optional[list[RunStatus]] = Query(default=None),
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    include_spec: bool = False,
+) -> StreamingResponse:
+    """Bulk export of runs as an Arrow IPC stream or a Parquet file, streamed in chunks."""
+    return StreamingResponse(
+        export_runs(format, status, created_after, created_before, include_spec),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="runs.{format}"'},
+    )
+
+
 @router.get("/{run_id}")
-def get_run(run_id: str, session: Session = Depends(get_session)) -> dict:
-    run = session.get(PipelineRun, run_id)
+async def get_run(run_id: str, session: AsyncSession = Depends(get_async_session)) -> dict:
+    run = await session.get(PipelineRun, run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
     return {
         "runId": run.id,
+        "kind": run.kind.value,
+        "parentRunId": run.parent_run_id,
         "status": run.status.value,
         "startedAt": run.started_at,
         "finishedAt": run.finished_at,
@@ -122,6 +401,127 @@ def get_run(run_id: str, session: Session = Depends(get_session)) -> dict:
         "lockedBlocks": run.locked_blocks,
         "runtimeEnv": run.runtime_env,
         "metrics": run.metrics,
+        "artifacts": run.artifacts,
         "error": run.error,
     }
 
+
+async def _run_state(run_id: str) -> Optional[tuple[RunStatus, str]]:
+    async with AsyncSession(async_engine) as session:
+        row = (await session.exec(select(PipelineRun.status, PipelineRun.error).where(PipelineRun.id == run_id))).first()
+        return (row[0], row[1]) if row else None
+
+
+def _sse(event: dict) -> str:
+    return f"id: {event.get('seq', 0)}\nevent: {event['stage']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+@router.get("/{run_id}/events")
+async def run_events(run_id: str, request: Request) -> StreamingResponse:
+    """
+    Server-Sent Events with the run's stage progress, ending with a `finished` event.
+
+    Runs that are already over get a single `finished` event. On every keep-alive the run's
+    status is re-checked, so the stream also ends if its events never reach this process.
+    """
+    state = await _run_state(run_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    terminal = (RunStatus.succeeded, RunStatus.failed)
+
+    def finished(status: RunStatus, error: str) -> str:
+        return _sse({"runId": run_id, "stage": FINISHED, "status": status.value, "error": error or None})
+
+    async def stream():
+        if state[0] in terminal:
+            yield finished(*state)
+            return
+        async with aclosing(subscribe(run_id)) as events:
+            async for event in events:
+                if event is not None:
+                    yield _sse(event)
+                    if event["stage"] == FINISHED:
+                        return
+                    continue
+                if await request.is_disconnected():
+                    return
+                current = await _run_state(run_id)
+                if current is None or current[0] in terminal:
+                    if current is not None:
+                        yield finished(*current)
+                    return
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{run_id}/artifacts")
+async def list_run_artifacts(run_id: str, session: AsyncSession = Depends(get_async_session)) -> dict:
+    run = await session.get(PipelineRun, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    return {"runId": run.id, **(run.artifacts or {"items": {}})}
+
+
+@router.get("/{run_id}/artifacts/{name}")
+def download_run_artifact(run_id: str, name: str, session: Session = Depends(get_session)) -> FileResponse:
+    """
+    Stream one stored artifact (.npz). FileResponse honours `Range` headers, so large
+    embeddings can be fetched in pieces or resumed.
+    """
+    run = session.get(PipelineRun, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found")
+    item = ((run.artifacts or {}).get("items") or {}).get(name)
+    if not item:
+        raise HTTPException(status_code=404, detail="Artifact not found")
+    path = artifact_store.path_for(item["digest"])
+    if not path.exists():
+        raise HTTPException(status_code=410, detail="Artifact missing from store")
+    return FileResponse(
+        path,
+        media_type="application/octet-stream",
+        filename=f"{run.id}-{name}.npz",
+        headers={"ETag": f'"{item["digest"]}"', "Cache-Control": "private, max-age=31536000, immutable"},
+    )
+
+
+def _load_run_model(run_id: str) -> WarmModel:
+    from app.runner.inference import load_warm_model
+
+    with Session(engine) as session:
+        run = session.get(PipelineRun, run_id)
+        if not run:
+            raise LookupError("Run not found")
+        if run.status != RunStatus.succeeded:
+            raise ValueError(f"Run has not succeeded (status={run.status.value})")
+        return load_warm_model(run.id, PipelineSpec.model_validate(run.spec), run.artifacts)
+
+
+@router.post("/{run_id}/predict", response_model=PredictResponse)
+async def predict(run_id: str, req: PredictRequest) -> PredictResponse:
+    """
+    Score new inputs with a finished run's encoders + classifier.
+
+    Models stay warm in an LRU; concurrent calls are micro-batched into one forward pass.
+    """
+    inference = await run_in_threadpool(import_module, "app.runner.inference")
+    import numpy as np  # already loaded by app.runner.inference
+
+    try:
+        batcher = await inference.warm_models.get(run_id, lambda: run_in_threadpool(_load_run_model, run_id))
+    except LookupError:
+        raise HTTPException(status_code=404, detail="Run not found")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail={"message": "Model unavailable", "error": str(e)})
+
+    try:
+        modalities = {k: np.atleast_2d(np.asarray(v, dtype=np.float32)) for k, v in req.modalities.items()}
+        scores, labels = await batcher.submit(modalities)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail={"message": "Predict failed", "error": str(e)})
+    return PredictResponse(runId=run_id, predictions=labels.tolist(), scores=scores.tolist())
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from typing import Any
+
+from app.schemas.pipeline import PipelineSpec
+
+
+def _encoded_dim(node: Any, in_dim: int) -> int:
+    if node is not None and node.blockRef.blockId == "unimodals.linear":
+        return int((node.config or {}).get("outDim", 16))
+    return in_dim
+
+
+def estimate_cost(spec: PipelineSpec) -> float:
+    """
+    Rough work units for a run: samples x fused features x SGD epochs, times replicates/folds.
+
+    Only used to route runs between queues, so it mirrors the runner's defaults rather than
+    being exact; an unparseable config simply counts as default-sized.
+    """
+    nodes = spec.graph.nodes
+    dataset = next((n for n in nodes if n.type == "dataset"), None)
+    trainer = next((n for n in nodes if n.type == "trainer"), None)
+    encoders = [n for n in nodes if n.type == "encoder"][:2]
+    ds_cfg = (dataset.config if dataset else None) or {}
+    try:
+        n = int(ds_cfg.get("n", 800))
+        dims = [int(ds_cfg.get("audioDim", 20)), int(ds_cfg.get("visionDim", 30))]
+        max_iter = int(((trainer.config if trainer else None) or {}).get("maxIter", 300))
+    except (TypeError, ValueError):
+        n, dims, max_iter = 800, [20, 30], 300
+    fused = sum(_encoded_dim(encoders[i] if i < len(encoders) else None, d) for i, d in enumerate(dims))
+    # encoding is one pass over the inputs; training is up to max_iter passes over the fused features
+    work = n * sum(dims) + n * fused * max_iter
+    fan_out = spec.runConfig.cvFolds or spec.runConfig.replicates
+    return float(work * max(1, fan_out))
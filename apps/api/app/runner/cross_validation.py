@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import numpy as np
+from sklearn.metrics import accuracy_score
+
+from app.dataloading.registry import load_folds
+from app.dataloading.types import fold_split
+from app.runner.replicates import summarize_metrics
+from app.runner.toy_runner import (
+    _apply_fusion,
+    _encode,
+    _encoder_params,
+    _fit_classifier,
+    _model_param_count,
+    _param_count,
+    _select_nodes,
+)
+from app.schemas.pipeline import PipelineSpec
+
+
+CV_WORKERS = int(os.getenv("CV_WORKERS", "0")) or (os.cpu_count() or 1)
+
+
+def run_cross_validation(spec: PipelineSpec) -> dict[str, Any]:
+    """
+    k-fold cross-validation over a single generated dataset.
+
+    Encoders have fixed (seeded) weights, so clean and noisy inputs are encoded once for all rows.
+    Each fold predicts on a slice of those shared read-only matrices and trains on one joined copy
+    of the remaining rows (SGD would copy them to float64 anyway). Folds are fitted on a thread
+    pool: they share memory without pickling, and SGD / BLAS release the GIL.
+    """
+    seed = int(spec.runConfig.seed)
+    k = int(spec.runConfig.cvFolds or 0)
+    nodes = _select_nodes(spec)
+
+    folds = load_folds(dataset_block_id=nodes.dataset.blockRef.blockId, seed=seed, config=nodes.dataset.config, k=k)
+    x_a = folds.data.get_modality(nodes.key_a)
+    x_v = folds.data.get_modality(nodes.key_v)
+    y = folds.data.labels
+    if y is None:
+        raise ValueError("Dataset did not provide labels for supervised training.")
+
+    slug_a, slug_v = nodes.enc_a.blockRef.blockId, nodes.enc_v.blockRef.blockId
+    a_weights = _encoder_params(slug_a, seed, x_a.shape[1], nodes.enc_a.config, salt=101)
+    v_weights = _encoder_params(slug_v, seed, x_v.shape[1], nodes.enc_v.config, salt=202)
+
+    def fuse(xa: np.ndarray, xv: np.ndarray) -> np.ndarray:
+        out = _apply_fusion(nodes.fusion.blockRef.blockId, _encode(slug_a, xa, a_weights), _encode(slug_v, xv, v_weights))
+        out.setflags(write=False)
+        return out
+
+    noise_std = float(nodes.evaluator.config.get("noiseStd", 0.2))
+    rng2 = np.random.default_rng(seed + 999)
+    x_all = fuse(x_a, x_v)
+    nx_all = fuse(
+        x_a + rng2.normal(scale=noise_std, size=x_a.shape).astype(np.float32),
+        x_v + rng2.normal(scale=noise_std, size=x_v.shape).astype(np.float32),
+    )
+    enc_params = _param_count(slug_a, a_weights) + _param_count(slug_v, v_weights)
+
+    def fit_fold(fold: tuple[int, int]) -> dict[str, Any]:
+        x_tr, x_te = fold_split(x_all, fold)
+        y_tr, y_te = fold_split(y, fold)
+        clf, train_ms = _fit_classifier(x_tr, y_tr, nodes.trainer.config, seed)
+        acc = float(accuracy_score(y_te, clf.predict(x_te)))
+        noisy_acc = float(accuracy_score(y_te, clf.predict(nx_all[fold[0] : fold[1]])))
+        return {
+            "performance": {"accuracy": acc},
+            "complexity": {"paramCount": int(enc_params + _model_param_count(clf, x_all.shape[1])), "trainTimeMs": train_ms},
+            "robustness": {"noiseStd": noise_std, "noisyAccuracy": noisy_acc, "accuracyDrop": acc - noisy_acc},
+        }
+
+    with ThreadPoolExecutor(max_workers=max(1, min(k, CV_WORKERS))) as pool:
+        per_fold = list(pool.map(fit_fold, folds.folds))
+
+    metrics, agg = summarize_metrics(per_fold)
+    metrics["crossValidation"] = {
+        "k": k,
+        "confidence": 0.95,
+        "perFold": [{"fold": i, "testSize": stop - start, "metrics": m} for i, ((start, stop), m) in enumerate(zip(folds.folds, per_fold))],
+        "aggregate": agg,
+    }
+    return metrics
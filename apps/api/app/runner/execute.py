@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+from typing import Any, Optional
+
+from app.runner.cross_validation import run_cross_validation
+from app.runner.replicates import run_replicates
+from app.runner.stage_cache import StageCache
+from app.runner.toy_runner import ProgressFn, run_toy_pipeline
+from app.schemas.pipeline import PipelineSpec
+
+
+def execute_spec(
+    spec: PipelineSpec,
+    artifacts: Optional[dict] = None,
+    cache: Optional[StageCache] = None,
+    progress: Optional[ProgressFn] = None,
+) -> dict[str, Any]:
+    """
+    Single entrypoint for run execution; picks the strategy from `runConfig`.
+
+    Cross-validation produces k fold models rather than one, so it stores no artifacts. `cache`
+    (shared upstream outputs) and `progress` (stage events) only apply to single-seed runs;
+    replicates/folds fan out instead.
+    """
+    if spec.runConfig.cvFolds:
+        return run_cross_validation(spec)
+    if spec.runConfig.replicates > 1:
+        return run_replicates(spec, artifacts=artifacts)
+    return run_toy_pipeline(spec, artifacts=artifacts, cache=cache, progress=progress)
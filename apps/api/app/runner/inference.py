@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import asyncio
+import os
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable
+
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+
+from app.executors import cpu_executor
+from app.runner.toy_runner import _apply_fusion, _encode
+from app.schemas.pipeline import PipelineSpec
+from app.storage import artifact_store
+
+
+PREDICT_CACHE_SIZE = int(os.getenv("PREDICT_CACHE_SIZE", "8"))
+PREDICT_BATCH_WINDOW_MS = float(os.getenv("PREDICT_BATCH_WINDOW_MS", "5"))
+PREDICT_MAX_BATCH = int(os.getenv("PREDICT_MAX_BATCH", "512"))
+_IDLE_EXIT_S = 30.0
+
+
+@dataclass
+class WarmModel:
+    """A trained run's encoders + classifier, loaded from the artifact store once."""
+
+    run_id: str
+    slug_a: str
+    slug_v: str
+    key_a: str
+    key_v: str
+    fusion_slug: str
+    a_weights: dict[str, np.ndarray]
+    v_weights: dict[str, np.ndarray]
+    clf: SGDClassifier
+
+    def score(self, modalities: dict[str, np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+        if self.key_a not in modalities or self.key_v not in modalities:
+            raise KeyError(f"Inputs must include modalities '{self.key_a}' and '{self.key_v}'")
+        a = _encode(self.slug_a, modalities[self.key_a], self.a_weights)
+        v = _encode(self.slug_v, modalities[self.key_v], self.v_weights)
+        x = _apply_fusion(self.fusion_slug, a, v)
+        scores = self.clf.decision_function(x)
+        return scores, self.clf.classes_[self._argmax(scores)]
+
+    @staticmethod
+    def _argmax(scores: np.ndarray) -> np.ndarray:
+        # binary decision_function is 1-D (positive class score)
+        if scores.ndim == 1:
+            return (scores > 0).astype(np.int64)
+        return scores.argmax(axis=1)
+
+
+def load_warm_model(run_id: str, spec: PipelineSpec, manifest: dict[str, Any]) -> WarmModel:
+    items = (manifest or {}).get("items") or {}
+    if "classifier" not in items or "encoders" not in items:
+        raise ValueError("Run has no stored model artifacts")
+
+    nodes = spec.graph.nodes
+    encoders = [n for n in nodes if n.type == "encoder"]
+    fusion = next((n for n in nodes if n.type == "fusion"), None)
+    if len(encoders) < 2 or not fusion:
+        raise ValueError("MVP predict expects 2 encoders + fusion.")
+
+    def modality_key(n: Any, default: str) -> str:
+        k = (n.config or {}).get("modalityKey", default)
+        return k if isinstance(k, str) and k else default
+
+    cls = artifact_store.load(items["classifier"]["digest"])
+    enc = artifact_store.load(items["encoders"]["digest"])
+
+    clf = SGDClassifier(loss="log_loss")
+    clf.coef_ = cls["coef"]
+    clf.intercept_ = cls["intercept"]
+    clf.classes_ = cls["classes"]
+    clf.n_features_in_ = int(cls["coef"].shape[1])
+
+    return WarmModel(
+        run_id=run_id,
+        slug_a=encoders[0].blockRef.blockId,
+        slug_v=encoders[1].blockRef.blockId,
+        key_a=modality_key(encoders[0], "audio"),
+        key_v=modality_key(encoders[1], "vision"),
+        fusion_slug=fusion.blockRef.blockId,
+        a_weights={k[2:]: v for k, v in enc.items() if k.startswith("a_")},
+        v_weights={k[2:]: v for k, v in enc.items() if k.startswith("v_")},
+        clf=clf,
+    )
+
+
+@dataclass
+class _Pending:
+    modalities: dict[str, np.ndarray]
+    rows: int
+    future: asyncio.Future = field(repr=False)
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent predict calls for one model into a single encoder/fusion/decision_function pass.
+
+    The first request opens a window of `window_s`; everything that arrives before it closes
+    (or until `max_rows` is reached) is scored together in the default executor.
+    """
+
+    def __init__(self, model: WarmModel, window_s: float, max_rows: int) -> None:
+        self.model = model
+        self.window_s = window_s
+        self.max_rows = max_rows
+        self._queue: asyncio.Queue[_Pending] = asyncio.Queue()
+        self._worker: asyncio.Task | None = None
+
+    async def submit(self, modalities: dict[str, np.ndarray]) -> tuple[np.ndarray, np.ndarray]:
+        rows = {int(v.shape[0]) for v in modalities.values()}
+        if len(rows) != 1:
+            raise ValueError("All modalities must have the same number of rows")
+        loop = asyncio.get_running_loop()
+        item = _Pending(modalities=modalities, rows=rows.pop(), future=loop.create_future())
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+        self._queue.put_nowait(item)
+        return await item.future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                first = await asyncio.wait_for(self._queue.get(), _IDLE_EXIT_S)
+            except asyncio.TimeoutError:
+                # let idle (or evicted) models drop their worker task; submit() restarts it
+                if self._queue.empty():
+                    return
+                continue
+            batch = [first]
+            rows = first.rows
+            deadline = loop.time() + self.window_s
+            while rows < self.max_rows:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    nxt = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(nxt)
+                rows += nxt.rows
+            await loop.run_in_executor(cpu_executor, self._score_batch, batch)
+
+    def _score_batch(self, batch: list[_Pending]) -> None:
+        # only requests with identical feature widths can be stacked
+        groups: dict[tuple, list[_Pending]] = {}
+        for p in batch:
+            sig = tuple(sorted((k, v.shape[1:]) for k, v in p.modalities.items()))
+            groups.setdefault(sig, []).append(p)
+
+        for items in groups.values():
+            try:
+                keys = items[0].modalities.keys()
+                stacked = {k: np.concatenate([p.modalities[k] for p in items], axis=0) for k in keys}
+                scores, labels = self.model.score(stacked)
+            except Exception:
+                # isolate the offending request(s) instead of failing the whole batch
+                for p in items:
+                    self._resolve_single(p)
+                continue
+            offset = 0
+            for p in items:
+                self._set_result(p, (scores[offset : offset + p.rows], labels[offset : offset + p.rows]))
+                offset += p.rows
+
+    def _resolve_single(self, p: _Pending) -> None:
+        try:
+            self._set_result(p, self.model.score(p.modalities))
+        except Exception as e:
+            p.future.get_loop().call_soon_threadsafe(_safe_set_exception, p.future, e)
+
+    @staticmethod
+    def _set_result(p: _Pending, value: tuple[np.ndarray, np.ndarray]) -> None:
+        p.future.get_loop().call_soon_threadsafe(_safe_set_result, p.future, value)
+
+
+def _safe_set_result(fut: asyncio.Future, value: Any) -> None:
+    if not fut.done():
+        fut.set_result(value)
+
+
+def _safe_set_exception(fut: asyncio.Future, exc: BaseException) -> None:
+    if not fut.done():
+        fut.set_exception(exc)
+
+
+class WarmModelCache:
+    """LRU of run_id -> MicroBatcher; a cache miss loads artifacts once even under concurrent requests."""
+
+    def __init__(self, capacity: int, window_s: float, max_rows: int) -> None:
+        self.capacity = max(1, capacity)
+        self.window_s = window_s
+        self.max_rows = max_rows
+        self._entries: OrderedDict[str, MicroBatcher] = OrderedDict()
+        self._loading: dict[str, asyncio.Future] = {}
+
+    async def get(self, run_id: str, loader: Callable[[], Awaitable[WarmModel]]) -> MicroBatcher:
+        hit = self._entries.get(run_id)
+        if hit is not None:
+            self._entries.move_to_end(run_id)
+            return hit
+
+        pending = self._loading.get(run_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        fut = asyncio.get_running_loop().create_future()
+        self._loading[run_id] = fut
+        try:
+            batcher = MicroBatcher(await loader(), self.window_s, self.max_rows)
+        except BaseException as e:
+            fut.set_exception(e)
+            fut.exception()  # mark retrieved; waiters re-raise from their own await
+            raise
+        finally:
+            self._loading.pop(run_id, None)
+
+        self._entries[run_id] = batcher
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        fut.set_result(batcher)
+        return batcher
+
+    def stats(self) -> dict[str, Any]:
+        return {"capacity": self.capacity, "warm": list(self._entries.keys())}
+
+
+warm_models = WarmModelCache(PREDICT_CACHE_SIZE, PREDICT_BATCH_WINDOW_MS / 1000.0, PREDICT_MAX_BATCH)
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import math
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Optional
+
+import numpy as np
+
+from app.metrics import flatten_metrics, map_metric_leaves
+from app.runner.toy_runner import run_toy_pipeline
+from app.schemas.pipeline import PipelineSpec
+
+
+RUNNER_PROCESSES = int(os.getenv("RUNNER_PROCESSES", "0")) or (os.cpu_count() or 1)
+
+_pool: Optional[Executor] = None
+
+
+def _get_pool() -> Executor:
+    """
+    Lazily create the shared replicate pool.
+
+    Celery prefork children are daemonic and may not spawn processes, so they fall back to
+    threads (numpy / SGD release the GIL for the heavy parts).
+    """
+    global _pool
+    if _pool is None:
+        if multiprocessing.current_process().daemon:
+            _pool = ThreadPoolExecutor(max_workers=RUNNER_PROCESSES)
+        else:
+            _pool = ProcessPoolExecutor(max_workers=RUNNER_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def replicate_seeds(seed: int, k: int) -> list[int]:
+    """Replicate 0 keeps the user's seed (so k=1 is unchanged); the rest are independent SeedSequence children."""
+    children = np.random.SeedSequence(seed).spawn(max(0, k - 1))
+    return [seed] + [int(c.generate_state(1)[0]) for c in children]
+
+
+def _run_one(spec_json: dict[str, Any], seed: int, keep_artifacts: bool) -> tuple[dict[str, Any], Optional[dict]]:
+    spec = PipelineSpec.model_validate(spec_json)
+    spec = spec.model_copy(update={"runConfig": spec.runConfig.model_copy(update={"seed": seed})})
+    artifacts: Optional[dict] = {} if keep_artifacts else None
+    return run_toy_pipeline(spec, artifacts=artifacts), artifacts
+
+
+# what each replicate/fold actually measures; other leaves (config echoes such as noiseStd,
+# integer counts) are copied through from the first sample instead of averaged
+MEASURED_METRICS = (
+    "performance.accuracy",
+    "complexity.trainTimeMs",
+    "robustness.noisyAccuracy",
+    "robustness.accuracyDrop",
+)
+
+
+def aggregate_metrics(samples: list[dict[str, Any]], confidence: float = 0.95) -> dict[str, dict[str, Any]]:
+    """Mean, sample std and a Student-t confidence interval for every measured metric."""
+    from scipy import stats
+
+    flat = [flatten_metrics(m) for m in samples]
+    out: dict[str, dict[str, Any]] = {}
+    for key in MEASURED_METRICS:
+        xs = np.array([f[key] for f in flat if key in f], dtype=np.float64)
+        n = int(xs.size)
+        if n == 0:
+            continue
+        mean = float(xs.mean())
+        std = float(xs.std(ddof=1)) if n > 1 else 0.0
+        half = float(stats.t.ppf(0.5 + confidence / 2, n - 1) * std / math.sqrt(n)) if n > 1 else 0.0
+        out[key] = {"mean": mean, "std": std, "ci": [mean - half, mean + half], "n": n}
+    return out
+
+
+def summarize_metrics(samples: list[dict[str, Any]], confidence: float = 0.95) -> tuple[dict[str, Any], dict[str, dict[str, Any]]]:
+    """
+    Single-run-shaped metrics for a set of samples (seeds or folds), plus their aggregate.
+
+    Measured leaves hold the mean over `samples`; everything else is taken from `samples[0]`.
+    """
+    agg = aggregate_metrics(samples, confidence)
+    return map_metric_leaves(samples[0], {key: a["mean"] for key, a in agg.items()}), agg
+
+
+def run_replicates(spec: PipelineSpec, artifacts: Optional[dict] = None) -> dict[str, Any]:
+    """
+    Run `runConfig.replicates` independent seeds of the same pipeline in parallel.
+
+    Each seed regenerates its own data, encoder weights and classifier. The top-level metrics keep
+    the single-run shape (filled with means) so existing clients keep working; per-seed values
+    and statistics live under `replicates`. Artifacts come from replicate 0 (the user's seed).
+    """
+    k = int(spec.runConfig.replicates)
+    seeds = replicate_seeds(int(spec.runConfig.seed), k)
+    spec_json = spec.model_dump(by_alias=True, mode="json")
+
+    pool = _get_pool()
+    futures = [pool.submit(_run_one, spec_json, s, i == 0 and artifacts is not None) for i, s in enumerate(seeds)]
+    results = [f.result() for f in futures]
+
+    per_seed = [m for m, _ in results]
+    if artifacts is not None and results[0][1]:
+        artifacts.update(results[0][1])
+
+    metrics, agg = summarize_metrics(per_seed)
+    metrics["replicates"] = {
+        "k": k,
+        "seeds": seeds,
+        "confidence": 0.95,
+        "perSeed": [{"seed": s, "metrics": m} for s, m in zip(seeds, per_seed)],
+        "aggregate": agg,
+    }
+    return metrics
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import dataclasses
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, TypeVar
+
+
+T = TypeVar("T")
+
+
+def stage_key(*parts: Any) -> str:
+    """Canonical key for a pipeline stage: same blocks + configs + seed -> same key."""
+    return json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+
+
+def _freeze(value: Any) -> None:
+    # cached outputs are shared between runs; make numpy buffers read-only so nobody mutates them
+    if hasattr(value, "setflags"):
+        value.setflags(write=False)
+    elif dataclasses.is_dataclass(value) and not isinstance(value, type):
+        for f in dataclasses.fields(value):
+            _freeze(getattr(value, f.name))
+    elif isinstance(value, dict):
+        for v in value.values():
+            _freeze(v)
+    elif isinstance(value, (tuple, list)):
+        for v in value:
+            _freeze(v)
+
+
+class StageCache:
+    """
+    Bounded LRU of intermediate pipeline outputs (datasets, encoder weights, embeddings).
+
+    Runs that share upstream nodes pass the same cache to `run_toy_pipeline` and reuse those
+    outputs instead of recomputing them. Concurrent callers of one key compute it once.
+    """
+
+    def __init__(self, max_entries: int = 32) -> None:
+        self.max_entries = max(1, max_entries)
+        self._entries: OrderedDict[str, Any] = OrderedDict()
+        self._inflight: dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: str, fn: Callable[[], T]) -> T:
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key]
+                waiter = self._inflight.get(key)
+                if waiter is None:
+                    self._inflight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            waiter.wait()
+
+        try:
+            value = fn()
+            _freeze(value)
+            with self._lock:
+                self._entries[key] = value
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key).set()
+
+    def stats(self) -> dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
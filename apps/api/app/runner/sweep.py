@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import copy
+import math
+import os
+from itertools import product
+from typing import Any
+
+from app.metrics import flatten_metrics
+from app.runner.stage_cache import stage_key
+from app.schemas.pipeline import PipelineSpec
+
+
+SWEEP_MAX_POINTS = int(os.getenv("SWEEP_MAX_POINTS", "200"))
+
+TABLE_METRICS = [
+    "performance.accuracy",
+    "complexity.paramCount",
+    "complexity.trainTimeMs",
+    "robustness.noisyAccuracy",
+    "robustness.accuracyDrop",
+]
+
+
+def _apply(spec_json: dict[str, Any], path: str, value: Any) -> None:
+    if path == "runConfig.seed":
+        spec_json["runConfig"]["seed"] = value
+        return
+    node_id, _, field = path.partition(".")
+    node = next((n for n in spec_json["graph"]["nodes"] if n["id"] == node_id), None)
+    if node is None or not field:
+        raise ValueError(f"Unknown sweep parameter: {path}")
+    if field == "blockRef":
+        if not isinstance(value, dict) or not value.get("blockId") or not value.get("version"):
+            raise ValueError(f"{path} values must be {{blockId, version}} objects")
+        node["blockRef"] = {"blockId": value["blockId"], "version": value["version"]}
+    else:
+        node.setdefault("config", {})[field] = value
+
+
+def expand_grid(spec: PipelineSpec, grid: dict[str, list[Any]]) -> list[tuple[dict[str, Any], PipelineSpec]]:
+    """Cartesian product of `grid` applied to the base spec -> [(params, child spec)]."""
+    keys = sorted(grid)
+    for k in keys:
+        if not isinstance(grid[k], list) or not grid[k]:
+            raise ValueError(f"Sweep parameter {k} needs a non-empty list of values")
+    points = math.prod(len(grid[k]) for k in keys)
+    if points > SWEEP_MAX_POINTS:
+        raise ValueError(f"Sweep has {points} points; limit is {SWEEP_MAX_POINTS}")
+
+    base = spec.model_dump(by_alias=True, mode="json")
+    out: list[tuple[dict[str, Any], PipelineSpec]] = []
+    for combo in product(*(grid[k] for k in keys)):
+        child = copy.deepcopy(base)
+        params = dict(zip(keys, combo))
+        for k, v in params.items():
+            _apply(child, k, v)
+        out.append((params, PipelineSpec.model_validate(child)))
+    return out
+
+
+def upstream_key(spec: PipelineSpec) -> str:
+    """
+    Identity of everything before the trainer (dataset, encoders, fusion, seed).
+
+    Children are executed grouped by this key with one shared StageCache, so each distinct
+    upstream is computed once per sweep no matter how many trainer/evaluator configs use it.
+    """
+    nodes = {n.type: n for n in reversed(spec.graph.nodes)}  # first occurrence wins
+    encoders = [n for n in spec.graph.nodes if n.type == "encoder"][:2]
+    parts: list[Any] = [spec.runConfig.seed]
+    for n in [nodes.get("dataset"), *encoders, nodes.get("fusion")]:
+        if n is not None:
+            parts.append([n.blockRef.blockId, n.blockRef.version, n.config])
+    return stage_key(*parts)
+
+
+def sweep_table(grid_keys: list[str], rows: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    Flatten child results into a table.
+
+    `rows` items carry runId, status, params and metrics.
+    """
+    out_rows = []
+    for r in rows:
+        flat = flatten_metrics(r.get("metrics") or {})
+        out_rows.append(
+            {
+                "runId": r["runId"],
+                "status": r["status"],
+                **{k: r["params"].get(k) for k in grid_keys},
+                **{m: flat.get(m) for m in TABLE_METRICS},
+            }
+        )
+    done = [r for r in out_rows if r["performance.accuracy"] is not None]
+    best = max(done, key=lambda r: r["performance.accuracy"])["runId"] if done else None
+    return {"columns": ["runId", "status", *grid_keys, *TABLE_METRICS], "rows": out_rows, "bestByAccuracy": best}
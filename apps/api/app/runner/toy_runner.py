@@ -2,15 +2,22 @@ from __future__ import annotations
 
 import platform
 import time
-from typing import Any
+from dataclasses import dataclass
+from typing import Any, Callable
 
 import numpy as np
 from importlib.metadata import PackageNotFoundError, version as pkg_version
 from sklearn.linear_model import SGDClassifier
-from sklearn.metrics import accuracy_score
+from sklearn.metrics import accuracy_score, log_loss
 
 from app.dataloading.registry import load_splits
-from app.schemas.pipeline import PipelineSpec
+from app.dataloading.types import DataSplits
+from app.runner.stage_cache import StageCache, stage_key
+from app.schemas.pipeline import NodeInstance, PipelineSpec
+
+
+# progress(stage, **data): receives stage-level events while a run executes
+ProgressFn = Callable[..., None]
 
 
 def _pkg_ver(name: str) -> str:
@@ -34,26 +41,47 @@ def collect_runtime_env() -> dict[str, Any]:
     }
 
 
-def _linear_encoder(seed: int, x: np.ndarray, out_dim: int, salt: int) -> tuple[np.ndarray, int]:
+def _linear_encoder_params(seed: int, in_dim: int, out_dim: int, salt: int) -> dict[str, np.ndarray]:
     rng = np.random.default_rng(seed + salt)
-    w = rng.normal(scale=0.2, size=(x.shape[1], out_dim)).astype(np.float32)
+    w = rng.normal(scale=0.2, size=(in_dim, out_dim)).astype(np.float32)
     b = rng.normal(scale=0.01, size=(out_dim,)).astype(np.float32)
-    return (x @ w + b), (w.size + b.size)
-
+    return {"w": w, "b": b}
 
-def _identity_encoder(x: np.ndarray, scale: float = 1.0) -> tuple[np.ndarray, int]:
-    return (x * scale), 0
 
+def _encoder_params(block_slug: str, seed: int, in_dim: int, config: dict[str, Any], salt: int) -> dict[str, np.ndarray]:
+    """
+    Materialize the (deterministic) parameters of an encoder block.
 
-def _apply_encoder(block_slug: str, seed: int, x: np.ndarray, config: dict[str, Any], salt: int) -> tuple[np.ndarray, int]:
+    Kept separate from `_encode` so trained runs can persist the exact weights they used.
+    """
     if block_slug == "unimodals.identity":
-        return _identity_encoder(x, float(config.get("scale", 1.0)))
+        return {"scale": np.asarray(float(config.get("scale", 1.0)), dtype=np.float32)}
     if block_slug == "unimodals.linear":
         out_dim = int(config.get("outDim", 16))
-        return _linear_encoder(seed, x, out_dim=out_dim, salt=salt)
+        return _linear_encoder_params(seed, in_dim, out_dim=out_dim, salt=salt)
     raise ValueError(f"Unsupported encoder block: {block_slug}")
 
 
+def _encode(block_slug: str, x: np.ndarray, params: dict[str, np.ndarray]) -> np.ndarray:
+    if block_slug == "unimodals.identity":
+        return x * float(params["scale"])
+    if block_slug == "unimodals.linear":
+        return x @ params["w"] + params["b"]
+    raise ValueError(f"Unsupported encoder block: {block_slug}")
+
+
+def _param_count(block_slug: str, params: dict[str, np.ndarray]) -> int:
+    # identity scale is a hyperparameter, not a learned weight
+    if block_slug == "unimodals.identity":
+        return 0
+    return int(sum(v.size for v in params.values()))
+
+
+def _apply_encoder(block_slug: str, seed: int, x: np.ndarray, config: dict[str, Any], salt: int) -> tuple[np.ndarray, int]:
+    params = _encoder_params(block_slug, seed, x.shape[1], config, salt)
+    return _encode(block_slug, x, params), _param_count(block_slug, params)
+
+
 def _apply_fusion(block_slug: str, a: np.ndarray, v: np.ndarray) -> np.ndarray:
     if block_slug == "fusions.concat":
         return np.concatenate([a, v], axis=1)
@@ -64,9 +92,19 @@ def _apply_fusion(block_slug: str, a: np.ndarray, v: np.ndarray) -> np.ndarray:
     raise ValueError(f"Unsupported fusion block: {block_slug}")
 
 
-def run_toy_pipeline(spec: PipelineSpec) -> dict[str, Any]:
-    seed = int(spec.runConfig.seed)
+@dataclass(frozen=True)
+class _ToyNodes:
+    dataset: NodeInstance
+    enc_a: NodeInstance
+    enc_v: NodeInstance
+    fusion: NodeInstance
+    trainer: NodeInstance
+    evaluator: NodeInstance
+    key_a: str
+    key_v: str
+
 
+def _select_nodes(spec: PipelineSpec) -> _ToyNodes:
     # pick first occurrences by node type (MVP simplification)
     nodes = spec.graph.nodes
     dataset = next((n for n in nodes if n.type == "dataset"), None)
@@ -78,8 +116,6 @@ def run_toy_pipeline(spec: PipelineSpec) -> dict[str, Any]:
     if not dataset or len(encoders) < 2 or not fusion or not trainer or not evaluator:
         raise ValueError("MVP runner expects: dataset + 2 encoders + fusion + trainer + evaluator.")
 
-    splits = load_splits(dataset_block_id=dataset.blockRef.blockId, seed=seed, config=dataset.config)
-
     def modality_key(n: Any, default: str) -> str:
         k = (n.config or {}).get("modalityKey", default)
         if not isinstance(k, str) or not k:
@@ -87,8 +123,60 @@ def run_toy_pipeline(spec: PipelineSpec) -> dict[str, Any]:
         return k
 
     enc_a, enc_v = encoders[0], encoders[1]
-    key_a = modality_key(enc_a, "audio")
-    key_v = modality_key(enc_v, "vision")
+    return _ToyNodes(
+        dataset=dataset,
+        enc_a=enc_a,
+        enc_v=enc_v,
+        fusion=fusion,
+        trainer=trainer,
+        evaluator=evaluator,
+        key_a=modality_key(enc_a, "audio"),
+        key_v=modality_key(enc_v, "vision"),
+    )
+
+
+def _fit_classifier(x: np.ndarray, y: np.ndarray, config: dict[str, Any], seed: int) -> tuple[SGDClassifier, float]:
+    max_iter = int(config.get("maxIter", 300))
+    alpha = float(config.get("alpha", 0.0001))
+    clf = SGDClassifier(loss="log_loss", max_iter=max_iter, alpha=alpha, random_state=seed)
+
+    t0 = time.perf_counter()
+    clf.fit(x, y)
+    return clf, (time.perf_counter() - t0) * 1000.0
+
+
+def _model_param_count(clf: SGDClassifier, n_features: int) -> int:
+    return int(getattr(clf, "coef_", np.zeros((1, n_features))).size + getattr(clf, "intercept_", np.zeros((1,))).size)
+
+
+def load_cached_splits(cache: StageCache, dataset_block_id: str, config: dict[str, Any], seed: int) -> tuple[str, DataSplits]:
+    """The dataset stage: `(stage key, splits)`, loaded once per cache for the same block/config/seed."""
+    key = stage_key("dataset", dataset_block_id, config, seed)
+    return key, cache.get_or_compute(key, lambda: load_splits(dataset_block_id=dataset_block_id, seed=seed, config=config))
+
+
+def run_toy_pipeline(
+    spec: PipelineSpec,
+    artifacts: dict[str, dict[str, np.ndarray]] | None = None,
+    cache: StageCache | None = None,
+    progress: ProgressFn | None = None,
+) -> dict[str, Any]:
+    """
+    Execute the toy pipeline and return its metrics.
+
+    If `artifacts` is given it is filled with the arrays worth keeping after the run
+    (classifier coefficients, encoder parameters, fused embeddings), keyed by artifact name.
+    Runs sharing a `cache` reuse dataset / encoder outputs when their upstream nodes match.
+    `progress` is called after each stage (dataset_loaded, encoders_done, trained, evaluated).
+    """
+    emit = progress or (lambda stage, **data: None)
+    seed = int(spec.runConfig.seed)
+    nodes = _select_nodes(spec)
+    enc_a, enc_v, fusion = nodes.enc_a, nodes.enc_v, nodes.fusion
+    key_a, key_v = nodes.key_a, nodes.key_v
+    cache = cache if cache is not None else StageCache()
+
+    ds_key, splits = load_cached_splits(cache, nodes.dataset.blockRef.blockId, nodes.dataset.config, seed)
 
     x_a_tr = splits.train.get_modality(key_a)
     x_v_tr = splits.train.get_modality(key_v)
@@ -96,50 +184,80 @@ def run_toy_pipeline(spec: PipelineSpec) -> dict[str, Any]:
     if y_tr is None:
         raise ValueError("Dataset did not provide labels for supervised training.")
 
-    a_tr, a_params = _apply_encoder(enc_a.blockRef.blockId, seed, x_a_tr, enc_a.config, salt=101)
-    v_tr, v_params = _apply_encoder(enc_v.blockRef.blockId, seed, x_v_tr, enc_v.config, salt=202)
-    x_tr = _apply_fusion(fusion.blockRef.blockId, a_tr, v_tr)
-
-    # train
-    max_iter = int(trainer.config.get("maxIter", 300))
-    alpha = float(trainer.config.get("alpha", 0.0001))
-    clf = SGDClassifier(loss="log_loss", max_iter=max_iter, alpha=alpha, random_state=seed)
-
-    t0 = time.perf_counter()
-    clf.fit(x_tr, y_tr)
-    train_ms = (time.perf_counter() - t0) * 1000.0
-
-    # eval clean
+    # eval inputs
     x_a_te = splits.test.get_modality(key_a)
     x_v_te = splits.test.get_modality(key_v)
     y_te = splits.test.labels
     if y_te is None:
         raise ValueError("Dataset did not provide labels for evaluation.")
+    emit("dataset_loaded", nTrain=int(y_tr.shape[0]), nTest=int(y_te.shape[0]))
+
+    slug_a, slug_v = enc_a.blockRef.blockId, enc_v.blockRef.blockId
+
+    def fuse_with(a_w: dict[str, np.ndarray], v_w: dict[str, np.ndarray], x_a: np.ndarray, x_v: np.ndarray) -> np.ndarray:
+        return _apply_fusion(fusion.blockRef.blockId, _encode(slug_a, x_a, a_w), _encode(slug_v, x_v, v_w))
+
+    def encode() -> dict[str, Any]:
+        a_weights = _encoder_params(slug_a, seed, x_a_tr.shape[1], enc_a.config, salt=101)
+        v_weights = _encoder_params(slug_v, seed, x_v_tr.shape[1], enc_v.config, salt=202)
+        return {
+            "a": a_weights,
+            "v": v_weights,
+            "train": fuse_with(a_weights, v_weights, x_a_tr, x_v_tr),
+            "test": fuse_with(a_weights, v_weights, x_a_te, x_v_te),
+        }
+
+    enc_key = stage_key("encode", ds_key, slug_a, enc_a.config, key_a, slug_v, enc_v.config, key_v, fusion.blockRef.blockId)
+    encoded = cache.get_or_compute(enc_key, encode)
+    a_weights, v_weights = encoded["a"], encoded["v"]
+    a_params = _param_count(slug_a, a_weights)
+    v_params = _param_count(slug_v, v_weights)
+    x_tr, x_te = encoded["train"], encoded["test"]
+    emit("encoders_done", fusedDim=int(x_tr.shape[1]))
+
+    # train
+    clf, train_ms = _fit_classifier(x_tr, y_tr, nodes.trainer.config, seed)
+    if progress is not None:
+        # training loss costs a full extra pass over x_tr; only pay for it when someone listens
+        emit(
+            "trained",
+            epochs=int(clf.n_iter_),
+            loss=float(log_loss(y_tr, clf.predict_proba(x_tr), labels=clf.classes_)),
+            trainTimeMs=train_ms,
+        )
 
-    a_te, _ = _apply_encoder(enc_a.blockRef.blockId, seed, x_a_te, enc_a.config, salt=101)
-    v_te, _ = _apply_encoder(enc_v.blockRef.blockId, seed, x_v_te, enc_v.config, salt=202)
-    x_te = _apply_fusion(fusion.blockRef.blockId, a_te, v_te)
+    # eval clean
     y_pred = clf.predict(x_te)
     acc = float(accuracy_score(y_te, y_pred))
 
     # eval robustness (noise)
-    noise_std = float(evaluator.config.get("noiseStd", 0.2))
-    rng2 = np.random.default_rng(seed + 999)
-    noisy_a = x_a_te + rng2.normal(scale=noise_std, size=x_a_te.shape).astype(np.float32)
-    noisy_v = x_v_te + rng2.normal(scale=noise_std, size=x_v_te.shape).astype(np.float32)
-    na, _ = _apply_encoder(enc_a.blockRef.blockId, seed, noisy_a, enc_a.config, salt=101)
-    nv, _ = _apply_encoder(enc_v.blockRef.blockId, seed, noisy_v, enc_v.config, salt=202)
-    nx = _apply_fusion(fusion.blockRef.blockId, na, nv)
+    noise_std = float(nodes.evaluator.config.get("noiseStd", 0.2))
+
+    def noisy() -> np.ndarray:
+        rng2 = np.random.default_rng(seed + 999)
+        noisy_a = x_a_te + rng2.normal(scale=noise_std, size=x_a_te.shape).astype(np.float32)
+        noisy_v = x_v_te + rng2.normal(scale=noise_std, size=x_v_te.shape).astype(np.float32)
+        return fuse_with(a_weights, v_weights, noisy_a, noisy_v)
+
+    nx = cache.get_or_compute(stage_key("noisy", enc_key, noise_std), noisy)
     n_pred = clf.predict(nx)
     noisy_acc = float(accuracy_score(y_te, n_pred))
+    emit("evaluated", accuracy=acc, noisyAccuracy=noisy_acc)
 
     # complexity (very simplified)
-    model_params = int(getattr(clf, "coef_", np.zeros((1, x_tr.shape[1]))).size + getattr(clf, "intercept_", np.zeros((1,))).size)
+    model_params = _model_param_count(clf, x_tr.shape[1])
     total_params = int(a_params + v_params + model_params)
 
+    if artifacts is not None:
+        artifacts["classifier"] = {"coef": clf.coef_, "intercept": clf.intercept_, "classes": clf.classes_}
+        artifacts["encoders"] = {
+            **{f"a_{k}": v for k, v in a_weights.items()},
+            **{f"v_{k}": v for k, v in v_weights.items()},
+        }
+        artifacts["embeddings"] = {"train": x_tr, "trainLabels": y_tr, "test": x_te, "testLabels": y_te}
+
     return {
         "performance": {"accuracy": acc},
         "complexity": {"paramCount": total_params, "trainTimeMs": train_ms},
         "robustness": {"noiseStd": noise_std, "noisyAccuracy": noisy_acc, "accuracyDrop": acc - noisy_acc},
     }
-
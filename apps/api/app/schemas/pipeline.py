@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Any, Literal, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class BlockRef(BaseModel):
@@ -69,8 +69,18 @@ class RunResources(BaseModel):
 class RunConfig(BaseModel):
     seed: int = Field(ge=0, default=0)
     mode: Literal["sync", "async"] = "sync"
+    # k > 1 runs k independent seeds and reports mean / std / CI
+    replicates: int = Field(ge=1, le=32, default=1)
+    # k-fold cross-validation over one generated dataset (replaces the trainRatio split)
+    cvFolds: Optional[int] = Field(default=None, ge=2, le=20)
     resources: Optional[RunResources] = None
 
+    @model_validator(mode="after")
+    def _one_strategy(self) -> "RunConfig":
+        if self.cvFolds and self.replicates > 1:
+            raise ValueError("runConfig.replicates and runConfig.cvFolds cannot be combined")
+        return self
+
 
 class PipelineSpec(BaseModel):
     specVersion: Literal["0.1.0"] = "0.1.0"
@@ -97,3 +107,42 @@ class RunListItem(BaseModel):
     finishedAt: Optional[datetime] = None
     metrics: dict[str, Any] = Field(default_factory=dict)
 
+
+class RunStatusItem(BaseModel):
+    runId: str
+    status: str
+    createdAt: datetime
+    startedAt: Optional[datetime] = None
+    finishedAt: Optional[datetime] = None
+    metrics: dict[str, Any] = Field(default_factory=dict)
+
+
+class RunStatusResponse(BaseModel):
+    runs: list[RunStatusItem]
+    # false when a `wait` expired without any listed run changing status
+    changed: bool = True
+    missing: list[str] = Field(default_factory=list)
+
+
+class PredictRequest(BaseModel):
+    # modalityKey -> one row (list[float]) or a batch of rows (list[list[float]])
+    modalities: dict[str, list[Any]]
+
+
+class PredictResponse(BaseModel):
+    runId: str
+    predictions: list[Any]
+    scores: list[Any]
+
+
+class SweepCreateRequest(BaseModel):
+    spec: PipelineSpec
+    # "<nodeId>.<configKey>" | "<nodeId>.blockRef" | "runConfig.seed" -> candidate values
+    grid: dict[str, list[Any]] = Field(min_length=1)
+
+
+class SweepCreateResponse(BaseModel):
+    sweepId: str
+    status: str
+    childRunIds: list[str]
+    table: Optional[dict[str, Any]] = None
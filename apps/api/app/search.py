@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import base64
+import json
+import re
+from typing import Any, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+from app.models import Paper
+
+
+FTS_TABLE = "papers_fts"
+
+# Postgres: the GIN index and the query must use the *same* expression for the planner to pick the index.
+_PG_DOCUMENT = (
+    "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(summary, '') || ' ' "
+    "|| coalesce(authors::text, '') || ' ' || coalesce(categories::text, ''))"
+)
+# bm25 column weights: paper_id (unindexed), title, summary, authors, categories
+_SQLITE_RANK = f"bm25({FTS_TABLE}, 0.0, 10.0, 1.0, 3.0, 2.0)"
+
+
+def _dialect(bind: Any) -> str:
+    return bind.dialect.name
+
+
+def ensure_search_index(engine: Engine) -> None:
+    """Create the full-text index (SQLite FTS5 / Postgres tsvector GIN) and backfill existing papers."""
+    dialect = _dialect(engine)
+    with engine.begin() as conn:
+        if dialect == "sqlite":
+            conn.execute(
+                text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                    "paper_id UNINDEXED, title, summary, authors, categories, tokenize='porter unicode61')"
+                )
+            )
+            conn.execute(
+                text(
+                    f"INSERT INTO {FTS_TABLE} (paper_id, title, summary, authors, categories) "
+                    "SELECT id, title, summary, authors, categories FROM papers "
+                    f"WHERE id NOT IN (SELECT paper_id FROM {FTS_TABLE})"
+                )
+            )
+        elif dialect == "postgresql":
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS ix_papers_fts ON papers USING GIN ({_PG_DOCUMENT})"))
+
+
+def index_papers(session: Session, papers: list[Paper]) -> None:
+    """
+    Add papers to the search index inside the caller's transaction.
+
+    Only SQLite needs this; the Postgres expression index is maintained by the database itself.
+    """
+    if not papers or _dialect(session.get_bind()) != "sqlite":
+        return
+    session.execute(
+        text(f"INSERT INTO {FTS_TABLE} (paper_id, title, summary, authors, categories) VALUES (:id, :title, :summary, :authors, :categories)"),
+        [
+            {
+                "id": p.id,
+                "title": p.title,
+                "summary": p.summary,
+                "authors": " ".join(p.authors or []),
+                "categories": " ".join(p.categories or []),
+            }
+            for p in papers
+        ],
+    )
+
+
+def _fts5_query(q: str) -> str:
+    # quote every token so user input can't inject FTS5 operators; tokens are AND-ed
+    tokens = re.findall(r"\w+", q, flags=re.UNICODE)
+    return " ".join('"' + t.replace('"', '""') + '"' for t in tokens)
+
+
+def encode_cursor(rank: float, paper_id: str) -> str:
+    raw = json.dumps([rank, paper_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[float, str]:
+    """Inverse of `encode_cursor`; anything it did not produce raises ValueError (-> 400)."""
+    try:
+        value = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except ValueError as e:  # bad base64 / utf-8 / JSON are all ValueErrors
+        raise ValueError(f"Invalid cursor: {e}") from e
+    if not (
+        isinstance(value, list)
+        and len(value) == 2
+        and isinstance(value[0], (int, float))
+        and not isinstance(value[0], bool)
+        and isinstance(value[1], str)
+    ):
+        raise ValueError("Invalid cursor")
+    return float(value[0]), value[1]
+
+
+def search_papers(session: Session, q: str, limit: int, cursor: Optional[str] = None) -> tuple[list[tuple[str, float]], Optional[str]]:
+    """
+    Return `(paper_id, rank)` pairs ordered by relevance, plus the cursor for the next page.
+
+    Lower rank is better on both backends (bm25 is already ascending; ts_rank_cd is negated),
+    so keyset pagination is `(rank, paper_id) > (last_rank, last_id)`.
+    """
+    dialect = _dialect(session.get_bind())
+    if dialect == "sqlite":
+        match = _fts5_query(q)
+        if not match:
+            return [], None
+        inner = f"SELECT paper_id, {_SQLITE_RANK} AS rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :q"
+        params: dict[str, Any] = {"q": match}
+    elif dialect == "postgresql":
+        inner = (
+            f"SELECT id AS paper_id, -ts_rank_cd({_PG_DOCUMENT}, websearch_to_tsquery('english', :q)) AS rank "
+            f"FROM papers WHERE {_PG_DOCUMENT} @@ websearch_to_tsquery('english', :q)"
+        )
+        params = {"q": q}
+    else:
+        raise ValueError(f"Full-text search not supported on {dialect}")
+
+    where = ""
+    if cursor:
+        params["last_rank"], params["last_id"] = decode_cursor(cursor)
+        where = "WHERE rank > :last_rank OR (rank = :last_rank AND paper_id > :last_id)"
+    params["limit"] = limit + 1
+
+    rows = session.execute(text(f"SELECT paper_id, rank FROM ({inner}) AS hits {where} ORDER BY rank, paper_id LIMIT :limit"), params).all()
+    hits = [(str(r[0]), float(r[1])) for r in rows]
+    next_cursor = encode_cursor(*hits[limit - 1]) if len(hits) > limit else None
+    return hits[:limit], next_cursor
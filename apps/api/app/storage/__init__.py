@@ -0,0 +1,3 @@
+from app.storage.artifacts import ArtifactStore, artifact_store
+
+__all__ = ["ArtifactStore", "artifact_store"]
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+ARTIFACT_DIR = os.getenv("ARTIFACT_DIR", "./artifacts")
+MANIFEST_VERSION = "0.1.0"
+
+
+def _content_hash(arrays: dict[str, np.ndarray]) -> str:
+    """
+    Hash array *contents* (name, dtype, shape, bytes) rather than the .npz file.
+
+    np.savez stamps zip entries with the current time, so file bytes are not reproducible
+    while the arrays themselves are.
+    """
+    import numpy as np
+
+    h = hashlib.sha256()
+    for name in sorted(arrays):
+        a = np.ascontiguousarray(arrays[name])
+        h.update(name.encode("utf-8"))
+        h.update(a.dtype.str.encode("utf-8"))
+        h.update(repr(a.shape).encode("utf-8"))
+        h.update(a.tobytes())
+    return h.hexdigest()
+
+
+class ArtifactStore:
+    """
+    Local content-addressed store for run artifacts.
+
+    Each artifact is a single uncompressed .npz under `objects/<hash[:2]>/<hash>.npz`, so identical
+    outputs (same seed + config) are stored once and byte ranges map directly onto the file.
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / f"{digest}.npz"
+
+    def put(self, name: str, arrays: dict[str, np.ndarray]) -> dict[str, Any]:
+        import numpy as np
+
+        arrays = {k: np.asarray(v) for k, v in arrays.items()}
+        digest = _content_hash(arrays)
+        path = self.path_for(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # write-then-rename so concurrent writers never expose a partial file
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, **arrays)
+                os.replace(tmp, path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                raise
+        return {
+            "name": name,
+            "format": "npz",
+            "digest": digest,
+            "sizeBytes": path.stat().st_size,
+            "arrays": {k: {"dtype": v.dtype.str, "shape": [int(d) for d in v.shape]} for k, v in arrays.items()},
+        }
+
+    def put_many(self, artifacts: dict[str, dict[str, np.ndarray]]) -> dict[str, Any]:
+        """Store every artifact and return the manifest persisted on `PipelineRun.artifacts`."""
+        return {
+            "manifestVersion": MANIFEST_VERSION,
+            "items": {name: self.put(name, arrays) for name, arrays in artifacts.items()},
+        }
+
+    def load(self, digest: str) -> dict[str, np.ndarray]:
+        import numpy as np
+
+        with np.load(self.path_for(digest), allow_pickle=False) as z:
+            return {k: z[k] for k in z.files}
+
+
+artifact_store = ArtifactStore(ARTIFACT_DIR)
@@ -1,4 +1,23 @@
-from app.tasks.celery_app import celery_app
+from __future__ import annotations
 
-__all__ = ["celery_app"]
+from typing import Any
 
+
+# Celery (and redis/kombu behind it) is only imported once something actually needs the app,
+# so API processes that never enqueue work do not pay for it at startup.
+def __getattr__(name: str) -> Any:
+    if name == "celery_app":
+        from app.tasks.celery_app import celery_app
+
+        return celery_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def send_task(name: str, *args: Any, **kwargs: Any) -> Any:
+    """`celery_app.send_task` without importing Celery until the first call."""
+    from app.tasks.celery_app import celery_app
+
+    return celery_app.send_task(name, *args, **kwargs)
+
+
+__all__ = ["celery_app", "send_task"]
@@ -11,14 +11,26 @@ celery_app = Celery(
     "multibench_mvp",
     broker=REDIS_URL,
     backend=REDIS_URL,
-    include=["app.tasks.paper_watcher", "app.tasks.run_pipeline"],
+    include=["app.tasks.paper_watcher", "app.tasks.run_pipeline", "app.tasks.llm_proposals"],
 )
 
 celery_app.conf.timezone = "UTC"
+# prefork children per worker (Celery defaults to the CPU count); also sizes per-child BLAS threads
+celery_app.conf.worker_concurrency = int(os.getenv("CELERY_CONCURRENCY", "0")) or None
+# run_toy_batch is routed per call (runs.interactive / runs.batch, see app.queues); sweeps are always heavy
+celery_app.conf.task_routes = {"app.tasks.run_pipeline.run_sweep": {"queue": "runs.batch"}}
 celery_app.conf.beat_schedule = {
     "paper-watcher-hourly": {
         "task": "app.tasks.paper_watcher.poll_arxiv",
         "schedule": 60 * 60,
-    }
+    },
+    "reap-stale-runs": {
+        "task": "app.tasks.run_pipeline.reap_stale_runs",
+        "schedule": 60,
+    },
+    "llm-proposals": {
+        "task": "app.tasks.llm_proposals.propose_pending",
+        "schedule": 10 * 60,
+    },
 }
 
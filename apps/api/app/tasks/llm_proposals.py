@@ -0,0 +1,202 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+import httpx
+from sqlalchemy import func, or_, update
+from sqlmodel import Session, select
+
+from app.db import engine
+from app.models import LLMResponseCache, PaperCandidate, PaperCandidateStatus
+from app.tasks.celery_app import celery_app
+
+
+# Any OpenAI-compatible server (`{LLM_BASE_URL}/chat/completions`), including a local stub in tests.
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "")
+LLM_API_KEY = os.getenv("LLM_API_KEY", "")
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_TIMEOUT_SEC = float(os.getenv("LLM_TIMEOUT_SEC", "60"))
+LLM_DRAIN_LIMIT = int(os.getenv("LLM_DRAIN_LIMIT", "100"))
+LLM_WRITE_BATCH = int(os.getenv("LLM_WRITE_BATCH", "20"))
+# a drain leases its candidates for this long, so an overlapping drain skips them
+LLM_LEASE_SEC = float(os.getenv("LLM_LEASE_SEC", "900"))
+# a candidate whose request failed waits LLM_RETRY_BASE_SEC * 2**(attempts - 1) before the next try
+LLM_RETRY_BASE_SEC = float(os.getenv("LLM_RETRY_BASE_SEC", "600"))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "5"))
+
+_RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+def _prompt_hash(model: str, prompt: str) -> str:
+    return hashlib.sha256(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def _extract_proposal(output: str) -> Optional[dict[str, Any]]:
+    """Pull the `{candidates:[...]}` object out of a completion, tolerating ``` fences and chatter."""
+    start, end = output.find("{"), output.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        obj = json.loads(output[start : end + 1])
+    except Exception:
+        return None
+    if isinstance(obj, dict) and isinstance(obj.get("candidates"), list):
+        return obj
+    return None
+
+
+async def _complete(client: httpx.AsyncClient, sem: asyncio.Semaphore, prompt: str) -> str:
+    payload = {
+        "model": LLM_MODEL,
+        "messages": [
+            {"role": "system", "content": "Reply with a single JSON object only."},
+            {"role": "user", "content": prompt},
+        ],
+        "temperature": 0,
+    }
+    async with sem:
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                res = await client.post("/chat/completions", json=payload)
+                if res.status_code not in _RETRY_STATUS:
+                    res.raise_for_status()
+                    return str(res.json()["choices"][0]["message"]["content"] or "")
+                retry_after = res.headers.get("Retry-After")
+                delay = float(retry_after) if retry_after and retry_after.isdigit() else None
+            except (httpx.TransportError, httpx.TimeoutException):
+                delay = None
+            if attempt == LLM_MAX_RETRIES:
+                break
+            # exponential backoff with full jitter
+            await asyncio.sleep(delay if delay is not None else random.uniform(0, min(30.0, 0.5 * 2**attempt)))
+    raise RuntimeError(f"LLM request failed after {LLM_MAX_RETRIES + 1} attempts")
+
+
+def _write_batch(session: Session, results: list[tuple[str, str]], by_hash: dict[str, list[PaperCandidate]]) -> None:
+    now = datetime.utcnow()
+    for h, output in results:
+        session.merge(LLMResponseCache(prompt_hash=h, model=LLM_MODEL, output=output, created_at=now))
+        proposal = _extract_proposal(output)
+        for c in by_hash.get(h, []):
+            c.llm_output = output
+            c.llm_retry_at = None
+            if proposal is not None:
+                c.proposed_blocks = proposal
+            session.add(c)
+    session.commit()
+
+
+def _back_off(session: Session, hashes: list[str], by_hash: dict[str, list[PaperCandidate]]) -> None:
+    """Push candidates whose request failed behind the lease, exponentially further per attempt."""
+    now = datetime.utcnow()
+    for h in hashes:
+        for c in by_hash.get(h, []):
+            c.llm_retry_at = now + timedelta(seconds=LLM_RETRY_BASE_SEC * 2 ** max(0, (c.llm_attempts or 1) - 1))
+            session.add(c)
+    session.commit()
+
+
+def claim_candidates(session: Session, limit: int) -> list[str]:
+    """
+    Lease up to `limit` pending candidates that still need an LLM output and return their ids.
+
+    Fewest attempts first, then oldest, so candidates that keep failing fall behind fresh ones.
+    Postgres uses `FOR UPDATE SKIP LOCKED` so overlapping drains lease disjoint rows; SQLite
+    serializes writers, so the single UPDATE ... RETURNING is already exclusive there.
+    """
+    now = datetime.utcnow()
+    attempts = func.coalesce(PaperCandidate.llm_attempts, 0)
+    eligible = (
+        PaperCandidate.status == PaperCandidateStatus.pending_review,
+        PaperCandidate.llm_output == "",
+        PaperCandidate.llm_prompt != "",
+        attempts < LLM_MAX_ATTEMPTS,
+        or_(PaperCandidate.llm_retry_at.is_(None), PaperCandidate.llm_retry_at <= now),
+    )
+    pick = select(PaperCandidate.id).where(*eligible).order_by(attempts, PaperCandidate.created_at).limit(limit)
+    if session.get_bind().dialect.name == "postgresql":
+        pick = pick.with_for_update(skip_locked=True)
+    claimed = session.execute(
+        update(PaperCandidate)
+        .where(PaperCandidate.id.in_(pick.scalar_subquery()), *eligible)
+        .values(llm_attempts=attempts + 1, llm_retry_at=now + timedelta(seconds=LLM_LEASE_SEC))
+        .returning(PaperCandidate.id)
+    ).all()
+    session.commit()
+    return [row[0] for row in claimed]
+
+
+async def _drain(session: Session, todo: dict[str, str], by_hash: dict[str, list[PaperCandidate]]) -> tuple[int, list[str]]:
+    sem = asyncio.Semaphore(max(1, LLM_CONCURRENCY))
+    headers = {"Authorization": f"Bearer {LLM_API_KEY}"} if LLM_API_KEY else {}
+    ok, failed = 0, []
+    buffer: list[tuple[str, str]] = []
+
+    async def one(h: str, prompt: str) -> tuple[str, Optional[str]]:
+        try:
+            return h, await _complete(client, sem, prompt)
+        except Exception:
+            return h, None
+
+    async with httpx.AsyncClient(base_url=LLM_BASE_URL.rstrip("/"), headers=headers, timeout=LLM_TIMEOUT_SEC) as client:
+        for fut in asyncio.as_completed([one(h, p) for h, p in todo.items()]):
+            h, output = await fut
+            if output is None:
+                failed.append(h)
+                continue
+            ok += 1
+            buffer.append((h, output))
+            if len(buffer) >= LLM_WRITE_BATCH:
+                _write_batch(session, buffer, by_hash)
+                buffer = []
+    if buffer:
+        _write_batch(session, buffer, by_hash)
+    return ok, failed
+
+
+@celery_app.task(name="app.tasks.llm_proposals.propose_pending")
+def propose_pending(limit: int = LLM_DRAIN_LIMIT) -> dict[str, Any]:
+    """
+    Fill `llm_output` / `proposed_blocks` for pending candidates that have a prompt but no output yet.
+
+    Candidates are leased first (`claim_candidates`), so overlapping drains never request the
+    same ones; failed requests are retried by later drains with backoff. Identical prompts share
+    one request, and responses already in `llm_response_cache` are reused without calling the
+    endpoint.
+    """
+    if not LLM_BASE_URL:
+        return {"ok": False, "error": "LLM_BASE_URL not configured"}
+
+    with Session(engine) as session:
+        ids = claim_candidates(session, max(1, limit))
+        if not ids:
+            return {"ok": True, "pending": 0}
+        pending = session.exec(select(PaperCandidate).where(PaperCandidate.id.in_(ids)).order_by(PaperCandidate.created_at)).all()
+
+        by_hash: dict[str, list[PaperCandidate]] = {}
+        prompts: dict[str, str] = {}
+        for c in pending:
+            h = _prompt_hash(LLM_MODEL, c.llm_prompt)
+            by_hash.setdefault(h, []).append(c)
+            prompts[h] = c.llm_prompt
+
+        cached = session.exec(select(LLMResponseCache).where(LLMResponseCache.prompt_hash.in_(list(prompts)))).all()
+        hits = [(row.prompt_hash, row.output) for row in cached]
+        if hits:
+            _write_batch(session, hits, by_hash)
+        hit_hashes = {h for h, _ in hits}
+        todo = {h: p for h, p in prompts.items() if h not in hit_hashes}
+
+        ok, failed = asyncio.run(_drain(session, todo, by_hash)) if todo else (0, [])
+        if failed:
+            _back_off(session, failed, by_hash)
+
+    return {"ok": True, "pending": len(pending), "cacheHits": len(hits), "completed": ok, "failed": len(failed)}
@@ -2,20 +2,29 @@ from __future__ import annotations
 
 import hashlib
 import os
-from datetime import datetime
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
 
 import feedparser
+from celery.signals import worker_process_init
 from dateutil import parser as dtparser
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 from urllib.parse import quote
 
 from app.db import engine
-from app.models import Paper, PaperCandidate, PaperCandidateStatus, PaperSource
+from app.models import Paper, PaperCandidate, PaperCandidateStatus, PaperSource, WatcherState
+from app.near_dup import LSHIndex, lsh_index, minhash_signature
+from app.search import index_papers
 from app.tasks.celery_app import celery_app
 
 
-ARXIV_API = "http://export.arxiv.org/api/query"
+# Overridable so the watcher can be pointed at a local HTTP stand-in serving Atom fixtures.
+ARXIV_API = os.getenv("ARXIV_API_URL", "http://export.arxiv.org/api/query")
+ARXIV_PAGE_SIZE = int(os.getenv("ARXIV_PAGE_SIZE", "100"))
+ARXIV_MAX_PAGES = int(os.getenv("ARXIV_MAX_PAGES", "20"))
+ARXIV_FETCH_CONCURRENCY = int(os.getenv("ARXIV_FETCH_CONCURRENCY", "2"))
 
 
 def build_arxiv_query() -> str:
@@ -58,66 +67,240 @@ def propose_blocks_prompt(paper: Paper) -> str:
     )
 
 
-@celery_app.task(name="app.tasks.paper_watcher.poll_arxiv")
-def poll_arxiv() -> dict[str, Any]:
-    q = build_arxiv_query()
-    url = (
+def _parse_entry(e: Any) -> dict[str, Any]:
+    arxiv_id = _extract_arxiv_id(e.id)
+
+    published_at = None
+    if getattr(e, "published", None):
+        published_at = dtparser.parse(e.published)
+
+    authors = [a.name for a in getattr(e, "authors", []) if getattr(a, "name", None)]
+    categories = []
+    for t in getattr(e, "tags", []) or []:
+        term = getattr(t, "term", None)
+        if term:
+            categories.append(term)
+
+    return {
+        "source": PaperSource.arxiv,
+        "arxiv_id": arxiv_id,
+        "url": e.link,
+        "title": e.title,
+        "authors": authors,
+        "categories": categories,
+        "summary": getattr(e, "summary", "") or "",
+        "published_at": published_at,
+        "dedup_hash": _dedup_hash(arxiv_id),
+    }
+
+
+def _insert_new(session: Session, rows: list[dict[str, Any]]) -> tuple[int, int]:
+    hashes = [r["dedup_hash"] for r in rows]
+    existing = set(session.exec(select(Paper.dedup_hash).where(Paper.dedup_hash.in_(hashes))).all()) if hashes else set()
+
+    lsh_index.refresh(session)
+    batch_index = LSHIndex()  # papers from this feed; merged into lsh_index only after commit
+
+    now = datetime.utcnow()
+    papers: list[Paper] = []
+    fresh: list[Paper] = []
+    for r in rows:
+        if r["dedup_hash"] in existing:
+            continue
+        sig = minhash_signature(r["title"], r["summary"])
+        dup = lsh_index.match(r["arxiv_id"], sig) or batch_index.match(r["arxiv_id"], sig)
+        p = Paper(**r, minhash=sig, canonical_paper_id=dup[0] if dup else None, created_at=now)
+        papers.append(p)
+        if not dup:
+            fresh.append(p)
+            batch_index.add(p.id, p.arxiv_id, sig)
+
+    # near-duplicates are recorded against their canonical paper but create no review work
+    candidates = [
+        PaperCandidate(
+            paper_id=p.id,
+            status=PaperCandidateStatus.pending_review,
+            proposed_blocks={},
+            llm_prompt=propose_blocks_prompt(p),
+            llm_output="",
+            created_at=now,
+        )
+        for p in fresh
+    ]
+    # one flush -> batched multi-row INSERTs for each table, one commit for the whole feed
+    session.add_all(papers)
+    session.add_all(candidates)
+    index_papers(session, papers)
+    session.commit()
+
+    for p in fresh:
+        lsh_index.add(p.id, p.arxiv_id, p.minhash)
+    return len(fresh), len(papers) - len(fresh)
+
+
+def ingest_entries(session: Session, entries: list[Any]) -> dict[str, int]:
+    """
+    Ingest parsed feed entries in a single transaction.
+
+    Dedup is one `dedup_hash IN (...)` query; the unique index on `papers.dedup_hash` catches
+    a concurrent watcher inserting the same paper, in which case we re-dedupe once and retry.
+    New versions and near-identical abstracts are attached to their canonical paper via the
+    MinHash LSH index instead of getting a fresh candidate.
+    """
+    by_hash: dict[str, dict[str, Any]] = {}
+    for e in entries:
+        row = _parse_entry(e)
+        by_hash.setdefault(row["dedup_hash"], row)
+    rows = list(by_hash.values())
+
+    try:
+        created, near_dups = _insert_new(session, rows)
+    except IntegrityError:
+        session.rollback()
+        created, near_dups = _insert_new(session, rows)
+
+    return {"created": created, "nearDuplicates": near_dups, "skipped": len(entries) - created - near_dups}
+
+
+def _page_url(q: str, start: int, page_size: int) -> str:
+    return (
         f"{ARXIV_API}?search_query={quote(q, safe='')}"
-        "&sortBy=submittedDate&sortOrder=descending&start=0&max_results=30"
+        f"&sortBy=submittedDate&sortOrder=descending&start={start}&max_results={page_size}"
     )
-    feed = feedparser.parse(url)
 
-    created = 0
-    skipped = 0
+
+def _fetch_page(url: str) -> list[Any]:
+    return list(feedparser.parse(url).entries)
+
+
+def _naive_utc(dt: datetime) -> datetime:
+    # DB columns hold naive UTC (datetime.utcnow); feeds carry tz-aware timestamps
+    if dt.tzinfo is not None:
+        return dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+def _reached_cursor(e: Any, cursor: WatcherState | None) -> bool:
+    if cursor is None:
+        return False
+    if cursor.last_arxiv_id and _extract_arxiv_id(e.id) == cursor.last_arxiv_id:
+        return True
+    published = getattr(e, "published", None)
+    if cursor.last_published_at and published:
+        # equal timestamps may still be unseen siblings; only strictly older entries end the scan
+        return _naive_utc(dtparser.parse(published)) < cursor.last_published_at
+    return False
+
+
+def fetch_entries(
+    q: str,
+    cursor: WatcherState | None,
+    *,
+    page_size: Optional[int] = None,
+    max_pages: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    fetch: Callable[[str], list[Any]] = _fetch_page,
+) -> tuple[list[Any], bool]:
+    """
+    Page through results (newest first) until reaching the stored cursor.
+
+    Returns the entries and whether the scan got there (cursor or end of feed); False means
+    `max_pages` ran out first. Pages are fetched `concurrency` at a time; at most
+    `concurrency - 1` pages past the cursor are downloaded and none of them are parsed into
+    entries we keep. Unset limits fall back to the ARXIV_* settings at call time.
+    """
+    page_size = page_size or ARXIV_PAGE_SIZE
+    max_pages = max_pages or ARXIV_MAX_PAGES
+    concurrency = concurrency or ARXIV_FETCH_CONCURRENCY
+    out: list[Any] = []
+    page = 0
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        while page < max_pages:
+            window = range(page, min(page + max(1, concurrency), max_pages))
+            for batch in pool.map(lambda p: fetch(_page_url(q, p * page_size, page_size)), window):
+                for e in batch:
+                    if _reached_cursor(e, cursor):
+                        return out, True
+                    out.append(e)
+                if len(batch) < page_size:
+                    return out, True
+            page = window.stop
+    return out, False
+
+
+def fetch_new_entries(q: str, cursor: WatcherState | None, **kwargs: Any) -> list[Any]:
+    """`fetch_entries` without the completeness flag."""
+    return fetch_entries(q, cursor, **kwargs)[0]
+
+
+def _gap_query(q: str, cursor: WatcherState) -> str:
+    """`q` restricted to the submission dates a page-capped poll left unseen (minute granularity, inclusive)."""
+    lo = cursor.last_published_at or datetime(1991, 1, 1)
+    return f"{q} AND submittedDate:[{lo:%Y%m%d%H%M} TO {cursor.backfill_before:%Y%m%d%H%M}]"
+
+
+def _published_range(entries: list[Any]) -> tuple[tuple[datetime, str], tuple[datetime, str]] | None:
+    stamped = [
+        (_naive_utc(dtparser.parse(e.published)), _extract_arxiv_id(e.id)) for e in entries if getattr(e, "published", None)
+    ]
+    return (min(stamped), max(stamped)) if stamped else None
+
+
+def _advance_cursor(
+    session: Session, q: str, key: str, cursor: WatcherState | None, entries: list[Any], complete: bool
+) -> None:
+    """
+    Move the cursor past what this poll ingested without ever jumping over unseen entries.
+
+    If the page cap stopped a poll before the cursor, the cursor stays put; the newest entry is
+    parked as pending and `backfill_before` marks where the next poll resumes (see `poll_arxiv`).
+    A first poll has no cursor to protect and simply starts from its newest entry.
+    """
+    span = _published_range(entries)
+    state = cursor or WatcherState(query_key=key, query=q)
+    backfilling = cursor is not None and cursor.backfill_before is not None
+
+    if complete or cursor is None:
+        newest = (state.pending_published_at, state.pending_arxiv_id) if backfilling else (span[1] if span else None)
+        if newest is None or newest[0] is None:
+            return
+        state.last_published_at, state.last_arxiv_id = newest
+        state.backfill_before, state.pending_published_at, state.pending_arxiv_id = None, None, ""
+    elif span is not None:
+        oldest = span[0][0]
+        if backfilling and oldest >= state.backfill_before:
+            # a full page inside one minute: step past it rather than fetch the same page forever
+            oldest = state.backfill_before - timedelta(minutes=1)
+        if not backfilling:
+            state.pending_published_at, state.pending_arxiv_id = span[1]
+        state.backfill_before = oldest
+    else:
+        return
+    state.updated_at = datetime.utcnow()
+    session.add(state)
+    session.commit()
+
+
+@celery_app.task(name="app.tasks.paper_watcher.poll_arxiv")
+def poll_arxiv() -> dict[str, Any]:
+    q = build_arxiv_query()
+    key = hashlib.sha256(q.encode("utf-8")).hexdigest()
 
     with Session(engine) as session:
-        for e in feed.entries:
-            arxiv_id = _extract_arxiv_id(e.id)
-            dh = _dedup_hash(arxiv_id)
-            exists = session.exec(select(Paper).where(Paper.dedup_hash == dh)).first()
-            if exists:
-                skipped += 1
-                continue
-
-            published_at = None
-            if getattr(e, "published", None):
-                published_at = dtparser.parse(e.published)
-
-            authors = [a.name for a in getattr(e, "authors", []) if getattr(a, "name", None)]
-            categories = []
-            for t in getattr(e, "tags", []) or []:
-                term = getattr(t, "term", None)
-                if term:
-                    categories.append(term)
-
-            paper = Paper(
-                source=PaperSource.arxiv,
-                arxiv_id=arxiv_id,
-                url=e.link,
-                title=e.title,
-                authors=authors,
-                categories=categories,
-                summary=getattr(e, "summary", "") or "",
-                published_at=published_at,
-                dedup_hash=dh,
-                created_at=datetime.utcnow(),
-            )
-            session.add(paper)
-            session.commit()
-            session.refresh(paper)
-
-            candidate = PaperCandidate(
-                paper_id=paper.id,
-                status=PaperCandidateStatus.pending_review,
-                proposed_blocks={},
-                llm_prompt=propose_blocks_prompt(paper),
-                llm_output="",
-                created_at=datetime.utcnow(),
-            )
-            session.add(candidate)
-            session.commit()
-
-            created += 1
-
-    return {"created": created, "skipped": skipped, "query": q}
+        cursor: Optional[WatcherState] = session.get(WatcherState, key)
+        if cursor is not None and cursor.backfill_before is not None:
+            # an earlier poll hit the page cap before the cursor: fill that gap before moving on
+            entries, complete = fetch_entries(_gap_query(q, cursor), cursor)
+        else:
+            entries, complete = fetch_entries(q, cursor)
+        counts = ingest_entries(session, entries)
+        _advance_cursor(session, q, key, cursor, entries, complete)
 
+    return {**counts, "fetched": len(entries), "query": q}
+
+
+@worker_process_init.connect
+def _load_near_dup_index(**_: Any) -> None:
+    # build the LSH index once per worker process, not on the first poll
+    with Session(engine) as session:
+        lsh_index.refresh(session)
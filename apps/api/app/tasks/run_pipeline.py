@@ -1,15 +1,126 @@
 from __future__ import annotations
 
+import logging
+import os
 from datetime import datetime
-from typing import Any
+from functools import partial
+from typing import Any, Optional
 
-from sqlmodel import Session
+from celery.signals import worker_process_init
+from sqlalchemy import func, update
+from sqlalchemy.orm import aliased
+from sqlmodel import Session, desc, select
 
 from app.db import engine
-from app.models import PipelineRun, RunStatus
-from app.runner.toy_runner import run_toy_pipeline
+from app.events import FINISHED, publish
+from app.heartbeat import RUN_MAX_ATTEMPTS, Heartbeat, owned_by, owner_id, stale_filter, store_result
+from app.leaderboard import set_run_metrics
+from app.models import Block, BlockCategory, BlockVersion, BlockVersionStatus, PipelineRun, RunKind, RunStatus
+from app.queues import QUEUE_BATCH, queue_for_cost
+from app.runner.execute import execute_spec
+from app.runner.stage_cache import StageCache
+from app.runner.toy_runner import load_cached_splits
+from app.runner.sweep import sweep_table, upstream_key
 from app.schemas.pipeline import PipelineSpec
+from app.storage import artifact_store
+from app.tasks import send_task
 from app.tasks.celery_app import celery_app
+from app.validation import config_validator
+
+
+logger = logging.getLogger(__name__)
+
+WORKER_STAGE_CACHE = int(os.getenv("WORKER_STAGE_CACHE", "16"))
+# dataset stages warmed at worker start: distinct (block, config, seed) of the most recent runs
+WORKER_WARM_RUNS = int(os.getenv("WORKER_WARM_RUNS", "50"))
+
+RUN_BATCH_SIZE = int(os.getenv("RUN_BATCH_SIZE", "16"))
+
+# per-process dataset/encoder outputs shared by every run_toy this worker executes
+worker_cache = StageCache(max_entries=WORKER_STAGE_CACHE)
+
+
+def claim_queued_runs(
+    session: Session,
+    limit: int,
+    owner: str,
+    run_ids: list[str] | None = None,
+    queue_name: str | None = None,
+) -> list[str]:
+    """
+    Atomically flip up to `limit` queued standalone runs to running and return their ids.
+
+    Clients are served round-robin (each client's oldest run first), so one client's burst
+    cannot fill a whole batch. Postgres uses `FOR UPDATE SKIP LOCKED` so concurrent workers
+    claim disjoint rows; SQLite serializes writers, so the single UPDATE ... RETURNING is
+    already exclusive there. Sweep parents and children are executed by `run_sweep` instead.
+    Each claim stamps `owner`, a fresh heartbeat and one more attempt.
+    """
+    filters = [
+        PipelineRun.status == RunStatus.queued,
+        PipelineRun.kind == RunKind.run,
+        PipelineRun.parent_run_id.is_(None),
+    ]
+    if run_ids is not None:
+        filters.append(PipelineRun.id.in_(run_ids))
+    if queue_name is not None:
+        filters.append(PipelineRun.queue_name == queue_name)
+    client_rank = func.row_number().over(partition_by=PipelineRun.client_id, order_by=PipelineRun.created_at)
+    ranked = select(PipelineRun.id, PipelineRun.created_at, client_rank.label("client_rank")).where(*filters).subquery()
+    fair = select(ranked.c.id).order_by(ranked.c.client_rank, ranked.c.created_at).limit(limit)
+    # window functions can't be combined with FOR UPDATE, so lock in an outer select
+    pick = select(PipelineRun.id).where(PipelineRun.id.in_(fair.scalar_subquery()))
+    if session.get_bind().dialect.name == "postgresql":
+        pick = pick.with_for_update(skip_locked=True)
+    claimed = session.execute(
+        update(PipelineRun)
+        .where(PipelineRun.id.in_(pick.scalar_subquery()), PipelineRun.status == RunStatus.queued)
+        .values(**_claim_values(owner))
+        .returning(PipelineRun.id)
+    ).all()
+    session.commit()
+    return [row[0] for row in claimed]
+
+
+def _claim_values(owner: str) -> dict[str, Any]:
+    now = datetime.utcnow()
+    return {
+        "status": RunStatus.running,
+        "started_at": now,
+        "heartbeat_at": now,
+        "claimed_by": owner,
+        "attempts": func.coalesce(PipelineRun.attempts, 0) + 1,
+    }
+
+
+def _still_owned(session: Session, run_ids: list[str], owner: str) -> set[str]:
+    """Runs the reaper has not taken away from `owner` in the meantime."""
+    with session.no_autoflush:
+        return set(
+            session.exec(
+                select(PipelineRun.id).where(
+                    PipelineRun.id.in_(run_ids),
+                    PipelineRun.status == RunStatus.running,
+                    PipelineRun.claimed_by == owner,
+                )
+            ).all()
+        )
+
+
+def _execute_claimed(run: PipelineRun, spec: PipelineSpec) -> dict[str, Any]:
+    """Run one claimed run against the worker cache; updates `run` in memory only."""
+    try:
+        artifacts: dict = {}
+        metrics = execute_spec(spec, artifacts=artifacts, cache=worker_cache, progress=partial(publish, run.id))
+        set_run_metrics(run, metrics)
+        run.artifacts = artifact_store.put_many(artifacts)
+        run.status = RunStatus.succeeded
+    except Exception as e:
+        metrics = {}
+        run.status = RunStatus.failed
+        run.error = str(e)
+    run.finished_at = datetime.utcnow()
+    return metrics
 
 
 @celery_app.task(name="app.tasks.run_pipeline.run_toy")
@@ -18,26 +129,299 @@ def run_toy(run_id: str) -> dict[str, Any]:
         run = session.get(PipelineRun, run_id)
         if not run:
             return {"ok": False, "error": "Run not found", "runId": run_id}
+        owner = owner_id()
+        if not claim_queued_runs(session, 1, owner, [run_id]):
+            # already picked up by a batch (or another delivery of this message)
+            return {"ok": True, "runId": run_id, "skipped": True}
+        session.refresh(run)
+        publish(run.id, "started")
+
+        with Heartbeat([run.id], owner):
+            try:
+                spec = PipelineSpec.model_validate(run.spec)
+            except Exception as e:
+                run.status, run.error, run.finished_at = RunStatus.failed, str(e), datetime.utcnow()
+                metrics = {}
+            else:
+                metrics = _execute_claimed(run, spec)
+        if not store_result(session, run, owned_by(run.id, owner)):
+            session.rollback()
+            return {"ok": False, "runId": run.id, "error": "Run was reclaimed while executing"}
+        session.commit()
+        publish(run.id, FINISHED, status=run.status.value, error=run.error or None)
+        if run.status == RunStatus.failed:
+            return {"ok": False, "runId": run.id, "status": run.status.value, "error": run.error}
+        return {"ok": True, "runId": run.id, "status": run.status.value, "metrics": metrics}
+
+
+@celery_app.task(name="app.tasks.run_pipeline.run_toy_batch")
+def run_toy_batch(limit: int = RUN_BATCH_SIZE, queue_name: str | None = None) -> dict[str, Any]:
+    """
+    Drain up to `limit` queued runs in one task.
+
+    Claimed runs are ordered by dataset block/config and seed so each dataset (and any shared
+    encoder stage) is produced once in `worker_cache` and reused by its neighbours. All results
+    are written back in a single transaction at the end.
+    """
+    with Session(engine) as session:
+        owner = owner_id()
+        ids = claim_queued_runs(session, max(1, limit), owner, queue_name=queue_name)
+        if not ids:
+            return {"ok": True, "claimed": 0}
+        runs = session.exec(select(PipelineRun).where(PipelineRun.id.in_(ids))).all()
+        # detached: results only ever reach the database through store_result's guarded UPDATE
+        session.expunge_all()
+
+        specs: dict[str, PipelineSpec] = {}
+        for run in runs:
+            try:
+                specs[run.id] = PipelineSpec.model_validate(run.spec)
+            except Exception as e:
+                run.status, run.error, run.finished_at = RunStatus.failed, str(e), datetime.utcnow()
+
+        def group(run: PipelineRun) -> tuple[str, str]:
+            spec = specs.get(run.id)
+            return (upstream_key(spec), run.id) if spec is not None else ("", run.id)
+
+        with Heartbeat(ids, owner):
+            for run in sorted(runs, key=group):
+                if run.id not in specs:
+                    continue
+                publish(run.id, "started")
+                _execute_claimed(run, specs[run.id])
+
+        # runs the reaper took away meanwhile belong to someone else now; leave them alone
+        runs = [run for run in runs if store_result(session, run, owned_by(run.id, owner))]
+        session.commit()
+        for run in runs:
+            publish(run.id, FINISHED, status=run.status.value, error=run.error or None)
+        succeeded = sum(1 for r in runs if r.status == RunStatus.succeeded)
+        return {"ok": True, "claimed": len(runs), "succeeded": succeeded, "stageCache": worker_cache.stats()}
+
 
-        run.status = RunStatus.running
-        run.started_at = run.started_at or datetime.utcnow()
-        session.add(run)
+def execute_sweep(session: Session, parent: PipelineRun, owner: str) -> Optional[dict[str, Any]]:
+    """
+    Run every unfinished child of a queued sweep and store the results table on the parent.
+
+    Children sharing dataset/encoders/fusion/seed run back to back against one StageCache,
+    so that upstream work happens once per distinct combination. Returns None if the sweep
+    could not be claimed or was reclaimed by the reaper part-way (finished children are kept).
+    """
+    claimed = session.execute(
+        update(PipelineRun)
+        .where(PipelineRun.id == parent.id, PipelineRun.status == RunStatus.queued)
+        .values(**_claim_values(owner))
+    ).rowcount
+    session.commit()
+    if not claimed:
+        return None
+    session.refresh(parent)
+    publish(parent.id, "started")
+    with Heartbeat([parent.id], owner):
+        return _execute_sweep_children(session, parent, owner)
+
+
+def _execute_sweep_children(session: Session, parent: PipelineRun, owner: str) -> Optional[dict[str, Any]]:
+    children = session.exec(select(PipelineRun).where(PipelineRun.parent_run_id == parent.id)).all()
+    specs = {c.id: PipelineSpec.model_validate(c.spec) for c in children}
+    children = sorted(children, key=lambda c: (upstream_key(specs[c.id]), c.created_at, c.id))
+    cache = StageCache()
+    # a child result only lands while this process still owns the parent
+    parent_row = aliased(PipelineRun)
+    parent_owned = select(parent_row.id).where(
+        parent_row.id == parent.id, parent_row.status == RunStatus.running, parent_row.claimed_by == owner
+    ).exists()
+    unfinished = PipelineRun.status.notin_([RunStatus.succeeded, RunStatus.failed])
+
+    for child in children:
+        if child.status in (RunStatus.succeeded, RunStatus.failed):
+            continue
+        if not _still_owned(session, [parent.id], owner):
+            return None
+        child.status = RunStatus.running
+        child.started_at = datetime.utcnow()
+        publish(child.id, "started")
+        try:
+            artifacts: dict = {}
+            progress = partial(publish, child.id)
+            set_run_metrics(child, execute_spec(specs[child.id], artifacts=artifacts, cache=cache, progress=progress))
+            child.artifacts = artifact_store.put_many(artifacts)
+            child.status = RunStatus.succeeded
+        except Exception as e:
+            child.status = RunStatus.failed
+            child.error = str(e)
+        child.finished_at = datetime.utcnow()
+        if not store_result(session, child, unfinished, parent_owned):
+            session.rollback()
+            return None
         session.commit()
+        publish(child.id, FINISHED, status=child.status.value, error=child.error or None)
+
+    sweep = dict((parent.metrics or {}).get("sweep") or {})
+    params = {p["runId"]: p["params"] for p in sweep.get("points", [])}
+    by_id = {c.id: c for c in children}
+    rows = [
+        {"runId": rid, "status": by_id[rid].status.value, "params": params[rid], "metrics": by_id[rid].metrics}
+        for rid in params
+        if rid in by_id
+    ]
+    table = sweep_table(sorted(sweep.get("grid") or {}), rows)
+    parent.metrics = {"sweep": {**sweep, "table": table, "stageCache": cache.stats()}}
+    parent.status = RunStatus.succeeded if any(c.status == RunStatus.succeeded for c in children) else RunStatus.failed
+    if parent.status == RunStatus.failed:
+        parent.error = "All sweep points failed"
+    parent.finished_at = datetime.utcnow()
+    if not store_result(session, parent, owned_by(parent.id, owner)):
+        session.rollback()
+        return None
+    session.commit()
+    publish(parent.id, FINISHED, status=parent.status.value)
+    return table
 
+
+@celery_app.task(name="app.tasks.run_pipeline.run_sweep")
+def run_sweep(parent_id: str) -> dict[str, Any]:
+    with Session(engine) as session:
+        parent = session.get(PipelineRun, parent_id)
+        if not parent:
+            return {"ok": False, "error": "Sweep not found", "sweepId": parent_id}
+        owner = owner_id()
         try:
-            spec = PipelineSpec.model_validate(run.spec)
-            metrics = run_toy_pipeline(spec)
-            run.metrics = metrics
-            run.status = RunStatus.succeeded
-            run.finished_at = datetime.utcnow()
-            session.add(run)
-            session.commit()
-            return {"ok": True, "runId": run.id, "status": run.status.value, "metrics": metrics}
+            table = execute_sweep(session, parent, owner)
         except Exception as e:
-            run.status = RunStatus.failed
-            run.error = str(e)
-            run.finished_at = datetime.utcnow()
-            session.add(run)
+            session.rollback()
+            parent.status = RunStatus.failed
+            parent.error = str(e)
+            parent.finished_at = datetime.utcnow()
+            if not store_result(session, parent, owned_by(parent.id, owner)):
+                session.rollback()
+                return {"ok": False, "sweepId": parent.id, "error": "Sweep was reclaimed while executing"}
             session.commit()
-            return {"ok": False, "runId": run.id, "status": run.status.value, "error": str(e)}
+            publish(parent.id, FINISHED, status=parent.status.value, error=parent.error)
+            return {"ok": False, "sweepId": parent.id, "status": parent.status.value, "error": str(e)}
+        if table is None:
+            return {"ok": True, "sweepId": parent.id, "skipped": True}
+        return {"ok": True, "sweepId": parent.id, "status": parent.status.value, "rows": len(table["rows"])}
+
+
+def _limit_blas_threads() -> int:
+    """Split the cores between prefork children instead of letting each BLAS use all of them."""
+    from threadpoolctl import threadpool_limits
+
+    cpus = os.cpu_count() or 1
+    concurrency = int(celery_app.conf.worker_concurrency or cpus)
+    per_process = max(1, cpus // max(1, concurrency))
+    threadpool_limits(limits=per_process)
+    return per_process
+
+
+def _warm_validators(session: Session) -> int:
+    rows = session.exec(
+        select(Block.slug, BlockVersion.version, BlockVersion.digest, BlockVersion.input_schema)
+        .join(Block, Block.id == BlockVersion.block_id)
+        .where(BlockVersion.status.in_([BlockVersionStatus.published, BlockVersionStatus.deprecated]))
+    ).all()
+    for slug, version, digest, schema in rows:
+        config_validator(slug, version, digest, schema)
+    return len(rows)
+
+
+def _warm_dataset_stages(session: Session) -> int:
+    published = set(
+        session.exec(
+            select(Block.slug)
+            .join(BlockVersion, BlockVersion.block_id == Block.id)
+            .where(Block.category == BlockCategory.datasets, BlockVersion.status == BlockVersionStatus.published)
+        ).all()
+    )
+    recent = session.exec(
+        select(PipelineRun.spec).where(PipelineRun.parent_run_id.is_(None)).order_by(desc(PipelineRun.created_at)).limit(WORKER_WARM_RUNS)
+    ).all()
+    seen: set[str] = set()
+    for spec_json in recent:
+        try:
+            spec = PipelineSpec.model_validate(spec_json)
+        except Exception:
+            continue
+        ds = next((n for n in spec.graph.nodes if n.type == "dataset"), None)
+        if ds is None or ds.blockRef.blockId not in published:
+            continue
+        key, _ = load_cached_splits(worker_cache, ds.blockRef.blockId, ds.config, int(spec.runConfig.seed))
+        seen.add(key)
+        if len(seen) >= WORKER_STAGE_CACHE:
+            break
+    return len(seen)
+
+
+@worker_process_init.connect
+def _warm_worker(**_: Any) -> None:
+    """
+    Pay the first-task costs once per worker process, right after fork.
+
+    Pooled connections inherited from the parent are dropped (never shared across processes),
+    BLAS threads are capped, and validators / recent dataset stages are built ahead of time.
+    """
+    engine.dispose(close=False)
+    threads = _limit_blas_threads()
+    try:
+        with Session(engine) as session:
+            validators = _warm_validators(session)
+            datasets = _warm_dataset_stages(session)
+    except Exception as e:
+        logger.warning("Worker warm-up skipped: %s", e)
+        return
+    logger.info("Worker warm: blasThreads=%s validators=%s datasetStages=%s", threads, validators, datasets)
+
+
+@celery_app.task(name="app.tasks.run_pipeline.reap_stale_runs")
+def reap_stale_runs(limit: int = 100) -> dict[str, Any]:
+    """
+    Requeue (or, after RUN_MAX_ATTEMPTS, fail) running runs whose owner stopped heartbeating.
+
+    Every transition is a compare-and-set on the same staleness predicate plus the old owner,
+    so concurrent reapers, or an owner that comes back and beats, can never double-handle a
+    run. Sweep children follow their parent.
+    """
+    now = datetime.utcnow()
+    requeued: list[tuple[str, RunKind, str]] = []
+    failed: list[tuple[str, str]] = []
+    with Session(engine) as session:
+        stale = session.exec(
+            select(PipelineRun.id, PipelineRun.kind, PipelineRun.attempts, PipelineRun.claimed_by, PipelineRun.queue_name, PipelineRun.cost_estimate)
+            .where(stale_filter(now), PipelineRun.parent_run_id.is_(None))
+            .limit(limit)
+        ).all()
+        for run_id, kind, attempts, owner, queue_name, cost in stale:
+            attempts = attempts or 0
+            guard = (PipelineRun.id == run_id, PipelineRun.claimed_by == owner, stale_filter(now))
+            if attempts >= RUN_MAX_ATTEMPTS:
+                error = f"Abandoned by {owner or 'unknown owner'} after {attempts} attempt(s)"
+                values: dict[str, Any] = {"status": RunStatus.failed, "error": error, "finished_at": now, "claimed_by": ""}
+            else:
+                # sync runs whose API process died have no queue yet; they continue as async runs
+                queue_name = queue_name or (QUEUE_BATCH if kind == RunKind.sweep else queue_for_cost(cost or 0.0))
+                values = {"status": RunStatus.queued, "queue_name": queue_name, "claimed_by": "", "heartbeat_at": None, "started_at": None}
+            if not session.execute(update(PipelineRun).where(*guard).values(**values)).rowcount:
+                continue
+            if kind == RunKind.sweep:
+                # unfinished children are re-executed (or failed) together with their parent
+                session.execute(
+                    update(PipelineRun)
+                    .where(PipelineRun.parent_run_id == run_id, PipelineRun.status == RunStatus.running)
+                    .values(status=values["status"], error=values.get("error", ""), finished_at=values.get("finished_at"))
+                )
+            if values["status"] == RunStatus.failed:
+                failed.append((run_id, values["error"]))
+            else:
+                requeued.append((run_id, kind, queue_name))
+        session.commit()
 
+    for run_id, kind, queue_name in requeued:
+        publish(run_id, "requeued")
+        if kind == RunKind.sweep:
+            send_task("app.tasks.run_pipeline.run_sweep", args=[run_id])
+        else:
+            send_task("app.tasks.run_pipeline.run_toy_batch", kwargs={"queue_name": queue_name}, queue=queue_name)
+    for run_id, error in failed:
+        publish(run_id, FINISHED, status=RunStatus.failed.value, error=error)
+    return {"ok": True, "stale": len(stale), "requeued": len(requeued), "failed": len(failed)}
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable
+
+import fastjsonschema
+from fastapi import HTTPException
+from sqlmodel import Session, select
+
+from app.db import engine
+from app.models import Block, BlockVersion, BlockVersionStatus
+from app.schemas.pipeline import LockedBlock, PipelineSpec
+
+
+# (blockId, version, digest) -> compiled validator. The digest covers the schema, so a cached
+# entry can never go stale; the set of block versions is small enough to keep them all.
+_validators: dict[tuple[str, str, str], Callable[[Any], Any]] = {}
+_lock = threading.Lock()
+
+
+def canonicalize_locked_blocks(session: Session, locked_blocks: list[LockedBlock]) -> dict:
+    """
+    Validate that lockedBlocks exist and digest matches a published version.
+    Return a canonical payload suitable for persistence.
+    """
+    out = []
+    for lb in locked_blocks:
+        block = session.exec(select(Block).where(Block.slug == lb.blockId)).first()
+        if not block:
+            raise ValueError(f"Unknown blockId in lockedBlocks: {lb.blockId}")
+        bv = session.exec(
+            select(BlockVersion).where(
+                BlockVersion.block_id == block.id,
+                BlockVersion.version == lb.version,
+            )
+        ).first()
+        if not bv:
+            raise ValueError(f"Unknown block version: {lb.blockId}@{lb.version}")
+        if bv.digest != lb.digest:
+            raise ValueError(f"Digest mismatch for {lb.blockId}@{lb.version}: expected {bv.digest}, got {lb.digest}")
+        if bv.status not in (BlockVersionStatus.published, BlockVersionStatus.deprecated):
+            raise ValueError(f"Locked block version not published: {lb.blockId}@{lb.version} ({bv.status.value})")
+
+        out.append(
+            {
+                "blockId": block.slug,
+                "version": bv.version,
+                "digest": bv.digest,
+                "inputSchema": bv.input_schema,
+                "outputSchema": bv.output_schema,
+                "changelog": bv.changelog,
+                "deprecated": bv.status == BlockVersionStatus.deprecated,
+                "permissions": bv.permissions,
+                "tests": bv.tests,
+            }
+        )
+    return {"lockedBlocks": out}
+
+
+def config_validator(block_id: str, version: str, digest: str, schema: dict[str, Any]) -> Callable[[Any], Any]:
+    key = (block_id, version, digest)
+    v = _validators.get(key)
+    if v is None:
+        with _lock:
+            v = _validators.get(key)
+            if v is None:
+                # use_default=False: validation must not inject schema defaults into the user's config
+                v = fastjsonschema.compile(schema or {}, use_default=False)
+                _validators[key] = v
+    return v
+
+
+def validate_node_configs(spec: PipelineSpec, locked: dict) -> list[dict[str, Any]]:
+    """
+    Check every node's config against the inputSchema of its locked block version.
+
+    `locked` is the canonical payload from `canonicalize_locked_blocks` (server-side schemas,
+    never the client's copy). A node whose block version is not locked has no schema to check
+    against and is an error too. Returns one error per offending node; empty means valid.
+    """
+    by_ref = {(lb["blockId"], lb["version"]): lb for lb in locked.get("lockedBlocks", [])}
+    errors: list[dict[str, Any]] = []
+    for node in spec.graph.nodes:
+        ref = node.blockRef
+        lb = by_ref.get((ref.blockId, ref.version))
+        if lb is None:
+            error = f"Block version not in lockedBlocks: {ref.blockId}@{ref.version}"
+            errors.append({"nodeId": node.id, "blockId": ref.blockId, "field": None, "error": error})
+            continue
+        try:
+            validate = config_validator(lb["blockId"], lb["version"], lb["digest"], lb["inputSchema"])
+        except fastjsonschema.JsonSchemaDefinitionException as e:
+            errors.append({"nodeId": node.id, "blockId": lb["blockId"], "field": None, "error": f"Invalid block schema: {e}"})
+            continue
+        try:
+            validate(node.config or {})
+        except fastjsonschema.JsonSchemaValueException as e:
+            field = ".".join(str(p) for p in (e.path or [])[1:]) or None
+            errors.append({"nodeId": node.id, "blockId": lb["blockId"], "field": field, "error": e.message})
+    return errors
+
+
+def lock_and_validate(spec: PipelineSpec) -> dict:
+    """
+    Canonicalize `spec.lockedBlocks` and check every node config against it.
+
+    Returns the canonical payload to persist with the run; raises a 400 HTTPException
+    describing what is wrong otherwise. Blocking (one DB session), so call it off the loop.
+    """
+    with Session(engine) as session:
+        try:
+            locked_blocks = canonicalize_locked_blocks(session, spec.lockedBlocks)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail={"message": "Invalid lockedBlocks", "error": str(e)})
+    config_errors = validate_node_configs(spec, locked_blocks)
+    if config_errors:
+        raise HTTPException(status_code=400, detail={"message": "Invalid node config", "errors": config_errors})
+    return locked_blocks
@@ -0,0 +1,76 @@
+"""
+Import-time check for the API process.
+
+Imports `app.main` in a fresh interpreter under `python -X importtime`, prints the slowest
+top-level packages, total import time and peak RSS, and fails when a dependency that the API
+defers to first use (numpy, scikit-learn, Celery, ...) is loaded at import time, or when the
+total exceeds `--budget-ms`.
+
+Run from apps/api:  python scripts/check_import_time.py --budget-ms 2000
+"""
+from __future__ import annotations
+
+import argparse
+import resource
+import subprocess
+import sys
+from collections import defaultdict
+
+
+DEFERRED = ("numpy", "sklearn", "scipy", "celery", "kombu", "redis", "pyarrow", "feedparser")
+
+
+def _parse(stderr: str) -> list[tuple[int, int, str]]:
+    """`import time: self [us] | cumulative | imported package` lines -> (self, cumulative, name)."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:") :].split("|", 2)
+        rows.append((int(self_us), int(cumulative_us), name.strip()))
+    return rows
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--module", default="app.main")
+    ap.add_argument("--budget-ms", type=float, default=0.0, help="fail above this total (0 = report only)")
+    ap.add_argument("--top", type=int, default=15)
+    args = ap.parse_args()
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {args.module}"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        return proc.returncode
+    rows = _parse(proc.stderr)
+
+    # self time summed per top-level package; the total is the module's own cumulative time,
+    # so interpreter startup (site, encodings) is not counted
+    by_package: dict[str, int] = defaultdict(int)
+    for self_us, _, name in rows:
+        by_package[name.split(".")[0]] += self_us
+    total_ms = next(cumulative for _, cumulative, name in rows if name == args.module) / 1000
+    rss_mb = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024  # KiB on Linux
+
+    print(f"import {args.module}: {total_ms:.1f} ms, peak RSS {rss_mb:.1f} MiB, {len(rows)} modules")
+    for pkg, us in sorted(by_package.items(), key=lambda kv: -kv[1])[: args.top]:
+        print(f"  {us / 1000:8.1f} ms  {pkg}")
+
+    loaded = {name.split(".")[0] for _, _, name in rows}
+    eager = [pkg for pkg in DEFERRED if pkg in loaded]
+    failed = False
+    if eager:
+        print(f"FAIL: loaded at import time but should be deferred to first use: {', '.join(eager)}")
+        failed = True
+    if args.budget_ms and total_ms > args.budget_ms:
+        print(f"FAIL: import time {total_ms:.1f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
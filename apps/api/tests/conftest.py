@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import os
+import tempfile
+from typing import Iterator
+
+# must be set before any `app.*` import: engines, stores and buses are built at import time
+_TMP = tempfile.mkdtemp(prefix="multibench-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMP}/test.db"
+os.environ["ARTIFACT_DIR"] = f"{_TMP}/artifacts"
+os.environ["EVENTS_BACKEND"] = "memory"
+
+import pytest
+from sqlalchemy import inspect, text
+from sqlmodel import Session, SQLModel
+
+from app.db import create_db_and_tables, engine
+from app.search import FTS_TABLE
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _schema() -> None:
+    create_db_and_tables()
+
+
+@pytest.fixture
+def session() -> Iterator[Session]:
+    """A session on the test database; every table is emptied afterwards."""
+    with Session(engine) as s:
+        yield s
+    with engine.begin() as conn:
+        for table in reversed(SQLModel.metadata.sorted_tables):
+            conn.execute(table.delete())
+        if inspect(conn).has_table(FTS_TABLE):
+            conn.execute(text(f"DELETE FROM {FTS_TABLE}"))
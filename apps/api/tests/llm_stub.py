@@ -0,0 +1,60 @@
+"""Minimal OpenAI-compatible `/chat/completions` stand-in with scriptable failures."""
+from __future__ import annotations
+
+import hashlib
+import json
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler
+from typing import Iterator
+
+from tests.http_stub import reply, serve
+
+
+class LLMStub:
+    """
+    Answers every prompt with a deterministic `{"candidates": [...]}` object.
+
+    `failures` is consumed one status per request before any success is served; 429s carry
+    `Retry-After: 0`. `prompts` records every prompt received, including failed attempts.
+    """
+
+    def __init__(self, failures: list[int] | None = None) -> None:
+        self.failures = list(failures or [])
+        self.prompts: list[str] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def proposal_for(prompt: str) -> dict:
+        slug = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        return {"candidates": [{"blockId": f"stub.{slug}", "description": "stub proposal"}]}
+
+    def handle(self, req: BaseHTTPRequestHandler) -> None:
+        if req.command != "POST" or not req.path.endswith("/chat/completions"):
+            reply(req, 404, b"{}", "application/json")
+            return
+        body = json.loads(req.rfile.read(int(req.headers.get("Content-Length", "0"))))
+        prompt = body["messages"][-1]["content"]
+        with self._lock:
+            self.prompts.append(prompt)
+            status = self.failures.pop(0) if self.failures else 200
+        if status != 200:
+            headers = {"Retry-After": "0"} if status == 429 else {}
+            reply(req, status, b'{"error": "stub failure"}', "application/json", headers)
+            return
+        # fenced, with chatter, like real models tend to answer
+        content = "Here you go:\n```json\n" + json.dumps(self.proposal_for(prompt)) + "\n```"
+        payload = {
+            "id": "stub",
+            "object": "chat.completion",
+            "model": body.get("model", ""),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        }
+        reply(req, 200, json.dumps(payload).encode("utf-8"), "application/json")
+
+
+@contextmanager
+def llm_stub(failures: list[int] | None = None) -> Iterator[tuple[LLMStub, str]]:
+    stub = LLMStub(failures)
+    with serve(stub.handle) as base_url:
+        yield stub, base_url
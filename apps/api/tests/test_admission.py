@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from functools import partial
+
+import pytest
+
+from app.admission import AdmissionController, AdmissionRejected
+from app.executors import run_cpu_releasing
+
+
+def test_cancelled_request_keeps_its_slot_until_the_thread_finishes() -> None:
+    async def scenario() -> None:
+        admission = AdmissionController("test", max_concurrent=1, max_queue=0, wait_timeout_s=0.0)
+        started, finish = threading.Event(), threading.Event()
+
+        def work() -> str:
+            started.set()
+            finish.wait(10)
+            return "done"
+
+        slot = await admission.acquire()
+        request = asyncio.create_task(run_cpu_releasing(partial(admission.release, slot), work))
+        await asyncio.to_thread(started.wait, 10)
+        request.cancel()  # the client went away; the thread keeps running
+        await asyncio.sleep(0.05)
+        assert admission.stats()["active"] == 1
+
+        finish.set()
+        for _ in range(200):
+            if admission.stats()["active"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert admission.stats()["active"] == 0
+        admission.release(await admission.acquire())
+
+    asyncio.run(scenario())
+
+
+def test_zero_wait_deadline_admits_free_slots_and_rejects_when_full() -> None:
+    async def scenario() -> None:
+        admission = AdmissionController("test", max_concurrent=1, max_queue=4, wait_timeout_s=0.0)
+        slot = await admission.acquire()
+        with pytest.raises(AdmissionRejected, match="wait deadline exceeded"):
+            await admission.acquire()
+        admission.release(slot)
+        admission.release(await admission.acquire())
+        assert admission.stats()["admitted"] == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+import pytest
+
+from app import db
+
+
+def test_schema_work_is_skipped_while_the_fingerprint_matches(monkeypatch: pytest.MonkeyPatch) -> None:
+    db.create_db_and_tables()  # records the fingerprint (other tests' cleanup may have dropped it)
+    upgrades: list[int] = []
+    monkeypatch.setattr(db, "_upgrade_schema", lambda: upgrades.append(db.SCHEMA_UPGRADES))
+
+    db.create_db_and_tables()
+    assert upgrades == []
+
+    monkeypatch.setattr(db, "SCHEMA_UPGRADES", db.SCHEMA_UPGRADES + 1)
+    db.create_db_and_tables()
+    db.create_db_and_tables()
+    assert upgrades == [db.SCHEMA_UPGRADES]
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlmodel import Session
+
+from app import queues
+from app.queues import active_runs, client_key
+from app.routers import runs
+
+
+def test_client_id_header_only_trusted_from_gateway(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert client_key("alice", "10.0.0.5") == "ip:10.0.0.5"
+    assert client_key(None, None) == "ip:unknown"
+    monkeypatch.setattr(queues, "TRUSTED_CLIENT_ID_HOSTS", frozenset({"10.0.0.1"}))
+    assert client_key("alice", "10.0.0.1") == "alice"
+    assert client_key("", "10.0.0.1") == "ip:10.0.0.1"
+    assert client_key("alice", "10.0.0.5") == "ip:10.0.0.5"
+
+
+def test_concurrent_submits_cannot_exceed_limit(monkeypatch: pytest.MonkeyPatch, session: Session) -> None:
+    monkeypatch.setattr(runs, "CLIENT_MAX_ACTIVE_RUNS", 3)
+    monkeypatch.setattr(runs, "send_task", lambda *a, **kw: None)
+    req = SimpleNamespace(spec=SimpleNamespace(model_dump=lambda **_: {}))
+
+    def submit(_: int) -> int:
+        try:
+            runs._enqueue_run(req, "ip:10.0.0.5", 1.0, {})
+            return 200
+        except HTTPException as e:
+            return e.status_code
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        statuses = list(pool.map(submit, range(12)))
+
+    assert sorted(statuses) == [200] * 3 + [429] * 9
+    assert active_runs(session, "ip:10.0.0.5") == 3
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any
+from uuid import uuid4
+
+import pytest
+from sqlmodel import Session, select
+
+from app.models import LLMResponseCache, Paper, PaperCandidate, PaperCandidateStatus
+from app.tasks import llm_proposals
+from tests.llm_stub import LLMStub, llm_stub
+
+
+def _candidate(session: Session, prompt: str) -> str:
+    paper = Paper(arxiv_id=f"test.{uuid4().hex[:8]}", url="", title="t", dedup_hash=uuid4().hex)
+    session.add(paper)
+    session.flush()
+    c = PaperCandidate(paper_id=paper.id, status=PaperCandidateStatus.pending_review, llm_prompt=prompt)
+    session.add(c)
+    session.commit()
+    return c.id
+
+
+class _Jitter:
+    """Stands in for `random`: records backoff ranges and never actually sleeps."""
+
+    def __init__(self) -> None:
+        self.ranges: list[tuple[float, float]] = []
+
+    def uniform(self, lo: float, hi: float) -> float:
+        self.ranges.append((lo, hi))
+        return 0.0
+
+
+@pytest.fixture
+def llm(monkeypatch: pytest.MonkeyPatch) -> Any:
+    jitter = _Jitter()
+    monkeypatch.setattr(llm_proposals, "random", jitter)
+    monkeypatch.setattr(llm_proposals, "LLM_MAX_RETRIES", 3)
+    monkeypatch.setattr(llm_proposals, "LLM_WRITE_BATCH", 2)
+
+    writes: list[int] = []
+    original = llm_proposals._write_batch
+
+    def spy(session: Session, results: list, by_hash: dict) -> None:
+        writes.append(len(results))
+        original(session, results, by_hash)
+
+    monkeypatch.setattr(llm_proposals, "_write_batch", spy)
+
+    def run(failures: list[int] | None = None) -> tuple[dict, LLMStub]:
+        with llm_stub(failures) as (stub, base_url):
+            monkeypatch.setattr(llm_proposals, "LLM_BASE_URL", base_url)
+            return llm_proposals.propose_pending(), stub
+
+    run.writes = writes  # type: ignore[attr-defined]
+    run.jitter = jitter  # type: ignore[attr-defined]
+    return run
+
+
+def test_writes_proposals_in_batches(llm: Any, session: Session) -> None:
+    prompts = [f"prompt {i}" for i in range(5)]
+    ids = [_candidate(session, p) for p in prompts]
+
+    result, stub = llm()
+    assert result == {"ok": True, "pending": 5, "cacheHits": 0, "completed": 5, "failed": 0}
+    assert sorted(stub.prompts) == prompts
+    assert llm.writes == [2, 2, 1]  # LLM_WRITE_BATCH=2: one commit per two responses, then the rest
+
+    session.expire_all()
+    for cid, prompt in zip(ids, prompts):
+        c = session.get(PaperCandidate, cid)
+        assert c.proposed_blocks == LLMStub.proposal_for(prompt)
+        assert c.llm_output
+    assert len(session.exec(select(LLMResponseCache)).all()) == 5
+
+
+def test_identical_prompts_share_one_request(llm: Any, session: Session) -> None:
+    ids = [_candidate(session, "same prompt") for _ in range(3)]
+
+    result, stub = llm()
+    assert result["completed"] == 1
+    assert stub.prompts == ["same prompt"]
+    session.expire_all()
+    assert all(session.get(PaperCandidate, cid).proposed_blocks == LLMStub.proposal_for("same prompt") for cid in ids)
+
+
+def test_retries_5xx_with_backoff_and_honours_retry_after(llm: Any, session: Session) -> None:
+    cid = _candidate(session, "flaky prompt")
+
+    result, stub = llm(failures=[503, 429])
+    assert result["completed"] == 1 and result["failed"] == 0
+    assert stub.prompts == ["flaky prompt"] * 3
+    # 503 -> full-jitter backoff over [0, 0.5 * 2**0]; 429 carries Retry-After, so no jitter draw
+    assert llm.jitter.ranges == [(0, 0.5)]
+    session.expire_all()
+    assert session.get(PaperCandidate, cid).proposed_blocks == LLMStub.proposal_for("flaky prompt")
+
+
+def test_gives_up_after_max_retries(llm: Any, session: Session) -> None:
+    cid = _candidate(session, "dead prompt")
+
+    result, stub = llm(failures=[500] * 4)
+    assert result["completed"] == 0 and result["failed"] == 1
+    assert len(stub.prompts) == 4  # LLM_MAX_RETRIES=3 -> four attempts
+    assert [hi for _, hi in llm.jitter.ranges] == [0.5, 1.0, 2.0]
+    session.expire_all()
+    assert session.get(PaperCandidate, cid).llm_output == ""
+
+
+def test_cached_responses_skip_the_endpoint(llm: Any, session: Session) -> None:
+    first = _candidate(session, "cached prompt")
+    llm()
+
+    second = _candidate(session, "cached prompt")
+    fresh = _candidate(session, "new prompt")
+    result, stub = llm()
+    assert result == {"ok": True, "pending": 2, "cacheHits": 1, "completed": 1, "failed": 0}
+    assert stub.prompts == ["new prompt"]
+    session.expire_all()
+    for cid, prompt in ((first, "cached prompt"), (second, "cached prompt"), (fresh, "new prompt")):
+        assert session.get(PaperCandidate, cid).proposed_blocks == LLMStub.proposal_for(prompt)
+
+
+def test_overlapping_drains_skip_leased_candidates(llm: Any, session: Session) -> None:
+    cid = _candidate(session, "leased prompt")
+    assert llm_proposals.claim_candidates(session, 10) == [cid]  # another drain holds it
+
+    result, stub = llm()
+    assert result == {"ok": True, "pending": 0}
+    assert stub.prompts == []
+
+
+def test_failed_candidates_back_off_behind_fresh_ones(llm: Any, monkeypatch: pytest.MonkeyPatch, session: Session) -> None:
+    monkeypatch.setattr(llm_proposals, "LLM_MAX_ATTEMPTS", 2)
+    dead = _candidate(session, "dead prompt")
+    result, _ = llm(failures=[500] * 4)
+    assert result["failed"] == 1
+
+    fresh = _candidate(session, "fresh prompt")
+    result, stub = llm()
+    assert stub.prompts == ["fresh prompt"]  # the failed one waits out its backoff
+
+    session.expire_all()
+    c = session.get(PaperCandidate, dead)
+    assert c.llm_attempts == 1 and c.llm_retry_at > datetime.utcnow()
+    c.llm_retry_at = datetime.utcnow() - timedelta(seconds=1)
+    session.add(c)
+    session.commit()
+    newer = _candidate(session, "newer prompt")
+    assert llm_proposals.claim_candidates(session, 1) == [newer]  # fewer attempts goes first
+    assert llm_proposals.claim_candidates(session, 1) == [dead]
+
+    session.expire_all()
+    c = session.get(PaperCandidate, dead)
+    c.llm_retry_at = None
+    session.add(c)
+    session.commit()
+    assert llm_proposals.claim_candidates(session, 10) == []  # LLM_MAX_ATTEMPTS reached
+    assert session.get(PaperCandidate, fresh).llm_output
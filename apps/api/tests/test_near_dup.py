@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from sqlmodel import Session
+
+from app.models import Paper
+from app.near_dup import LSHIndex
+
+
+def _paper(session: Session, arxiv_id: str, created_at: datetime) -> str:
+    paper = Paper(arxiv_id=arxiv_id, url="", title=f"paper {arxiv_id}", dedup_hash=uuid4().hex, created_at=created_at)
+    session.add(paper)
+    session.commit()
+    return paper.id
+
+
+def test_refresh_picks_up_papers_committed_behind_the_cursor(session: Session) -> None:
+    now = datetime.utcnow()
+    index = LSHIndex()
+    first = _paper(session, "2501.00001", now)
+    index.refresh(session)
+    assert index.match("2501.00001v2", []) == (first, 1.0)
+
+    # another watcher stamped this one earlier but only committed it now
+    late = _paper(session, "2501.00002", now - timedelta(seconds=30))
+    index.refresh(session)
+    assert index.match("2501.00002v2", []) == (late, 1.0)
+    assert index.match("2501.00001v3", []) == (first, 1.0)
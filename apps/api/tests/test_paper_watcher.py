@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import hashlib
+import re
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from app.models import Paper, PaperCandidate, WatcherState
+from app.near_dup import LSHIndex
+from app.tasks import paper_watcher
+from tests.http_stub import reply, serve
+
+
+FIXTURES = Path(__file__).parent / "fixtures" / "arxiv"
+PAGE_SIZE = 2  # page0/page1 are full, page2 is short and ends the scan
+
+
+@pytest.fixture
+def arxiv(monkeypatch: pytest.MonkeyPatch) -> Iterator[list[int]]:
+    """Local arXiv stand-in serving the Atom fixtures; yields the `start` offsets requested."""
+    starts: list[int] = []
+
+    def handle(req: BaseHTTPRequestHandler) -> None:
+        start = int(parse_qs(urlparse(req.path).query)["start"][0])
+        starts.append(start)
+        page = FIXTURES / f"page{start // PAGE_SIZE}.xml"
+        reply(req, 200, (page if page.exists() else FIXTURES / "empty.xml").read_bytes(), "application/atom+xml")
+
+    with serve(handle) as base_url:
+        monkeypatch.setattr(paper_watcher, "ARXIV_API", f"{base_url}/api/query")
+        monkeypatch.setattr(paper_watcher, "ARXIV_PAGE_SIZE", PAGE_SIZE)
+        # one page at a time so the requested offsets are exact
+        monkeypatch.setattr(paper_watcher, "ARXIV_FETCH_CONCURRENCY", 1)
+        # papers from earlier tests are gone from the DB; keep them out of near-dup matching too
+        monkeypatch.setattr(paper_watcher, "lsh_index", LSHIndex())
+        yield starts
+
+
+def _ids(entries: list) -> list[str]:
+    return [paper_watcher._extract_arxiv_id(e.id) for e in entries]
+
+
+def test_poll_pages_through_feed_then_stops_at_stored_cursor(arxiv: list[int], session: Session) -> None:
+    first = paper_watcher.poll_arxiv()
+    assert arxiv == [0, 2, 4]
+    assert first["fetched"] == 5 and first["created"] == 5
+    assert session.exec(select(func.count()).select_from(PaperCandidate)).one() == 5
+
+    key = hashlib.sha256(first["query"].encode("utf-8")).hexdigest()
+    state = session.get(WatcherState, key)
+    assert state is not None
+    assert state.last_arxiv_id == "2502.00005v1"
+    assert state.last_published_at == datetime(2025, 2, 5, 12, 0)
+
+    arxiv.clear()
+    second = paper_watcher.poll_arxiv()
+    # the newest entry is the cursor: nothing past the first page is requested or kept
+    assert arxiv == [0]
+    assert second["fetched"] == 0 and second["created"] == 0
+    assert session.exec(select(func.count()).select_from(Paper)).one() == 5
+
+
+def test_fetch_stops_at_cursor_id(arxiv: list[int]) -> None:
+    cursor = WatcherState(query_key="k", last_arxiv_id="2502.00003v2", last_published_at=datetime(2025, 2, 3, 12, 0))
+    entries = paper_watcher.fetch_new_entries("q", cursor)
+    assert _ids(entries) == ["2502.00005v1", "2502.00004v1"]
+    assert arxiv == [0, 2]
+
+
+def test_fetch_keeps_same_timestamp_siblings_and_stops_at_older(arxiv: list[int]) -> None:
+    # no id: the entry published at the cursor time may be unseen, anything older is not
+    cursor = WatcherState(query_key="k", last_arxiv_id="", last_published_at=datetime(2025, 2, 3, 12, 0))
+    entries = paper_watcher.fetch_new_entries("q", cursor)
+    assert _ids(entries) == ["2502.00005v1", "2502.00004v1", "2502.00003v2"]
+    assert arxiv == [0, 2]
+
+
+def _fixture_entries() -> list[tuple[str, str]]:
+    """Every fixture `<entry>` as `(published minute, xml)`, newest first."""
+    entries = []
+    for page in sorted(FIXTURES.glob("page*.xml")):
+        for xml in re.findall(r"<entry>.*?</entry>", page.read_text(), flags=re.S):
+            published = re.search(r"<published>(.*?)</published>", xml).group(1)
+            entries.append((published[:16].replace("-", "").replace("T", "").replace(":", ""), xml))
+    return entries
+
+
+@pytest.fixture
+def arxiv_search(monkeypatch: pytest.MonkeyPatch) -> Iterator[list[str]]:
+    """Like `arxiv`, but honours `submittedDate:[lo TO hi]`; yields the search queries requested."""
+    entries = _fixture_entries()
+    queries: list[str] = []
+
+    def handle(req: BaseHTTPRequestHandler) -> None:
+        params = parse_qs(urlparse(req.path).query)
+        q, start, size = params["search_query"][0], int(params["start"][0]), int(params["max_results"][0])
+        queries.append(q)
+        span = re.search(r"submittedDate:\[(\d{12}) TO (\d{12})\]", q)
+        hits = [xml for minute, xml in entries if not span or span.group(1) <= minute <= span.group(2)]
+        body = '<?xml version="1.0" encoding="UTF-8"?><feed xmlns="http://www.w3.org/2005/Atom">'
+        body += "".join(hits[start : start + size]) + "</feed>"
+        reply(req, 200, body.encode("utf-8"), "application/atom+xml")
+
+    with serve(handle) as base_url:
+        monkeypatch.setattr(paper_watcher, "ARXIV_API", f"{base_url}/api/query")
+        monkeypatch.setattr(paper_watcher, "ARXIV_PAGE_SIZE", PAGE_SIZE)
+        monkeypatch.setattr(paper_watcher, "ARXIV_MAX_PAGES", 1)
+        monkeypatch.setattr(paper_watcher, "ARXIV_FETCH_CONCURRENCY", 1)
+        monkeypatch.setattr(paper_watcher, "lsh_index", LSHIndex())
+        yield queries
+
+
+def test_page_cap_leaves_the_cursor_and_fills_the_gap_later(arxiv_search: list[str], session: Session) -> None:
+    key = hashlib.sha256(paper_watcher.build_arxiv_query().encode("utf-8")).hexdigest()
+    session.add(WatcherState(query_key=key, last_arxiv_id="2502.00001v1", last_published_at=datetime(2025, 2, 1, 12, 0)))
+    session.commit()
+
+    # one page holds 00005/00004; 00003 and 00002 are still unseen, so the cursor must not move
+    first = paper_watcher.poll_arxiv()
+    assert first["created"] == 2
+    session.expire_all()
+    state = session.get(WatcherState, key)
+    assert (state.last_arxiv_id, state.pending_arxiv_id) == ("2502.00001v1", "2502.00005v1")
+    assert state.backfill_before == datetime(2025, 2, 4, 12, 0)
+
+    polls = [paper_watcher.poll_arxiv() for _ in range(3)]
+    assert all("submittedDate:[202502011200 TO" in q for q in arxiv_search[1:3])
+    assert sum(p["created"] for p in polls) == 2  # 00003, 00002
+    session.expire_all()
+    state = session.get(WatcherState, key)
+    assert (state.last_arxiv_id, state.last_published_at) == ("2502.00005v1", datetime(2025, 2, 5, 12, 0))
+    assert state.backfill_before is None and state.pending_arxiv_id == ""
+    created = {p.arxiv_id for p in session.exec(select(Paper)).all()}
+    assert created == {"2502.00005v1", "2502.00004v1", "2502.00003v2", "2502.00002v1"}
+
+    # caught up: the next poll starts from the top again and stops at the new cursor
+    assert paper_watcher.poll_arxiv()["fetched"] == 0
+    assert "submittedDate" not in arxiv_search[-1]
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import pytest
+
+from app.runner.replicates import summarize_metrics
+
+
+def _metrics(acc: float, noisy: float, train_ms: float) -> dict:
+    return {
+        "performance": {"accuracy": acc},
+        "complexity": {"paramCount": 1234, "trainTimeMs": train_ms},
+        "robustness": {"noiseStd": 0.2, "noisyAccuracy": noisy, "accuracyDrop": acc - noisy},
+    }
+
+
+def test_only_measured_metrics_are_averaged() -> None:
+    metrics, agg = summarize_metrics([_metrics(0.8, 0.7, 10.0), _metrics(0.9, 0.6, 30.0), _metrics(0.7, 0.5, 20.0)])
+
+    assert metrics["performance"]["accuracy"] == pytest.approx(0.8)
+    assert metrics["complexity"]["trainTimeMs"] == pytest.approx(20.0)
+    assert metrics["robustness"]["accuracyDrop"] == pytest.approx(0.2)
+    # config echoes and counts come through untouched
+    assert metrics["robustness"]["noiseStd"] == 0.2
+    assert metrics["complexity"]["paramCount"] == 1234 and isinstance(metrics["complexity"]["paramCount"], int)
+    assert sorted(agg) == ["complexity.trainTimeMs", "performance.accuracy", "robustness.accuracyDrop", "robustness.noisyAccuracy"]
+    assert agg["performance.accuracy"]["n"] == 3
+    low, high = agg["performance.accuracy"]["ci"]
+    assert low < 0.8 < high
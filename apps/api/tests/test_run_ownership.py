@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any
+
+import pytest
+from sqlalchemy import update
+from sqlmodel import Session
+
+from app.db import engine
+from app.heartbeat import RUN_MAX_ATTEMPTS
+from app.models import PipelineRun, RunStatus
+from app.tasks import run_pipeline
+
+
+LONG_AGO = datetime.utcnow() - timedelta(days=1)
+
+
+@pytest.fixture
+def sent(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Task names the reaper enqueued."""
+    calls: list[str] = []
+    monkeypatch.setattr(run_pipeline, "send_task", lambda name, *a, **kw: calls.append(name))
+    return calls
+
+
+def _row(run_id: str) -> PipelineRun:
+    with Session(engine) as s:
+        return s.get(PipelineRun, run_id)
+
+
+def _go_stale(run_id: str) -> None:
+    with Session(engine) as s:
+        s.execute(update(PipelineRun).where(PipelineRun.id == run_id).values(heartbeat_at=LONG_AGO))
+        s.commit()
+
+
+def _requeue_on_start(monkeypatch: pytest.MonkeyPatch, taken: set[str]) -> None:
+    """Swap Heartbeat for a reaper that requeues `taken` the moment execution starts."""
+
+    class Reaped:
+        def __init__(self, run_ids: list[str], owner: str) -> None:
+            self.run_ids = [r for r in run_ids if r in taken]
+
+        def __enter__(self) -> "Reaped":
+            with Session(engine) as s:
+                s.execute(
+                    update(PipelineRun)
+                    .where(PipelineRun.id.in_(self.run_ids))
+                    .values(status=RunStatus.queued, claimed_by="", heartbeat_at=None, started_at=None)
+                )
+                s.commit()
+            return self
+
+        def __exit__(self, *exc: Any) -> None:
+            pass
+
+    monkeypatch.setattr(run_pipeline, "Heartbeat", Reaped)
+
+
+def test_racing_reapers_requeue_a_stale_run_once(monkeypatch: pytest.MonkeyPatch, session: Session, sent: list[str]) -> None:
+    run = PipelineRun(
+        status=RunStatus.running, claimed_by="worker:gone:1", attempts=1, queue_name="batch", started_at=LONG_AGO, heartbeat_at=LONG_AGO
+    )
+    session.add(run)
+    session.commit()
+    run_id = run.id
+
+    both_scanned = threading.Barrier(2, timeout=10)
+    calls = threading.local()
+    real_stale_filter = run_pipeline.stale_filter
+
+    def stale_filter(now: datetime) -> Any:
+        # the second call builds the compare-and-set guard: hold each reaper there until both have scanned
+        calls.n = getattr(calls, "n", 0) + 1
+        if calls.n == 2:
+            both_scanned.wait()
+        return real_stale_filter(now)
+
+    monkeypatch.setattr(run_pipeline, "stale_filter", stale_filter)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(lambda _: run_pipeline.reap_stale_runs(), range(2)))
+
+    assert [r["stale"] for r in results] == [1, 1]
+    assert sorted(r["requeued"] for r in results) == [0, 1]
+    assert sent == ["app.tasks.run_pipeline.run_toy_batch"]
+    row = _row(run_id)
+    assert (row.status, row.claimed_by, row.attempts) == (RunStatus.queued, "", 1)
+
+
+def test_owner_cannot_overwrite_a_reclaimed_run(monkeypatch: pytest.MonkeyPatch, session: Session) -> None:
+    run = PipelineRun(spec={})
+    session.add(run)
+    session.commit()
+    run_id = run.id
+    _requeue_on_start(monkeypatch, {run_id})
+
+    out = run_pipeline.run_toy(run_id)
+
+    assert out == {"ok": False, "runId": run_id, "error": "Run was reclaimed while executing"}
+    row = _row(run_id)
+    assert (row.status, row.claimed_by, row.error, row.finished_at) == (RunStatus.queued, "", "", None)
+
+
+def test_batch_writes_only_the_runs_it_still_owns(monkeypatch: pytest.MonkeyPatch, session: Session) -> None:
+    kept, taken = PipelineRun(spec={}), PipelineRun(spec={})
+    session.add_all([kept, taken])
+    session.commit()
+    kept_id, taken_id = kept.id, taken.id
+    _requeue_on_start(monkeypatch, {taken_id})
+
+    out = run_pipeline.run_toy_batch(limit=2)
+
+    assert (out["claimed"], out["succeeded"]) == (1, 0)
+    assert _row(kept_id).status == RunStatus.failed  # `{}` is not a valid spec
+    row = _row(taken_id)
+    assert (row.status, row.error, row.finished_at) == (RunStatus.queued, "", None)
+
+
+def test_reaper_fails_a_run_after_max_attempts(session: Session, sent: list[str]) -> None:
+    run = PipelineRun(spec={}, queue_name="batch")
+    session.add(run)
+    session.commit()
+    run_id = run.id
+
+    for attempt in range(1, RUN_MAX_ATTEMPTS + 1):
+        assert run_pipeline.claim_queued_runs(session, 1, f"worker:w{attempt}:1", [run_id]) == [run_id]
+        _go_stale(run_id)
+        out = run_pipeline.reap_stale_runs()
+        exhausted = attempt >= RUN_MAX_ATTEMPTS
+        assert (out["requeued"], out["failed"]) == ((0, 1) if exhausted else (1, 0))
+
+    row = _row(run_id)
+    assert (row.status, row.claimed_by, row.attempts) == (RunStatus.failed, "", RUN_MAX_ATTEMPTS)
+    assert row.error == f"Abandoned by worker:w{RUN_MAX_ATTEMPTS}:1 after {RUN_MAX_ATTEMPTS} attempt(s)"
+    assert row.finished_at is not None
+    assert len(sent) == RUN_MAX_ATTEMPTS - 1
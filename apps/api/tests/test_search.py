@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import base64
+
+import pytest
+
+from app.search import decode_cursor, encode_cursor
+
+
+def _b64(raw: str) -> str:
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def test_cursor_round_trip() -> None:
+    assert decode_cursor(encode_cursor(-1.25, "paper-1")) == (-1.25, "paper-1")
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "not base64!",
+        "é",
+        _b64("{not json"),
+        _b64("5"),
+        _b64("null"),
+        _b64('{"rank": 1}'),
+        _b64("[1]"),
+        _b64('[1, "a", 2]'),
+        _b64('["1", "a"]'),
+        _b64('[true, "a"]'),
+        _b64("[1, 2]"),
+    ],
+)
+def test_malformed_cursor_is_value_error(cursor: str) -> None:
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
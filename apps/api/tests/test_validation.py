@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from types import SimpleNamespace
+
+from app.validation import validate_node_configs
+
+
+def _spec(*nodes: tuple[str, str, str, dict]) -> SimpleNamespace:
+    return SimpleNamespace(
+        graph=SimpleNamespace(
+            nodes=[
+                SimpleNamespace(id=node_id, blockRef=SimpleNamespace(blockId=block_id, version=version), config=config)
+                for node_id, block_id, version, config in nodes
+            ]
+        )
+    )
+
+
+LOCKED = {
+    "lockedBlocks": [
+        {
+            "blockId": "encoders.pca",
+            "version": "1.0.0",
+            "digest": "sha256:test",
+            "inputSchema": {"type": "object", "properties": {"k": {"type": "integer", "minimum": 1}}},
+        }
+    ]
+}
+
+
+def test_config_is_checked_against_the_locked_schema() -> None:
+    assert validate_node_configs(_spec(("enc", "encoders.pca", "1.0.0", {"k": 4})), LOCKED) == []
+    [error] = validate_node_configs(_spec(("enc", "encoders.pca", "1.0.0", {"k": 0})), LOCKED)
+    assert (error["nodeId"], error["blockId"], error["field"]) == ("enc", "encoders.pca", "k")
+
+
+def test_nodes_without_a_locked_version_are_rejected() -> None:
+    spec = _spec(("enc", "encoders.pca", "1.0.0", {"k": 4}), ("fusion", "fusion.concat", "1.0.0", {"anything": True}))
+    assert validate_node_configs(spec, LOCKED) == [
+        {"nodeId": "fusion", "blockId": "fusion.concat", "field": None, "error": "Block version not in lockedBlocks: fusion.concat@1.0.0"}
+    ]
+    [error] = validate_node_configs(_spec(("enc", "encoders.pca", "2.0.0", {"k": 4})), LOCKED)
+    assert error["error"] == "Block version not in lockedBlocks: encoders.pca@2.0.0"
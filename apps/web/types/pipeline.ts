@@ -52,7 +52,7 @@ export type PipelineSpec = {
   pipeline: { id: string; name: string; description?: string; createdAt: string };
   graph: { nodes: NodeInstance[]; edges: EdgeInstance[] };
   lockedBlocks: LockedBlock[];
-  runConfig: { seed: number; mode: "sync" | "async" };
+  runConfig: { seed: number; mode: "sync" | "async"; replicates?: number; cvFolds?: number };
 };
 
 export type RunCreateResponse = {